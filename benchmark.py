@@ -0,0 +1,313 @@
+"""Scaling benchmarks for the editor, run without a display.
+
+Generates a catalog of the given size (price lists x cloths x types x
+sizes), saves it to a scratch store and opens the editor on it under Qt's
+offscreen platform. Then it times what grows with the catalog: opening,
+making and expanding the widgets, adding cloths and types, the two search
+dialogs, resizing the window, print layout and painting, and saving. For
+each phase it reports the wall time, the peak RSS so far, how much the RSS
+grew and, where widgets were made, the memory per widget.
+
+    python benchmark.py [--lists 1000] [--cloths 20] [--types 5] [--sizes 13] [-o run.json]
+    python benchmark.py ... --compare baseline.json [--tolerance 0.25]
+
+The results are JSON. --compare checks them against an earlier run of the
+same size and exits with status 1 if a phase got slower, or its widgets
+bigger, by more than the tolerance.
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import datetime
+import json
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:     # Unix only; elsewhere peak RSS is not reported
+    resource = None
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QEventLoop, QThreadPool
+
+import main as editor
+from models import Catalog, PriceList, Cloth, ClothType
+from render import RenderContext, layout_pages, paint_price_lists, make_pdf_printer
+from storage import PriceListStore
+
+WORDS = ["Cotton", "Linen", "Silk", "Denim", "Wool", "Khadi", "Rayon", "Polyester", "Chiffon",
+         "Georgette", "Twill", "Poplin", "Oxford", "Corduroy", "Velvet", "Satin", "Crepe", "Muslin"]
+GARMENTS = ["Shirt", "Trouser", "Kurta", "Blazer", "Skirt", "Jacket", "Frock", "Uniform"]
+TYPES = ["Half Sleeve", "Full Sleeve", "Regular", "Slim Fit", "Pleated", "Flat Front", "Lined",
+         "Unlined", "Short", "Long"]
+SEARCH_QUERIES = [("PL0", ""), ("", "cotton"), ("12", "shirt"), ("zz", ""), ("", "Linen Kurta 1")]
+CONTENT_QUERIES = ["cotton", "shirt size:32", "slim rate>400", "velvet jacket lined", "size:20"]
+RESIZE_WIDTHS = [1000, 1600, 1200, 2400, 1000]
+SEARCH_ROUNDS = 50   # filter_table is quick; repeat the queries to get above timer noise
+MIN_COMPARED_SECONDS = 0.005    # --compare ignores timings shorter than this
+ADDED = 10      # cloths added by add_cloth_widget, then types by add_type_table
+
+
+def make_catalog(lists, cloths, types, sizes, seed=0):
+    """A catalog of made-up price lists, the same for the same arguments."""
+    rng = random.Random(seed)
+    catalog = Catalog()
+    first_day = datetime.date(2024, 1, 1)
+    size_range = range(20, 20 + 2 * sizes, 2)
+    for i in range(lists):
+        name = f"{rng.choice(WORDS)} {rng.choice(GARMENTS)} {i}"
+        price_list = catalog.add_price_list(
+            PriceList(name, f"PL{i:05d}", first_day + datetime.timedelta(days=rng.randrange(1000))))
+        for c in range(cloths):
+            cloth = price_list.add_cloth(Cloth(f"{rng.choice(WORDS)} {rng.choice(GARMENTS)} {c}"))
+            base = rng.randrange(100, 900)
+            for t in range(types):
+                rates = [float(base + 10 * t + 5 * s) for s in range(sizes)]
+                cloth.add_type(ClothType(size_range, TYPES[t % len(TYPES)], rates))
+    return catalog
+
+
+def rss_kb():
+    """Resident set size now, in KiB, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak   # bytes on macOS, KiB elsewhere
+
+
+class Phase:
+    """Times a with block and records into results[name] the memory and widgets it added."""
+
+    def __init__(self, results, name):
+        self.results = results
+        self.name = name
+        self.extra = {}
+
+    def __enter__(self):
+        QApplication.processEvents()
+        self.widgets = len(QApplication.allWidgets())
+        self.rss = rss_kb()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return False
+        seconds = time.perf_counter() - self.started
+        rss = rss_kb()
+        widgets = len(QApplication.allWidgets()) - self.widgets
+        result = {"seconds": round(seconds, 4), "peak_rss_kb": peak_rss_kb(),
+                  "rss_delta_kb": rss - self.rss if rss is not None else None, "widgets": widgets}
+        if widgets > 0 and rss is not None:
+            result["bytes_per_widget"] = (rss - self.rss) * 1024 // widgets
+        result.update(self.extra)
+        self.results[self.name] = result
+        return False
+
+
+def wait_for(signal):
+    loop = QEventLoop()
+    signal.connect(loop.quit)
+    loop.exec_()
+
+
+def settle():
+    """Runs pending events, then the column layout pass they queued."""
+    QApplication.processEvents()
+    editor.column_layout.run()
+    QApplication.processEvents()
+
+
+def run(lists, cloths, types, sizes, workdir):
+    results = {}
+
+    def phase(name):
+        return Phase(results, name)
+
+    with phase("generate"):
+        catalog = make_catalog(lists, cloths, types, sizes)
+    store = PriceListStore(os.path.join(workdir, editor.DB_FILE))
+    with phase("save_all") as p:
+        store.save(catalog)
+        p.extra["price_lists"] = len(catalog.price_lists)
+    store.close()
+    del catalog
+
+    editor.DB_FILE = os.path.join(workdir, editor.DB_FILE)
+    editor.JOURNAL_FILE = os.path.join(workdir, editor.JOURNAL_FILE)
+    with phase("open") as p:
+        window = editor.PriceListManager()
+        startup = editor.StartupTimer(window)
+        opened = time.perf_counter()
+        window.show()
+        wait_for(window.loaded)
+        QThreadPool.globalInstance().waitForDone()   # the content index build
+        QApplication.processEvents()
+        offset_ms = (opened - editor.STARTED) * 1000
+        p.extra["first_frame_ms"] = round(startup.marks.get("first frame", offset_ms) - offset_ms, 1)
+        p.extra["first_lists_ms"] = round(startup.marks.get("first lists", offset_ms) - offset_ms, 1)
+
+    window.resize(1200, 800)
+    settle()
+    shown = [widget for widget in map(editor.widget_for, window.cursor.window()) if widget is not None]
+    with phase("expand") as p:
+        for price_list_widget in shown:
+            price_list_widget.expand()
+            for i in range(price_list_widget.cloth_layout.count()):
+                cloth_widget = price_list_widget.cloth_layout.itemAt(i).widget()
+                if cloth_widget is not None:
+                    cloth_widget.expand()
+                    for type_widget in cloth_widget.type_widgets():
+                        type_widget.expand()
+        settle()
+        p.extra["price_list_widgets"] = len(shown)
+
+    target = shown[0] if shown else None
+    if target is not None:
+        window.select_price_list(target)
+        window.modify_selected_price_list()
+        with phase("add_cloth_widget") as p:
+            for _ in range(ADDED):
+                target.add_cloth_widget()
+            settle()
+            p.extra["calls"] = ADDED
+        cloth_widget = editor.widget_for(target.model.cloths[0])
+        with phase("add_type_table") as p:
+            for _ in range(ADDED):
+                cloth_widget.add_type_table()
+            settle()
+            p.extra["calls"] = ADDED
+
+    dialog = editor.SearchPriceListDialog(window)
+    with phase("filter_table") as p:
+        for _ in range(SEARCH_ROUNDS):
+            for code, name in SEARCH_QUERIES:
+                dialog.code_filter.setText(code)
+                dialog.name_filter.setText(name)
+                dialog.filter_table()
+        p.extra["queries"] = SEARCH_ROUNDS * len(SEARCH_QUERIES)
+    dialog.deleteLater()
+
+    with phase("content_search") as p:
+        found = sum(len(window.content_index.search(query, editor.CONTENT_SEARCH_LIMIT))
+                    for query in CONTENT_QUERIES)
+        p.extra["queries"] = len(CONTENT_QUERIES)
+        p.extra["results"] = found
+
+    with phase("resize") as p:
+        for width in RESIZE_WIDTHS:
+            window.resize(width, 800)
+            settle()
+        p.extra["resizes"] = len(RESIZE_WIDTHS)
+
+    pdf_path = os.path.join(workdir, "benchmark.pdf")
+    with phase("layout_pages") as p:
+        ctx = RenderContext(make_pdf_printer(pdf_path))
+        pages = layout_pages(ctx, window.catalog.price_lists)
+        p.extra["pages"] = len(pages)
+    del pages
+    with phase("paint_price_lists") as p:
+        shown_lists = window.cursor.window()
+        paint_price_lists(make_pdf_printer(pdf_path), shown_lists)
+        p.extra["price_lists"] = len(shown_lists)
+
+    for price_list in window.catalog.price_lists[:10]:
+        for cloth in price_list.cloths[:1]:
+            for cloth_type in cloth.types[:1]:
+                cloth_type.set_rate(0, cloth_type.rates[0] + 1)
+    window.change_tracker.flush()
+    with phase("save_changes"):
+        window.store.save(window.catalog)
+    window.journal.reset()
+
+    window.close()
+    window.deleteLater()
+    QApplication.processEvents()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing each phase against the baseline, and whether any regressed."""
+    lines = []
+    regressed = False
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for key in ("seconds", "bytes_per_widget"):
+            if not old.get(key) or result.get(key) is None:
+                continue
+            if key == "seconds" and max(old[key], result[key]) < MIN_COMPARED_SECONDS:
+                continue
+            ratio = result[key] / old[key]
+            worse = ratio > 1 + tolerance
+            regressed |= worse
+            lines.append(f"{name:>18} {key:<16} {old[key]:>12} -> {result[key]:>12}  x{ratio:5.2f}"
+                         + ("  REGRESSED" if worse else ""))
+    return lines, regressed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Time the editor on a generated catalog, offscreen.")
+    parser.add_argument("--lists", type=int, default=1000)
+    parser.add_argument("--cloths", type=int, default=20, help="cloths per price list")
+    parser.add_argument("--types", type=int, default=5, help="types per cloth")
+    parser.add_argument("--sizes", type=int, default=13, help="sizes per type")
+    parser.add_argument("-o", "--output", help="write the JSON here instead of to stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON of an earlier run to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, 0.25 being 25%%")
+    args = parser.parse_args(argv[1:])
+
+    params = {"lists": args.lists, "cloths": args.cloths, "types": args.types, "sizes": args.sizes}
+    app = QApplication(argv[:1])
+    editor.load_stylesheet(app)
+    workdir = tempfile.mkdtemp(prefix="price-list-bench-")
+    try:
+        results = run(args.lists, args.cloths, args.types, args.sizes, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = {
+        "params": params,
+        "when": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qt_platform": app.platformName(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    if baseline.get("params") != params:
+        print(f"baseline was run with {baseline.get('params')}, not {params}", file=sys.stderr)
+        return 2
+    lines, regressed = compare(results, baseline["results"], args.tolerance)
+    print("\n".join(lines), file=sys.stderr)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
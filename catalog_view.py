@@ -0,0 +1,186 @@
+"""Single-view catalog editor over the whole model.
+
+CatalogTreeModel exposes Catalog -> PriceList -> Cloth -> ClothType as a Qt
+item model, with a "Size" and a "Rate" row under every type, the same two
+rows TypeWidget shows. CatalogView is a plain QTreeView over it: rows are
+painted by the delegate and an editor only exists while a cell is being
+edited, so scrolling and resizing cost depends on the rows on screen rather
+than on the size of the catalog.
+"""
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt5.QtWidgets import QTreeView, QAbstractItemView, QHeaderView
+
+from models import Catalog, PriceList, Cloth, ClothType, format_rate, parse_rate, parse_size
+
+SIZE_ROW = 0
+RATE_ROW = 1
+LEAF_LABELS = ("Size", "Rate")
+EDIT_TRIGGERS = (QAbstractItemView.DoubleClicked
+                 | QAbstractItemView.EditKeyPressed
+                 | QAbstractItemView.AnyKeyPressed)
+
+
+class CatalogTreeModel(QAbstractItemModel):
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.edited = set()
+        self._rows = {}     # node -> its row under its parent, filled one sibling list at a time
+        self._size_columns = self._max_size_count()
+
+    def _max_size_count(self):
+        return max((len(t.sizes) for t in self.catalog.iter_types()), default=0)
+
+    def reload(self):
+        """Picks up structural changes made outside this model."""
+        self.beginResetModel()
+        self._rows.clear()
+        self._size_columns = self._max_size_count()
+        self.endResetModel()
+
+    # Every index stores its parent object as the internal pointer; the node
+    # itself is parent.children[row]. Size/Rate rows point at their type.
+    def _children(self, obj):
+        if isinstance(obj, Catalog):
+            return obj.price_lists
+        if isinstance(obj, PriceList):
+            return obj.cloths
+        if isinstance(obj, Cloth):
+            return obj.types
+        return LEAF_LABELS
+
+    def node(self, index):
+        if not index.isValid():
+            return self.catalog
+        parent = index.internalPointer()
+        if isinstance(parent, ClothType):
+            return None
+        return self._children(parent)[index.row()]
+
+    def leaf(self, index):
+        """Returns the ClothType of a Size/Rate row, or None."""
+        if index.isValid():
+            parent = index.internalPointer()
+            if isinstance(parent, ClothType):
+                return parent
+        return None
+
+    def _row(self, node):
+        row = self._rows.get(node)
+        if row is None:
+            for i, child in enumerate(self._children(node.parent)):
+                self._rows[child] = i
+            row = self._rows[node]
+        return row
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column, self.node(parent))
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer()
+        if isinstance(parent, Catalog):
+            return QModelIndex()
+        return self.createIndex(self._row(parent), 0, parent.parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        obj = self.node(parent)
+        if obj is None:
+            return 0
+        return len(self._children(obj))
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1 + self._size_columns
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or role != Qt.DisplayRole:
+            return None
+        return "Name" if section == 0 else str(section)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        cloth_type = self.leaf(index)
+        if cloth_type is not None:
+            if 0 < index.column() <= len(cloth_type.sizes):
+                flags |= Qt.ItemIsEditable
+        elif index.column() == 0:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole, Qt.TextAlignmentRole):
+            return None
+        col = index.column()
+        cloth_type = self.leaf(index)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter if col > 0 else None
+        if cloth_type is not None:
+            if col == 0:
+                return LEAF_LABELS[index.row()]
+            if col > len(cloth_type.sizes):
+                return None
+            if index.row() == SIZE_ROW:
+                return cloth_type.size_label(col - 1)
+            return format_rate(cloth_type.rates[col - 1])
+        if col != 0:
+            return None
+        obj = self.node(index)
+        if role == Qt.EditRole:
+            return obj.name
+        if isinstance(obj, PriceList):
+            return obj.name or "Untitled Price List"
+        if isinstance(obj, Cloth):
+            return obj.name or "Untitled Cloth"
+        return obj.name or "Untitled Type"
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not (self.flags(index) & Qt.ItemIsEditable):
+            return False
+        cloth_type = self.leaf(index)
+        if cloth_type is None:
+            obj = self.node(index)
+            obj.set_name(str(value))
+        elif index.row() == SIZE_ROW:
+            size = parse_size(value)
+            if size is None:
+                return False
+            cloth_type.set_size(index.column() - 1, size)
+            obj = cloth_type
+        else:
+            rate = parse_rate(str(value))
+            if rate is None:
+                return False
+            cloth_type.set_rate(index.column() - 1, rate)
+            obj = cloth_type
+        self.edited.add(obj)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+
+class CatalogView(QTreeView):
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.setObjectName("catalog_view")
+        self.catalog_model = CatalogTreeModel(catalog, self)
+        self.setModel(self.catalog_model)
+        # Uniform rows let the view compute geometry without asking every row.
+        self.setUniformRowHeights(True)
+        self.setAlternatingRowColors(True)
+        self.setSelectionBehavior(QAbstractItemView.SelectItems)
+        self.setEditTriggers(EDIT_TRIGGERS)
+        header = self.header()
+        header.setSectionResizeMode(QHeaderView.Fixed)
+        header.setDefaultSectionSize(70)
+        header.setStretchLastSection(False)
+        self.setColumnWidth(0, 320)
+
+    def reload(self):
+        self.catalog_model.reload()
+        self.setColumnWidth(0, 320)
@@ -0,0 +1,41 @@
+"""One place that hears about every edit to the catalog.
+
+Widgets, dialogs and the tree view all write through the model, and the
+model already tells its catalog's listeners about each change and marks the
+node dirty. ChangeTracker is one such listener: it collects the nodes
+changed during the current pass of the event loop and emits `changed` once
+when control gets back to the loop, however many keystrokes, cells or
+bulk-edited types came in. The UI connects to that one signal once, rather
+than every widget forwarding its own signal up the tree.
+"""
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class ChangeTracker(QObject):
+    changed = pyqtSignal(object)    # set of nodes changed since the last emit
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.pending = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+        catalog.listeners.append(self.on_change)
+
+    def close(self):
+        self._timer.stop()
+        self.catalog.listeners.remove(self.on_change)
+
+    def on_change(self, node, change):
+        self.pending.add(node)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Emits the pending changes now instead of waiting for the event loop."""
+        self._timer.stop()
+        if self.pending:
+            nodes, self.pending = self.pending, set()
+            self.changed.emit(nodes)
@@ -0,0 +1,98 @@
+"""Streaming export of price data to CSV or JSON Lines.
+
+iter_rows() walks the price lists and yields one row per size of every
+type; the writers pull rows from it and write them straight to the file,
+so memory stays flat however big the catalog is. The CSV starts with the
+same columns the importer reads, so an export can be imported again.
+Types on a labelled size grid (S, M, L...) are written with the labels.
+
+    python exporter.py OUT.csv|OUT.jsonl [--code CODE ...] [--db price_lists.db]
+"""
+import argparse
+import csv
+import json
+import sys
+
+from models import format_rate
+
+COLUMNS = ("list", "cloth", "type", "size", "rate", "code", "date")
+FORMATS = ("csv", "jsonl")
+
+
+def iter_rows(price_lists, row_filter=None, progress=None):
+    """Yields (list, cloth, type, size, rate, code, date) for every size of every type.
+
+    progress, if given, is called with (lists done, total) after each list.
+    """
+    for pl_idx, price_list in enumerate(price_lists):
+        date = price_list.date.isoformat()
+        for cloth in price_list.cloths:
+            for cloth_type in cloth.types:
+                labels = cloth_type.grid.labels if cloth_type.grid is not None else ()
+                for col, rate in enumerate(cloth_type.rates):
+                    size = labels[col] if labels else cloth_type.sizes[col]
+                    row = (price_list.name, cloth.name, cloth_type.name, size, rate,
+                           price_list.code, date)
+                    if row_filter is None or row_filter(row):
+                        yield row
+        if progress is not None:
+            progress(pl_idx + 1, len(price_lists))
+
+
+def write_csv(rows, f):
+    writer = csv.writer(f)
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row[:4] + (format_rate(row[4]),) + row[5:])
+        count += 1
+    return count
+
+
+def write_jsonl(rows, f):
+    count = 0
+    for row in rows:
+        f.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def format_for_path(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv"
+
+
+def export_rows(price_lists, path, fmt=None, row_filter=None, progress=None):
+    """Writes the rows of the given price lists to path; returns the number of rows."""
+    fmt = fmt or format_for_path(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    rows = iter_rows(price_lists, row_filter, progress)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        return write_csv(rows, f) if fmt == "csv" else write_jsonl(rows, f)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export price data to CSV or JSON Lines.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--code", action="append", help="only the price list with this code (repeatable)")
+    parser.add_argument("--db", default="price_lists.db")
+    args = parser.parse_args(argv[1:])
+
+    from storage import PriceListStore
+    store = PriceListStore(args.db)
+    try:
+        catalog = store.load()
+    finally:
+        store.close()
+    price_lists = catalog.price_lists
+    if args.code:
+        price_lists = [pl for pl in price_lists if pl.code in args.code]
+    count = export_rows(price_lists, args.path, args.format)
+    print(f"Wrote {count} rows to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,261 @@
+"""Streaming CSV import into the catalog.
+
+The file has one row per size of a type:
+
+    list,cloth,type,size,rate
+    School Uniforms,Cotton Shirt,Half Sleeve,20,250
+    School Uniforms,Cotton Shirt,Half Sleeve,22,260
+
+A header row is optional. Lists, cloths and types are matched by name,
+first against what the import already created and then against the
+catalog, so a file can add sizes to existing types or update their rates.
+A size may also be a label of a size grid (S, M, L...): the type is then
+one on that grid, and a new type is put on it.
+
+Rows are read in batches. Nodes created in a batch are filled while still
+detached and attached at the end of it, so listeners (journal, indexes,
+undo) hear about each new subtree once instead of once per cell. Cells of
+types already in the catalog are gathered too, and each such type gets
+one set_rates() (or set_sizes(), when sizes were added) per batch. Rows that
+don't validate are skipped and reported with their line number.
+
+A staged importer leaves the catalog alone, so it can run off the GUI
+thread: it matches names against a copy of the tree's child lists, taken
+on the GUI thread when the importer is made, keeps the new subtrees
+detached, and queues the rates for types already in the catalog. commit(),
+on the GUI thread, then attaches and writes all of it. Rows whose list,
+cloth or type was deleted from the catalog in the meantime are skipped.
+"""
+import csv
+import io
+import os
+
+from models import PriceList, Cloth, ClothType, attach, parse_rate, parse_size
+
+BATCH_ROWS = 5000
+MAX_ERRORS = 200
+COLUMNS = ("list", "cloth", "type", "size", "rate")
+
+
+def children_map(catalog):
+    """node -> a tuple of its children, for the catalog, its lists and their cloths."""
+    children = {catalog: tuple(catalog.price_lists)}
+    for price_list in catalog.price_lists:
+        children[price_list] = cloths = tuple(price_list.cloths)
+        for cloth in cloths:
+            children[cloth] = tuple(cloth.types)
+    return children
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0           # rows imported
+        self.errors = []        # (line number, message), at most MAX_ERRORS
+        self.skipped = 0        # rows not imported
+        self.added = []         # (node, index) of every subtree attached to the catalog
+        self.updated = set()    # types that were already in the catalog and got new sizes or rates
+
+    def error(self, line_no, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line_no, message))
+
+
+class CsvImporter:
+    def __init__(self, catalog, staged=False):
+        self.catalog = catalog
+        self.staged = staged
+        self._staged = []       # (parent, node) to attach on commit()
+        self._updates = {}      # type in the catalog -> {size: rate}, written by _flush() or commit()
+        self._lists = {}        # name -> PriceList
+        self._cloths = {}       # (price list, name) -> Cloth
+        self._types = {}        # (cloth, name) -> ClothType
+        self._pending = []      # (parent, node) created in this batch, not yet attached
+        self._label_grids = {}  # size label -> first grid that has it
+        self._type_rows = {}    # type -> [first line, rows, path], to skip rows of types deleted before commit()
+        self._created = set()   # nodes a staged import made, the only ones not in the catalog
+        # Taken here, on the GUI thread, so a staged import never walks the live tree from its own.
+        self._children = children_map(catalog) if staged else None
+        for grid in catalog.grids.values():
+            for label in grid.labels:
+                self._label_grids.setdefault(label, grid)
+
+    def import_file(self, path, progress=None, batch_rows=BATCH_ROWS):
+        """Imports a CSV file; progress, if given, is called with (bytes read, file size)."""
+        total = os.path.getsize(path)
+        with open(path, "rb") as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+            return self.import_rows(csv.reader(text), progress and (lambda: progress(raw.tell(), total)),
+                                    batch_rows)
+
+    def import_rows(self, rows, on_batch=None, batch_rows=BATCH_ROWS):
+        result = ImportResult()
+        in_batch = 0
+        for line_no, row in enumerate(rows, 1):
+            if line_no == 1 and row and row[0].strip().lower() == COLUMNS[0]:
+                continue
+            self._import_row(line_no, row, result)
+            in_batch += 1
+            if in_batch >= batch_rows:
+                self._flush(result)
+                in_batch = 0
+                if on_batch is not None:
+                    on_batch()
+        self._flush(result)
+        if on_batch is not None:
+            on_batch()
+        return result
+
+    def _import_row(self, line_no, row, result):
+        if not any(cell.strip() for cell in row):
+            return
+        if len(row) < len(COLUMNS):
+            result.error(line_no, f"expected {len(COLUMNS)} columns, found {len(row)}")
+            return
+        list_name, cloth_name, type_name = (cell.strip() for cell in row[:3])
+        size = parse_size(row[3])
+        label = row[3].strip() if size is None else None
+        rate = parse_rate(row[4])
+        if not list_name:
+            result.error(line_no, "missing price list name")
+            return
+        if size is None and label not in self._label_grids:
+            result.error(line_no, f"invalid size {row[3]!r}")
+            return
+        if rate is None or rate < 0:
+            result.error(line_no, f"invalid rate {row[4]!r}")
+            return
+
+        cloth_type = self._type(list_name, cloth_name, type_name, result,
+                                self._label_grids.get(label))
+        if label is not None:
+            labels = cloth_type.grid.labels if cloth_type.grid is not None else ()
+            if label not in labels:
+                result.error(line_no, f"{type_name!r} has no size {label!r}")
+                return
+            size = cloth_type.sizes[labels.index(label)]
+        if self._live(cloth_type):
+            self._updates.setdefault(cloth_type, {})[size] = rate
+        else:
+            self._set_cell(cloth_type, size, rate)
+        result.rows += 1
+        if self.staged:
+            counted = self._type_rows.get(cloth_type)
+            if counted is None:
+                self._type_rows[cloth_type] = [line_no, 1, f"{list_name} / {cloth_name} / {type_name}"]
+            else:
+                counted[1] += 1
+
+    @staticmethod
+    def _set_cell(cloth_type, size, rate):
+        try:
+            col = cloth_type.sizes.index(size)
+        except ValueError:
+            cloth_type.append_size(size, rate)
+        else:
+            if cloth_type.rates[col] != rate:
+                cloth_type.set_rate(col, rate)
+
+    def _type(self, list_name, cloth_name, type_name, result, grid=None):
+        price_list = self._lists.get(list_name)
+        if price_list is None:
+            price_list = self._find(self.catalog, list_name)
+            if price_list is None:
+                price_list = PriceList(list_name)
+                self._add(self.catalog, price_list)
+            self._lists[list_name] = price_list
+
+        key = (price_list, cloth_name)
+        cloth = self._cloths.get(key)
+        if cloth is None:
+            cloth = self._find(price_list, cloth_name)
+            if cloth is None:
+                cloth = Cloth(cloth_name)
+                self._add(price_list, cloth)
+            self._cloths[key] = cloth
+
+        key = (cloth, type_name)
+        cloth_type = self._types.get(key)
+        if cloth_type is None:
+            cloth_type = self._find(cloth, type_name)
+            if cloth_type is None:
+                cloth_type = ClothType(grid or (), name=type_name)
+                self._add(cloth, cloth_type)
+            elif self._live(cloth_type):
+                result.updated.add(cloth_type)
+            self._types[key] = cloth_type
+        return cloth_type
+
+    def _find(self, parent, name):
+        children = parent.children
+        if self._children is not None:
+            children = self._children.get(parent, children)    # nodes it made itself are not in the map
+        return next((child for child in children if child.name == name), None)
+
+    def _live(self, node):
+        """Whether node is in the catalog; a staged import goes by what it made itself."""
+        if self.staged:
+            return node not in self._created
+        return node.root() is self.catalog
+
+    def _add(self, parent, node):
+        if self.staged:
+            self._created.add(node)
+        if self._live(parent):
+            # Parent is live: keep the node aside and attach it once filled in.
+            self._pending.append((parent, node))
+        else:
+            attach(parent, node)
+
+    def _flush(self, result):
+        if self.staged:
+            self._staged.extend(self._pending)
+            self._pending.clear()
+            return
+        for parent, node in self._pending:
+            attach(parent, node)
+            result.added.append((node, len(parent.children) - 1))
+        self._pending.clear()
+        self._write_updates()
+
+    def _write_updates(self):
+        """Writes the gathered cells with one change per type, like RepricePlan.apply()."""
+        updates, self._updates = self._updates, {}
+        for cloth_type, cells in updates.items():
+            if cloth_type.root() is not self.catalog:
+                continue
+            sizes = cloth_type.sizes.tolist()
+            rates = cloth_type.rates.tolist()
+            columns = {}
+            for col, size in enumerate(sizes):
+                columns.setdefault(size, col)
+            for size, rate in cells.items():
+                col = columns.get(size)
+                if col is None:
+                    columns[size] = len(sizes)
+                    sizes.append(size)
+                    rates.append(rate)
+                else:
+                    rates[col] = rate
+            if len(sizes) == len(cloth_type.sizes):
+                cloth_type.set_rates(rates)
+            else:
+                cloth_type.set_sizes(sizes, rates)
+
+    def commit(self, result):
+        """Puts what a staged import read into the catalog; returns result, now complete."""
+        self.staged = False
+        self._children = None
+        self._created.clear()
+        # What was matched on the job's thread may have been deleted since.
+        self._pending = [(parent, node) for parent, node in self._staged if parent.root() is self.catalog]
+        self._staged = []
+        self._flush(result)
+        for cloth_type, (line_no, rows, path) in self._type_rows.items():
+            if cloth_type.root() is not self.catalog:
+                result.rows -= rows
+                result.error(line_no, f"{path} was deleted during the import")
+                result.skipped += rows - 1     # error() counted the first of them
+        self._type_rows.clear()
+        result.updated = {t for t in result.updated if t.root() is self.catalog}
+        return result
@@ -0,0 +1,199 @@
+"""Background jobs, so long work doesn't freeze the editor.
+
+A Job runs a function on the global QThreadPool. The function is called
+with a progress keyword, the same (done, total) callback that layout,
+import and export already take; calling it reports progress and raises
+Cancelled once the job was cancelled, so any of them can be stopped
+between two steps. The Job itself lives on the GUI thread, so its signals,
+emitted from the pool thread, are delivered there queued: `finished` with
+the function's result, `failed` with its exception, or `cancelled`, and
+then `done` in every case. Connect the slots before start(), so a quick
+job can't finish before anyone listens.
+
+A job only reads the model, or works on detached copies of it (see
+Snapshot); whatever it produces is put into the catalog by the slot
+connected to `finished`, on the GUI thread, where the listeners expect it.
+
+JobStatus is the status area of the editor: a row per running job with
+its title, a progress bar and a Cancel button, hidden when nothing runs.
+"""
+import gc
+import time
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QPushButton
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from models import PriceList, Cloth, ClothType, SizeGrid
+
+PROGRESS_INTERVAL = 0.05    # seconds between progress signals of one job
+
+
+class Cancelled(Exception):
+    pass
+
+
+class _Runnable(QRunnable):
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def run(self):
+        self.job._run()
+
+
+class Job(QObject):
+    progressed = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    done = pyqtSignal()
+
+    def __init__(self, title, fn, *args, parent=None, **kwargs):
+        super().__init__(parent)
+        self.title = title
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.is_cancelled = False
+        self._last_progress = 0.0
+
+    def start(self, pool=None):
+        (pool or QThreadPool.globalInstance()).start(_Runnable(self))
+        return self
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def progress(self, done, total):
+        """Reports progress from the job's thread; raises Cancelled if the job was cancelled."""
+        if self.is_cancelled:
+            raise Cancelled()
+        now = time.monotonic()
+        if now - self._last_progress >= PROGRESS_INTERVAL or done >= total:
+            self._last_progress = now
+            self.progressed.emit(done, total)
+
+    def _run(self):
+        try:
+            if self.is_cancelled:
+                raise Cancelled()
+            result = self.fn(*self.args, progress=self.progress, **self.kwargs)
+        except Cancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(e)
+        else:
+            self.finished.emit(result)
+        finally:
+            self.done.emit()
+
+
+class Snapshot:
+    """Price lists frozen on the GUI thread, for a job to read while editing goes on.
+
+    Taking one only copies the fields of each node and its size and rate
+    arrays, the parts the model edits in place, so the GUI thread doesn't
+    pay for building a whole detached tree. Items are built on demand, on
+    the job's thread: snapshot[i] is a fresh detached copy of the i-th list.
+    """
+
+    def __init__(self, price_lists):
+        self.grids = {}     # uid -> a copy of every grid the lists use
+        # Only new objects are made here, none of them garbage, but so many that
+        # the collector would otherwise go over the whole catalog several times.
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            self.lists = [(pl.uid, pl.name, pl.code, pl.date,
+                           tuple((cloth.uid, cloth.name, tuple(map(self._freeze_type, cloth.types)))
+                                 for cloth in pl.cloths))
+                          for pl in price_lists]
+        finally:
+            if collecting:
+                gc.enable()
+
+    def _freeze_type(self, cloth_type):
+        grid = cloth_type.grid
+        if grid is not None and grid.uid not in self.grids:
+            self.grids[grid.uid] = SizeGrid(grid.name, grid.sizes, grid.labels, uid=grid.uid)
+        return (cloth_type.uid, cloth_type.name, cloth_type.sizes[:], cloth_type.rates[:],
+                grid and grid.uid)
+
+    def __len__(self):
+        return len(self.lists)
+
+    def __iter__(self):
+        for i in range(len(self.lists)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        uid, name, code, date, cloths = self.lists[i]
+        price_list = PriceList(name, code, date, uid=uid)
+        for cloth_uid, cloth_name, types in cloths:
+            cloth = price_list.add_cloth(Cloth(cloth_name, uid=cloth_uid))
+            for type_uid, type_name, sizes, rates, grid_uid in types:
+                grid = self.grids.get(grid_uid)
+                if grid is not None and grid.sizes == sizes:
+                    sizes = grid
+                cloth.add_type(ClothType(sizes, type_name, rates, uid=type_uid))
+        return price_list
+
+
+class JobStatus(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("job_status")
+        self.rows = {}      # job -> row widget
+        self.rows_layout = QVBoxLayout(self)
+        self.rows_layout.setContentsMargins(0, 0, 0, 0)
+        self.hide()
+
+    def new_job(self, title, fn, *args, **kwargs):
+        """A Job for fn(*args, progress=..., **kwargs), shown here; connect to it, then start() it."""
+        job = Job(title, fn, *args, parent=self, **kwargs)
+        self.add(job)
+        return job
+
+    def add(self, job):
+        row = QWidget()
+        layout = QHBoxLayout(row)
+        layout.setContentsMargins(4, 2, 4, 2)
+        label = QLabel(job.title)
+        bar = QProgressBar()
+        bar.setRange(0, 0)      # busy until the first progress report
+        bar.setFixedWidth(240)
+        cancel_btn = QPushButton("Cancel")
+        layout.addWidget(label)
+        layout.addStretch()
+        layout.addWidget(bar)
+        layout.addWidget(cancel_btn)
+
+        def show_progress(done, total):
+            bar.setRange(0, max(1, total))
+            bar.setValue(done)
+
+        def stop():
+            cancel_btn.setEnabled(False)
+            label.setText(f"{job.title} (cancelling…)")
+            job.cancel()
+
+        job.progressed.connect(show_progress)
+        cancel_btn.clicked.connect(stop)
+        job.done.connect(lambda: self.remove(job))
+        self.rows[job] = row
+        self.rows_layout.addWidget(row)
+        self.show()
+
+    def remove(self, job):
+        row = self.rows.pop(job, None)
+        if row is not None:
+            row.deleteLater()
+        job.deleteLater()
+        if not self.rows:
+            self.hide()
+
+    def cancel_all(self, wait_ms=5000):
+        """Cancels every running job and waits for the pool threads to let go of them."""
+        for job in list(self.rows):
+            job.cancel()
+        QThreadPool.globalInstance().waitForDone(wait_ms)
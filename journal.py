@@ -0,0 +1,281 @@
+"""Append-only journal of unsaved edits, for crash recovery.
+
+The journal listens to the catalog and turns every change into one short
+JSON line. Lines are handed to a writer thread that writes whatever has
+queued up and fsyncs once per batch (group commit), so an edit costs the
+same however big the catalog is and the GUI never waits on the disk.
+
+Records only ever carry absolute values (the new name, the new rate of a
+cell, the whole size row of a type or grid, a whole added subtree), so replaying
+them on top of the last saved catalog always gives the latest state.
+
+Files, replayed in this order on startup:
+    <path>.snapshot   compacted records from earlier segments
+    <path>.sealed     a segment being compacted
+    <path>            the active segment
+
+Once the active segment holds COMPACT_AFTER records it is sealed, and a
+background thread folds it into the snapshot, keeping only the last record
+for each value. A save makes all of it redundant and resets the journal.
+"""
+import datetime
+import json
+import os
+import threading
+
+from models import Catalog, SizeGrid, attach, dump_node, load_node, iter_tree
+
+COMMIT_INTERVAL = 0.2   # seconds a batch may wait before it is fsynced
+COMPACT_AFTER = 5000    # records in the active segment before compacting
+
+
+def encode(node, change):
+    """Journal record for a catalog change, or None if there is nothing to keep."""
+    kind = change[0]
+    if kind == "name":
+        return ["n", node.uid, node.name]
+    if kind == "code":
+        return ["c", node.uid, node.code]
+    if kind == "date":
+        return ["d", node.uid, node.date.isoformat()]
+    if kind == "size":
+        return ["s", node.uid, change[1], node.sizes[change[1]]]
+    if kind == "rate":
+        return ["r", node.uid, change[1], node.rates[change[1]]]
+    if kind in ("append_size", "pop_size", "rates", "sizes"):
+        grid_uid = node.grid.uid if node.grid is not None else None
+        return ["z", node.uid, node.sizes.tolist(), node.rates.tolist(), grid_uid]
+    if kind == "grid":
+        return ["g", node.uid, node.name, node.sizes.tolist(), list(node.labels)]
+    if kind == "attach":
+        parent = node.parent
+        parent_uid = None if isinstance(parent, Catalog) else parent.uid
+        return ["a", parent_uid, change[1], dump_node(node)]
+    if kind == "detach":
+        return ["x", node.uid]
+    return None
+
+
+def apply_record(catalog, nodes, record):
+    """Applies one record; nodes maps uid -> node and is kept up to date."""
+    op = record[0]
+    if op == "a":
+        _, parent_uid, index, data = record
+        parent = catalog if parent_uid is None else nodes.get(parent_uid)
+        if parent is None:
+            return
+        old = nodes.get(data["uid"])
+        if old is not None:
+            old.detach()
+        node = attach(parent, load_node(data, catalog.grids), index)
+        nodes.update((n.uid, n) for n in iter_tree(node))
+        return
+    if op == "g":
+        _, uid, name, sizes, labels = record
+        grid = catalog.grids.get(uid)
+        if grid is None:
+            catalog.add_grid(SizeGrid(name, sizes, labels, uid=uid))
+        else:
+            grid.update(name, sizes, labels)
+        return
+    node = nodes.get(record[1])
+    if node is None or node.root() is not catalog:
+        return
+    if op == "x":
+        node.detach()
+    elif op == "n":
+        node.set_name(record[2])
+    elif op == "c":
+        node.set_code(record[2])
+    elif op == "d":
+        node.set_date(datetime.date.fromisoformat(record[2]))
+    elif op == "s" and record[2] < len(node.sizes):
+        node.set_size(record[2], record[3])
+    elif op == "r" and record[2] < len(node.rates):
+        node.set_rate(record[2], record[3])
+    elif op == "z":
+        grid = catalog.grids.get(record[4]) if len(record) > 4 else None
+        if grid is not None and grid.sizes.tolist() == record[2]:
+            node.set_sizes(rates=record[3], grid=grid)
+        else:
+            node.set_sizes(record[2], record[3])
+
+
+def read_records(path):
+    """Yields the records of a journal file, stopping at a torn last line."""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                break
+
+
+def fold(records):
+    """Drops records that a later record makes redundant, keeping order."""
+    kept = {}       # key -> record, in order of the last write
+    by_uid = {}     # uid -> keys written for it
+    for record in records:
+        op = record[0]
+        if op == "a":
+            uids = [data["uid"] for data in _iter_dumped(record[3])]
+            key_uid = uids[0]
+        else:
+            uids = [record[1]]
+            key_uid = record[1]
+        if op in ("a", "x", "z"):
+            for uid in uids:
+                for key in by_uid.pop(uid, ()):
+                    if op != "z" or key[1] in ("r", "s", "z"):
+                        kept.pop(key, None)
+                    else:
+                        by_uid.setdefault(uid, set()).add(key)
+        if op in ("r", "s"):
+            key = (key_uid, op, record[2])
+        else:
+            key = (key_uid, op)
+        kept.pop(key, None)
+        kept[key] = record
+        by_uid.setdefault(key_uid, set()).add(key)
+    return list(kept.values())
+
+
+def _iter_dumped(data):
+    yield data
+    for child in data.get("cloths", data.get("types", ())):
+        yield from _iter_dumped(child)
+
+
+class Journal:
+    def __init__(self, path, commit_interval=COMMIT_INTERVAL, compact_after=COMPACT_AFTER):
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.sealed_path = path + ".sealed"
+        self.commit_interval = commit_interval
+        self.compact_after = compact_after
+        self.catalog = None
+        self._queue = []
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()     # held while files are swapped
+        self._closed = False
+        self._records = sum(1 for _ in read_records(path))
+        self._file = open(path, "a", encoding="utf-8")
+        self._compactor = None
+        self._writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    def has_records(self):
+        return any(os.path.exists(p) and os.path.getsize(p) > 0
+                   for p in (self.snapshot_path, self.sealed_path, self.path))
+
+    def replay(self, catalog):
+        """Re-applies unsaved edits to a freshly loaded catalog; returns the record count."""
+        nodes = {n.uid: n for pl in catalog.price_lists for n in iter_tree(pl)}
+        count = 0
+        for path in (self.snapshot_path, self.sealed_path, self.path):
+            for record in read_records(path):
+                apply_record(catalog, nodes, record)
+                count += 1
+        return count
+
+    def attach(self, catalog):
+        self.catalog = catalog
+        catalog.listeners.append(self.on_change)
+
+    def on_change(self, node, change):
+        record = encode(node, change)
+        if record is None:
+            return
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._cond:
+            self._queue.append(line)
+            self._cond.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue and self._closed:
+                    return
+                # Give the batch a moment to fill up before paying for fsync.
+                self._cond.wait_for(lambda: self._closed, self.commit_interval)
+            self.flush()
+
+    def flush(self):
+        """Blocks until every queued record is on disk."""
+        with self._file_lock:
+            with self._cond:
+                batch, self._queue = self._queue, []
+            if not batch:
+                return
+            self._file.write("".join(batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._records += len(batch)
+            if self._records >= self.compact_after and self._compactor is None:
+                self._seal()
+
+    def _seal(self):
+        # Called with _file_lock held: start a new segment and compact the old one.
+        if os.path.exists(self.sealed_path):
+            return
+        self._file.close()
+        os.replace(self.path, self.sealed_path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._records = 0
+        self._compactor = threading.Thread(target=self._compact, name="journal-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self):
+        try:
+            records = fold(list(read_records(self.snapshot_path))
+                           + list(read_records(self.sealed_path)))
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            with self._file_lock:
+                if os.path.exists(self.sealed_path):
+                    os.replace(tmp_path, self.snapshot_path)
+                    os.remove(self.sealed_path)
+                elif os.path.exists(tmp_path):
+                    # The journal was reset while compacting.
+                    os.remove(tmp_path)
+        finally:
+            self._compactor = None
+
+    def reset(self):
+        """Forgets every record, after the catalog was saved or its edits discarded."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._file_lock:
+            with self._cond:
+                self._queue = []
+            self._file.close()
+            for path in (self.snapshot_path, self.sealed_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._records = 0
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        self._file.close()
+        if self.catalog is not None and self.on_change in self.catalog.listeners:
+            self.catalog.listeners.remove(self.on_change)
@@ -0,0 +1,240 @@
+"""Rate lookups straight from the store, for billing and other programs.
+
+RateLookup answers "what is the rate of this size of this type of this
+cloth in the price list with this code" without loading the catalog or Qt.
+The first lookup in a list reads that list's types from the store into a
+hash index ((cloth, type) -> size -> rate); the most recently used lists
+stay indexed. Before answering, the lookup asks SQLite whether anything was
+committed since it last looked (PRAGMA data_version), and if so drops the
+lists that the new save versions name, so it never serves a rate older than
+the last save.
+
+    python lookup.py CODE CLOTH TYPE SIZE [--db price_lists.db]
+    python lookup.py --serve [--port 8765] [--db price_lists.db]
+
+The server speaks JSON:
+
+    GET  /rate?code=C1&cloth=Cotton+Shirt&type=Half+Sleeve&size=32   -> {"rate": 260.0}
+    POST /rates  [{"code": ..., "cloth": ..., "type": ..., "size": ...}, ...]  -> {"rates": [...]}
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from models import SIZE_TYPECODE, RATE_TYPECODE, parse_size
+from storage import PriceListStore, unpack_array
+
+CACHED_LISTS = 256
+DEFAULT_PORT = 8765
+MAX_BATCH = 10000
+MAX_BODY = MAX_BATCH * 512   # bytes of a POST /rates body
+
+
+class RateLookup:
+    def __init__(self, path, cached_lists=CACHED_LISTS):
+        PriceListStore(path).close()    # brings an older store up to the current schema
+        # Any thread may look up; the lock keeps them off the connection at the same time.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.cached_lists = cached_lists
+        self._lists = OrderedDict()     # code -> (price list uid, {(cloth, type): {size: rate}})
+        self._data_version = self._read_data_version()
+        self._last_version_id = self._read_last_version_id()
+
+    def close(self):
+        self.conn.close()
+
+    def _read_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _read_last_version_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM versions").fetchone()[0]
+
+    def _check_saves(self):
+        """Drops the lists that were saved by another connection since the last lookup."""
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        rows = self.conn.execute("SELECT id, price_list_uid, code FROM versions WHERE id > ?",
+                                 (self._last_version_id,)).fetchall()
+        if rows:
+            self._last_version_id = max(row[0] for row in rows)
+        saved_uids = {row[1] for row in rows}
+        saved_codes = {row[2] for row in rows}
+        live_uids = {uid for (uid,) in self.conn.execute("SELECT uid FROM price_lists")}
+        for code, (uid, _) in list(self._lists.items()):
+            if code in saved_codes or uid in saved_uids or uid not in live_uids:
+                del self._lists[code]
+
+    def invalidate(self, code=None):
+        """Forgets one list, or all of them."""
+        with self._lock:
+            if code is None:
+                self._lists.clear()
+            else:
+                self._lists.pop(code, None)
+
+    def _index(self, code):
+        cached = self._lists.get(code)
+        if cached is not None:
+            self._lists.move_to_end(code)
+            return cached[1]
+        row = self.conn.execute("SELECT uid FROM price_lists WHERE code = ? ORDER BY date DESC, position LIMIT 1",
+                                (code,)).fetchone()
+        if row is None:
+            return None
+        uid = row[0]
+        index = {}
+        for cloth_name, type_name, sizes, rates, labels in self.conn.execute(
+                "SELECT c.name, t.name, t.sizes, t.rates, g.labels FROM cloths c"
+                " JOIN types t ON t.cloth_uid = c.uid"
+                " LEFT JOIN size_grids g ON g.uid = t.grid_uid"
+                " WHERE c.price_list_uid = ? ORDER BY c.position, t.position", (uid,)):
+            sizes = unpack_array(SIZE_TYPECODE, sizes)
+            rates = unpack_array(RATE_TYPECODE, rates)
+            cells = dict(zip(sizes, rates))
+            labels = json.loads(labels) if labels else ()
+            if len(labels) == len(sizes):
+                cells.update(zip(labels, rates))
+            index.setdefault((cloth_name, type_name), cells)
+        self._lists[code] = (uid, index)
+        while len(self._lists) > self.cached_lists:
+            self._lists.popitem(last=False)
+        return index
+
+    def _resolve(self, code, cloth, type_name, size):
+        index = self._index(code)
+        if index is None:
+            return None
+        cells = index.get((cloth, type_name))
+        if cells is None:
+            return None
+        if isinstance(size, str):
+            size = parse_size(size) if size.strip().isdigit() else size.strip()
+        return cells.get(size)
+
+    def rate(self, code, cloth, type_name, size):
+        """Rate of one size (a number or a grid label), or None if there is none."""
+        with self._lock:
+            self._check_saves()
+            return self._resolve(code, cloth, type_name, size)
+
+    def rates(self, queries):
+        """Rates for many (code, cloth, type, size) queries, in order."""
+        with self._lock:
+            self._check_saves()
+            return [self._resolve(*query) for query in queries]
+
+
+def query_of(item):
+    """The (code, cloth, type, size) of one POSTed query; size is a number or a grid label."""
+    query = (item["code"], item["cloth"], item["type"], item["size"])
+    if not all(isinstance(value, str) for value in query[:3]):
+        raise ValueError("code, cloth and type must be strings")
+    size = query[3]
+    if isinstance(size, bool) or not isinstance(size, (int, str)):
+        raise ValueError("size must be a whole number or a size label")
+    return query
+
+
+class LookupHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: a billing client reuses the connection
+    disable_nagle_algorithm = True  # headers and body are two writes; send each at once
+    lookup = None                   # set by serve()
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/rate":
+            self.send_json(404, {"error": "not found"})
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            query = (params["code"], params["cloth"], params["type"], params["size"])
+        except KeyError as e:
+            self.send_json(400, {"error": f"missing parameter {e.args[0]}"})
+            return
+        rate = self.lookup.rate(*query)
+        if rate is None:
+            self.send_json(404, {"error": "no such rate"})
+        else:
+            self.send_json(200, {"rate": rate})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/rates":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if not 0 <= length <= MAX_BODY:
+                raise ValueError(f"Content-Length must be between 0 and {MAX_BODY}")
+            items = json.loads(self.rfile.read(length))
+            if not isinstance(items, list) or len(items) > MAX_BATCH:
+                raise ValueError(f"expected a list of at most {MAX_BATCH} queries")
+            queries = [query_of(item) for item in items]
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_json(200, {"rates": self.lookup.rates(queries)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(db_path, host="127.0.0.1", port=DEFAULT_PORT):
+    LookupHandler.lookup = RateLookup(db_path)
+    server = ThreadingHTTPServer((host, port), LookupHandler)
+    print(f"Serving rates from {db_path} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        LookupHandler.lookup.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Look up rates, or serve them as JSON over HTTP.")
+    parser.add_argument("query", nargs="*", metavar="CODE CLOTH TYPE SIZE")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default="price_lists.db")
+    args = parser.parse_args(argv[1:])
+    if not os.path.exists(args.db):
+        parser.error(f"no price list store at {args.db}")
+
+    if args.serve:
+        serve(args.db, args.host, args.port)
+        return 0
+    if len(args.query) != 4:
+        parser.error("give code, cloth, type and size, or --serve")
+    lookup = RateLookup(args.db)
+    try:
+        rate = lookup.rate(*args.query)
+    finally:
+        lookup.close()
+    if rate is None:
+        print("no such rate")
+        return 1
+    print(rate)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
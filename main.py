@@ -1,29 +1,129 @@
+import time
+STARTED = time.perf_counter()   # as early as possible, for --startup-time
+
+import argparse
+import os
 import sys
+import sqlite3
+import weakref
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QScrollArea,
     QSizePolicy, QTableWidgetItem, 
     QToolButton, QHeaderView, QTableWidget,
-    QInputDialog, QMessageBox, QDateEdit, QDialog
+    QInputDialog, QMessageBox, QDateEdit, QDialog, QStackedWidget,
+    QTableView, QAbstractItemView, QFileDialog,
+    QComboBox, QSpinBox, QDoubleSpinBox, QGridLayout
 )
-from PyQt5.QtGui import QIcon, QPainter, QFont, QPixmap
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QRect, QDate
-from PyQt5.QtPrintSupport import QPrinter, QPrintPreviewDialog, QPrintDialog
-
-LOGO_FILE = "media/logo.png" 
-LOGO_WIDTH_MM = 45 
-LOGO_HEIGHT_MM = 35 
+from PyQt5.QtGui import QIcon, QFont
+from PyQt5.QtCore import Qt, QTimer, QObject, QEvent, pyqtSignal, QDate
+from models import (Catalog, PriceList, Cloth, ClothType, SizeGrid, apply_grid, format_rate, parse_rate,
+                    parse_size, parse_grid, iter_tree, types_in)
+from catalog_view import CatalogView
+from storage import PriceListStore, SaveConflict
+from journal import Journal
+from undo import UndoStack
+from change_tracker import ChangeTracker
+from jobs import JobStatus, Snapshot
+from navigator import PriceListCursor
+from render import LayoutCache, load_logo
+from importer import CsvImporter
+from exporter import export_rows
+from search_index import PriceListSearchIndex, CatalogContentIndex, parse_query
+from search_view import RowTableModel, RowSubsetProxyModel
+
+SEARCH_DEBOUNCE_MS = 150
+CONTENT_SEARCH_LIMIT = 1000
+REPRICE_PREVIEW_ROWS = 5000
+DB_FILE = "price_lists.db"
+JOURNAL_FILE = "price_lists.journal"
+DEFAULT_GRID = "Standard 20–44"
+DEFAULT_SIZES = [20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44]
+COLUMN_LAYOUT_MS = 16    # one column layout pass per frame at most
+STARTUP_BUDGET_MS = 500   # window up and painted, for --startup-time
+RELEASE_COLLAPSED = False # drop the tables of collapsed sections instead of hiding them
+
+_node_widgets = weakref.WeakValueDictionary() # model uid -> widget showing it
+
+def widget_for(node):
+    return _node_widgets.get(node.uid)
+
+def remove_node_widget(widget):
+    for node in iter_tree(widget.model):
+        _node_widgets.pop(node.uid, None)
+    widget.setParent(None)
+    widget.deleteLater()
+
+def section_summary(types):
+    """Size range and lowest/highest rate of some types, for a collapsed section."""
+    filled = [t for t in types if t.sizes]
+    if not filled:
+        return "no sizes"
+    grids = {t.grid for t in filled}
+    grid = grids.pop() if len(grids) == 1 else None
+    if grid is not None and grid.labels:
+        low_size, high_size = grid.labels[0], grid.labels[-1]
+    else:
+        low_size = min(min(t.sizes) for t in filled)
+        high_size = max(max(t.sizes) for t in filled)
+    low_rate = min(min(t.rates) for t in filled)
+    high_rate = max(max(t.rates) for t in filled)
+    return (f"sizes {low_size}–{high_size} · "
+            f"rates {format_rate(low_rate)}–{format_rate(high_rate)}")
+
+class ColumnLayoutPass:
+    """Sizes the columns of every type table that asked for it, in one pass per frame.
+
+    Resizing the window or a burst of edits only queues the type widgets;
+    the pass then skips tables that are not on screen (collapsed sections
+    catch up when shown) and decides stretch or fixed once per column count
+    and width.
+    """
+
+    def __init__(self, interval=COLUMN_LAYOUT_MS):
+        self.interval = interval
+        self._pending = weakref.WeakSet()
+        self._timer = None
+
+    def schedule(self, type_widget):
+        self._pending.add(type_widget)
+        if self._timer is None:
+            self._timer = QTimer()
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self.run)
+        if not self._timer.isActive():
+            self._timer.start(self.interval)
+
+    def run(self):
+        pending, self._pending = self._pending, weakref.WeakSet()
+        stretch_for = {}    # (column count, viewport width) -> stretch
+        for type_widget in pending:
+            table = type_widget.table
+            if table is None or not table.isVisible():
+                continue
+            ncols = table.columnCount()
+            key = (ncols, table.viewport().width())
+            stretch = stretch_for.get(key)
+            if stretch is None:
+                stretch = stretch_for[key] = ncols * type_widget.base_col_width <= key[1]
+            type_widget.adjust_column_sizes(stretch)
+
+column_layout = ColumnLayoutPass()
 
 class TypeWidget(QWidget):
-    modification_started = pyqtSignal()
 
-    def __init__(self, sizes, parent=None):
+    def __init__(self, sizes, parent=None, model=None):
         super().__init__(parent)
-        self.sizes = list(sizes) 
+        self.model = model if model is not None else ClothType(sizes)
+        _node_widgets[self.model.uid] = self
         self.base_col_width = 100 
+        self.readonly = False
+        self.table = None           # built on first expand
+        self.content_widget = None
+        self.column_state = None    # (column count, stretched) last applied to the table
 
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(6, 6, 6, 6)
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setContentsMargins(6, 6, 6, 6)
 
         top_row = QHBoxLayout()
         top_row.setSpacing(6)
@@ -34,9 +134,12 @@ class TypeWidget(QWidget):
         self.toggle_btn.setChecked(False)
         self.toggle_btn.clicked.connect(self.toggle_table)
 
-        self.type_edit = QLineEdit()
+        self.type_edit = QLineEdit(self.model.name)
         self.type_edit.setPlaceholderText("Type Name")
-        self.type_edit.textChanged.connect(self.modification_started.emit) 
+        self.type_edit.textChanged.connect(self.on_name_changed) 
+
+        self.summary_label = QLabel()
+        self.summary_label.setObjectName("summary_label")
 
         self.delete_btn = QToolButton()
         self.delete_btn.setIcon(QIcon("media/delete.png"))
@@ -44,31 +147,30 @@ class TypeWidget(QWidget):
 
         top_row.addWidget(self.toggle_btn) 
         top_row.addWidget(self.type_edit)
+        top_row.addWidget(self.summary_label)
         top_row.addStretch()
         top_row.addWidget(self.delete_btn)
-        layout.addLayout(top_row)
+        self.main_layout.addLayout(top_row)
+        self.main_layout.addStretch()
+        self.update_summary()
 
+    def build_content(self):
         self.content_widget = QWidget()
         content_layout = QVBoxLayout(self.content_widget)
         content_layout.setContentsMargins(20, 0, 0, 0)
         table_and_buttons_layout = QHBoxLayout()
         table_and_buttons_layout.setSpacing(6)
 
-        self.table = QTableWidget(2, len(self.sizes))
+        self.table = QTableWidget(2, len(self.model.sizes))
         self.table.setVerticalHeaderLabels(["Size", "Rate"])
         self.table.horizontalHeader().setVisible(False)
         self.table.verticalHeader().setDefaultSectionSize(30)
         self.table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         self.table.setFixedHeight(self.table.verticalHeader().length() + self.table.horizontalHeader().height() + self.table.frameWidth() * 2)
-        self.table.itemChanged.connect(lambda: self.modification_started.emit()) 
-
-        for col, size in enumerate(self.sizes):
-            size_item = QTableWidgetItem(str(size))
-            size_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(0, col, size_item)
-            rate_item = QTableWidgetItem("0.0")
-            rate_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(1, col, rate_item)
+
+        for col in range(len(self.model.sizes)):
+            self.set_column_items(col)
+        self.table.itemChanged.connect(self.on_item_changed) 
         
         btn_col = QVBoxLayout()
         btn_col.setSpacing(0)
@@ -83,83 +185,192 @@ class TypeWidget(QWidget):
         table_and_buttons_layout.addWidget(self.table)
         table_and_buttons_layout.addLayout(btn_col)
         content_layout.addLayout(table_and_buttons_layout)
-        
-        layout.addWidget(self.content_widget)
-        layout.addStretch()
-
-        self.toggle_btn.setChecked(True)
-        self.toggle_btn.setArrowType(Qt.DownArrow)
-        self.content_widget.setVisible(True)
+        self.main_layout.insertWidget(1, self.content_widget)
 
         self.add_size_btn.clicked.connect(self.add_size)
         self.remove_size_btn.clicked.connect(self.remove_size)
-        
-        self.modification_started.emit()
+        self.apply_readonly_state()
+
+    def release_content(self):
+        self.content_widget.setParent(None)
+        self.content_widget.deleteLater()
+        self.content_widget = None
+        self.table = None
+        self.column_state = None
 
     def toggle_table(self):
         expanded = self.toggle_btn.isChecked()
         self.toggle_btn.setArrowType(Qt.DownArrow if expanded else Qt.RightArrow)
-        self.content_widget.setVisible(expanded)
+        if expanded and self.content_widget is None:
+            self.build_content()
+        if self.content_widget is not None:
+            if not expanded and RELEASE_COLLAPSED:
+                self.release_content()
+            else:
+                self.content_widget.setVisible(expanded)
+        self.summary_label.setVisible(not expanded)
+        self.update_summary()
+        if expanded:
+            column_layout.schedule(self)
+
+    def expand(self):
+        if not self.toggle_btn.isChecked():
+            self.toggle_btn.setChecked(True)
+            self.toggle_table()
 
-    def adjust_column_sizes(self):
-        header = self.table.horizontalHeader()
+    def update_summary(self):
+        if not self.toggle_btn.isChecked():
+            self.summary_label.setText(section_summary([self.model]))
+
+    def set_column_items(self, col):
+        size_item = QTableWidgetItem(self.model.size_label(col))
+        size_item.setTextAlignment(Qt.AlignCenter)
+        self.table.setItem(0, col, size_item)
+        rate_item = QTableWidgetItem(format_rate(self.model.rates[col]))
+        rate_item.setTextAlignment(Qt.AlignCenter)
+        self.table.setItem(1, col, rate_item)
+
+    def on_name_changed(self, text):
+        self.model.set_name(text)
+
+    def sync_change(self, change):
+        """Shows a change made to the model from outside this widget."""
+        kind = change[0]
+        if kind == "name":
+            self.type_edit.blockSignals(True)
+            self.type_edit.setText(self.model.name)
+            self.type_edit.blockSignals(False)
+            return
+        self.update_summary()
+        if self.table is None:
+            return
+        self.table.blockSignals(True)
+        if kind in ("size", "rate"):
+            self.set_column_items(change[1])
+        elif kind == "rates":
+            for col in range(self.table.columnCount()):
+                self.set_column_items(col)
+        elif kind == "sizes":
+            self.table.setColumnCount(len(self.model.sizes))
+            for col in range(len(self.model.sizes)):
+                self.set_column_items(col)
+            column_layout.schedule(self)
+        elif kind == "append_size":
+            col = self.table.columnCount()
+            self.table.insertColumn(col)
+            self.set_column_items(col)
+            column_layout.schedule(self)
+        elif kind == "pop_size":
+            self.table.removeColumn(self.table.columnCount() - 1)
+            column_layout.schedule(self)
+        self.table.blockSignals(False)
+
+    def refresh_from_model(self):
+        self.type_edit.blockSignals(True)
+        self.type_edit.setText(self.model.name)
+        self.type_edit.blockSignals(False)
+        self.update_summary()
+        if self.table is None:
+            return
+        self.table.blockSignals(True)
+        self.table.setColumnCount(len(self.model.sizes))
+        for col in range(len(self.model.sizes)):
+            self.set_column_items(col)
+        self.table.blockSignals(False)
+
+    def on_item_changed(self, item):
+        col = item.column()
+        if item.row() == 0:
+            value = parse_size(item.text())
+            if value is not None:
+                self.model.set_size(col, value)
+            current = self.model.size_label(col)
+        else:
+            value = parse_rate(item.text())
+            if value is not None:
+                self.model.set_rate(col, value)
+            current = format_rate(self.model.rates[col])
+        if value is None:
+            # Not a number: put back the value the model still holds.
+            self.table.blockSignals(True)
+            item.setText(current)
+            self.table.blockSignals(False)
+
+    def adjust_column_sizes(self, stretch=None):
+        """Stretches the columns to fill the table, or fixes them at base_col_width if they don't fit."""
+        if self.table is None:
+            return
         ncols = self.table.columnCount()
         total_req = ncols * self.base_col_width
-        viewport_w = self.table.viewport().width()
-        if total_req <= viewport_w:
+        if stretch is None:
+            stretch = total_req <= self.table.viewport().width()
+        if self.column_state == (ncols, stretch):
+            return
+        self.column_state = (ncols, stretch)
+        header = self.table.horizontalHeader()
+        if stretch:
             header.setSectionResizeMode(QHeaderView.Stretch)
         else:
             header.setSectionResizeMode(QHeaderView.Fixed)
-        for col in range(ncols):
-            self.table.setColumnWidth(col, self.base_col_width)
+            for col in range(ncols):
+                self.table.setColumnWidth(col, self.base_col_width)
         self.table.setMinimumWidth(total_req)
 
     def add_size(self):
-        self.modification_started.emit()
-        new_size = (max(self.sizes) + 2) if self.sizes else 20
-        self.sizes.append(new_size)
+        self.model.append_size(self.model.next_size())
         col = self.table.columnCount()
         self.table.insertColumn(col)
-        size_item = QTableWidgetItem(str(new_size))
-        size_item.setTextAlignment(Qt.AlignCenter)
-        self.table.setItem(0, col, size_item)
-        rate_item = QTableWidgetItem("0.0")
-        rate_item.setTextAlignment(Qt.AlignCenter)
-        self.table.setItem(1, col, rate_item)
-        QTimer.singleShot(0, self.adjust_column_sizes)
+        self.table.blockSignals(True)
+        self.set_column_items(col)
+        self.table.blockSignals(False)
+        column_layout.schedule(self)
 
     def remove_size(self):
-        if not self.sizes:
+        if not self.model.sizes:
             return
-        self.modification_started.emit()
-        self.sizes.pop()
+        self.model.pop_size()
         last_col = self.table.columnCount() - 1
         if last_col >= 0:
             self.table.removeColumn(last_col)
         self.table.setMinimumWidth(0)
-        QTimer.singleShot(0, self.adjust_column_sizes)
+        column_layout.schedule(self)
     
     def set_readonly_state(self, readonly=True):
+        self.readonly = readonly
         self.type_edit.setReadOnly(readonly)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers if readonly else QTableWidget.AllEditTriggers)
-        self.add_size_btn.setEnabled(not readonly)
-        self.remove_size_btn.setEnabled(not readonly)
         self.delete_btn.setEnabled(not readonly) 
+        self.apply_readonly_state()
+
+    def apply_readonly_state(self):
+        if self.table is None:
+            return
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers if self.readonly else QTableWidget.AllEditTriggers)
+        self.add_size_btn.setEnabled(not self.readonly)
+        self.remove_size_btn.setEnabled(not self.readonly)
 
     def delete_self(self):
-        self.setParent(None)
-        self.deleteLater()
+        self.model.detach()
+        remove_node_widget(self)
 
     def resizeEvent(self, e):
         super().resizeEvent(e)
-        QTimer.singleShot(0, self.adjust_column_sizes)
+        if self.table is not None and self.toggle_btn.isChecked():
+            column_layout.schedule(self)
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        if self.table is not None and self.toggle_btn.isChecked():
+            column_layout.schedule(self)
 
 class ClothWidget(QWidget):
-    modification_started = pyqtSignal()
 
-    def __init__(self, sizes, parent=None):
+    def __init__(self, sizes, parent=None, model=None):
         super().__init__(parent)
         self.sizes = sizes
+        self.model = model if model is not None else Cloth()
+        _node_widgets[self.model.uid] = self
+        self.readonly = False
+        self.populated = False      # type widgets are made on first expand
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setSpacing(10)
         self.main_layout.setContentsMargins(6, 6, 6, 6)
@@ -173,15 +384,18 @@ class ClothWidget(QWidget):
         self.toggle_btn.setChecked(False)
         self.toggle_btn.clicked.connect(self.toggle_types)
 
-        self.name_edit = QLineEdit()
+        self.name_edit = QLineEdit(self.model.name)
         self.name_edit.setPlaceholderText("Cloth name")
         self.name_edit.setFixedWidth(360) 
-        self.name_edit.textChanged.connect(self.modification_started.emit) 
+        self.name_edit.textChanged.connect(self.on_name_changed) 
 
         self.add_type_btn = QPushButton("✚ Add Type")
         self.add_type_btn.setObjectName("add_type_btn")
         self.add_type_btn.clicked.connect(self.add_type_table)
 
+        self.summary_label = QLabel()
+        self.summary_label.setObjectName("summary_label")
+
         self.delete_btn = QToolButton()
         self.delete_btn.setIcon(QIcon("media/delete.png"))
         self.delete_btn.setObjectName("delete_btn")
@@ -190,6 +404,7 @@ class ClothWidget(QWidget):
         top_layout.addWidget(self.toggle_btn)
         top_layout.addWidget(self.name_edit)
         top_layout.addWidget(self.add_type_btn)
+        top_layout.addWidget(self.summary_label)
         top_layout.addStretch()
         top_layout.addWidget(self.delete_btn)
         self.main_layout.addLayout(top_layout)
@@ -198,47 +413,100 @@ class ClothWidget(QWidget):
         self.type_layout = QVBoxLayout(self.content_widget)
         self.type_layout.setContentsMargins(30, 0, 0, 0)
         self.type_layout.setSpacing(6)
+        self.content_widget.setVisible(False)
 
         self.main_layout.addWidget(self.content_widget)
+        self.update_summary()
 
-        self.toggle_btn.setChecked(True)
-        self.toggle_btn.setArrowType(Qt.DownArrow)
-        self.content_widget.setVisible(True)
+    def on_name_changed(self, text):
+        self.model.set_name(text)
 
     def toggle_types(self):
         expanded = self.toggle_btn.isChecked()
         self.toggle_btn.setArrowType(Qt.DownArrow if expanded else Qt.RightArrow)
+        if expanded and not self.populated:
+            self.populate()
+        elif not expanded and self.populated and RELEASE_COLLAPSED:
+            self.release_types()
         self.content_widget.setVisible(expanded)
+        self.summary_label.setVisible(not expanded)
+        self.update_summary()
 
-    def add_type_table(self):
-        self.modification_started.emit()
-        type_widget = TypeWidget(self.sizes, parent=self)
-        self.type_layout.addWidget(type_widget)
-        type_widget.modification_started.connect(self.modification_started.emit)
+    def expand(self):
         if not self.toggle_btn.isChecked():
             self.toggle_btn.setChecked(True)
             self.toggle_types()
 
+    def populate(self):
+        self.populated = True
+        for cloth_type in self.model.types:
+            self.add_type_widget(cloth_type)
+
+    def release_types(self):
+        self.populated = False
+        for type_widget in self.type_widgets():
+            remove_node_widget(type_widget)
+
+    def type_widgets(self):
+        widgets = (self.type_layout.itemAt(i).widget() for i in range(self.type_layout.count()))
+        return [w for w in widgets if w is not None]
+
+    def update_summary(self):
+        if not self.toggle_btn.isChecked():
+            types = self.model.types
+            count = f"{len(types)} type" if len(types) == 1 else f"{len(types)} types"
+            self.summary_label.setText(f"{count} · {section_summary(types)}")
+
+    def add_type_table(self):
+        self.expand()
+        self.add_type_widget(self.model.add_type(ClothType(self.sizes))).expand()
+
+    def sync_change(self, change):
+        if change[0] == "name":
+            self.name_edit.blockSignals(True)
+            self.name_edit.setText(self.model.name)
+            self.name_edit.blockSignals(False)
+
+    def refresh_from_model(self, changed):
+        if self.model in changed:
+            self.name_edit.blockSignals(True)
+            self.name_edit.setText(self.model.name)
+            self.name_edit.blockSignals(False)
+        self.update_summary()
+        for type_widget in self.type_widgets():
+            if type_widget.model in changed:
+                type_widget.refresh_from_model()
+
+    def add_type_widget(self, cloth_type, index=-1):
+        if not self.populated:
+            # Made along with the others when the cloth is expanded.
+            self.update_summary()
+            return None
+        type_widget = TypeWidget(self.sizes, parent=self, model=cloth_type)
+        type_widget.set_readonly_state(self.readonly)
+        self.type_layout.insertWidget(index, type_widget)
+        return type_widget
+
     def set_readonly_state(self, readonly=True):
+        self.readonly = readonly
         self.name_edit.setReadOnly(readonly)
         self.add_type_btn.setEnabled(not readonly)
         self.delete_btn.setEnabled(not readonly)  
-        for i in range(self.type_layout.count()):
-            type_widget = self.type_layout.itemAt(i).widget()
-            if type_widget:
-                type_widget.set_readonly_state(readonly)
+        for type_widget in self.type_widgets():
+            type_widget.set_readonly_state(readonly)
 
     def delete_self(self):
-        self.setParent(None)
-        self.deleteLater()
+        self.model.detach()
+        remove_node_widget(self)
 
 class PriceListWidget(QWidget):
     selected = pyqtSignal(QWidget)
-    modification_started = pyqtSignal()
 
-    def __init__(self, sizes, parent=None):
+    def __init__(self, sizes, parent=None, model=None):
         super().__init__(parent)
         self.sizes = sizes
+        self.model = model if model is not None else PriceList()
+        _node_widgets[self.model.uid] = self
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(6, 6, 6, 6)
         self.main_layout.setSpacing(10)
@@ -252,13 +520,13 @@ class PriceListWidget(QWidget):
         self.toggle_btn.setChecked(False)
         self.toggle_btn.clicked.connect(self.toggle_content)
 
-        self.name_edit = QLineEdit()
+        self.name_edit = QLineEdit(self.model.name)
         self.name_edit.setPlaceholderText("Price List name")
         self.name_edit.setFixedWidth(800)
         self.name_edit.setObjectName("price_list_name_edit")
         self.name_edit.setCursor(Qt.PointingHandCursor)
         self.name_edit.setReadOnly(False) 
-        self.name_edit.textChanged.connect(self.modification_started.emit) 
+        self.name_edit.textChanged.connect(self.on_name_changed) 
         self.name_edit.mousePressEvent = self.on_select
         
         self.add_cloth_btn = QPushButton("✚ Add Cloth")
@@ -279,11 +547,17 @@ class PriceListWidget(QWidget):
         self.cloth_layout.setSpacing(6)
         
         self.main_layout.addWidget(self.content_widget)
+
+        for cloth in self.model.cloths:
+            self.add_cloth(cloth)
         
         self.toggle_btn.setChecked(True)
         self.toggle_btn.setArrowType(Qt.DownArrow)
         self.content_widget.setVisible(True)
 
+    def on_name_changed(self, text):
+        self.model.set_name(text)
+
     def on_select(self, event):
         self.selected.emit(self)
         QLineEdit.mousePressEvent(self.name_edit, event)
@@ -298,15 +572,36 @@ class PriceListWidget(QWidget):
         expanded = self.toggle_btn.isChecked()
         self.toggle_btn.setArrowType(Qt.DownArrow if expanded else Qt.RightArrow)
         self.content_widget.setVisible(expanded)
-        
-    def add_cloth_widget(self):
-        self.modification_started.emit()
-        cloth_widget = ClothWidget(self.sizes, parent=self)
-        self.cloth_layout.addWidget(cloth_widget)
-        cloth_widget.modification_started.connect(self.modification_started.emit) 
+
+    def expand(self):
         if not self.toggle_btn.isChecked():
             self.toggle_btn.setChecked(True)
             self.toggle_content()
+        
+    def add_cloth_widget(self):
+        self.add_cloth(self.model.add_cloth(Cloth())).expand()
+        self.expand()
+
+    def sync_change(self, change):
+        if change[0] == "name":
+            self.name_edit.blockSignals(True)
+            self.name_edit.setText(self.model.name)
+            self.name_edit.blockSignals(False)
+
+    def refresh_from_model(self, changed):
+        if self.model in changed:
+            self.name_edit.blockSignals(True)
+            self.name_edit.setText(self.model.name)
+            self.name_edit.blockSignals(False)
+        for i in range(self.cloth_layout.count()):
+            cloth_widget = self.cloth_layout.itemAt(i).widget()
+            if cloth_widget:
+                cloth_widget.refresh_from_model(changed)
+
+    def add_cloth(self, cloth, index=-1):
+        cloth_widget = ClothWidget(self.sizes, parent=self, model=cloth)
+        self.cloth_layout.insertWidget(index, cloth_widget)
+        return cloth_widget
 
     def set_readonly_state(self, readonly=True):
         self.name_edit.setReadOnly(readonly)
@@ -321,8 +616,8 @@ class PriceListWidget(QWidget):
                                      f"Are you sure you want to delete '{self.name_edit.text()}'?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.setParent(None)
-            self.deleteLater()
+            self.model.detach()
+            remove_node_widget(self)
 
 class SearchPriceListDialog(QDialog):
     price_list_selected = pyqtSignal(str, str, str) # date, code, name
@@ -347,11 +642,23 @@ class SearchPriceListDialog(QDialog):
         layout.addLayout(filter_layout)
 
         # Table
-        self.table = QTableWidget(0, 3)
-        self.table.setHorizontalHeaderLabels(["Date", "Code", "Name"])
+        self.table_model = RowTableModel(parent=self)
+        self.proxy_model = RowSubsetProxyModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.proxy_model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         layout.addWidget(self.table)
 
+        # Filtering waits until typing pauses instead of running per keystroke.
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.filter_table)
+
         # Close button
         #btn_layout = QHBoxLayout()
         #self.close_btn = QPushButton("Close")
@@ -363,50 +670,272 @@ class SearchPriceListDialog(QDialog):
         self.load_data()
 
         # Connect filters
-        self.code_filter.textChanged.connect(self.filter_table)
-        self.name_filter.textChanged.connect(self.filter_table)
+        self.code_filter.textChanged.connect(self.filter_timer.start)
+        self.name_filter.textChanged.connect(self.filter_timer.start)
         self.table.doubleClicked.connect(self.select_price_list) 
 
 
     def load_data(self):
-        self.data = []
-        for i in range(self.price_list_manager.price_list_layout.count() - 1):
-            widget = self.price_list_manager.price_list_layout.itemAt(i).widget()
-            if widget:
-                self.data.append({
-                    "date": widget.date_edit.date().toString("yyyy-MM-dd") if hasattr(widget, "date_edit") else "", # Date is blank here
-                    "code": widget.code_edit.text() if hasattr(widget, "code_edit") else "", # Code is blank here
-                    "name": widget.name_edit.text()
-                })
+        price_lists = self.price_list_manager.catalog.price_lists
+        self.table_model.rows = [(pl.date.isoformat(), pl.code, pl.name) for pl in price_lists]
+        self.search_index = PriceListSearchIndex((pl.code for pl in price_lists),
+                                                 (pl.name for pl in price_lists))
+        self.proxy_model.setSourceModel(self.table_model)
         self.filter_table()
 
     def filter_table(self):
-        code_text = self.code_filter.text().lower()
-        name_text = self.name_filter.text().lower()
-
-        self.table.setRowCount(0)
-        for entry in self.data:
-            if code_text in entry["code"].lower() and name_text in entry["name"].lower():
-                row = self.table.rowCount()
-                self.table.insertRow(row)
-                self.table.setItem(row, 0, QTableWidgetItem(entry["date"]))
-                self.table.setItem(row, 1, QTableWidgetItem(entry["code"]))
-                self.table.setItem(row, 2, QTableWidgetItem(entry["name"]))
+        self.filter_timer.stop()
+        rows = self.search_index.search(self.code_filter.text(), self.name_filter.text())
+        self.proxy_model.set_rows(rows)
 
     def select_price_list(self):
-        selected_row = self.table.currentRow()
-        if selected_row >= 0:
-            date = self.table.item(selected_row, 0).text()
-            code = self.table.item(selected_row, 1).text()
-            name = self.table.item(selected_row, 2).text()
+        current = self.proxy_model.mapToSource(self.table.currentIndex())
+        if current.isValid():
+            date, code, name = self.table_model.rows[current.row()]
             
             self.price_list_selected.emit(date, code, name)
             
             self.accept() 
 
+class ContentSearchDialog(QDialog):
+    result_selected = pyqtSignal(object) # Cloth or ClothType
+    def __init__(self, content_index, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Find in Price Lists")
+        self.resize(800, 400)
+        self.content_index = content_index
+        self.results = []
+
+        layout = QVBoxLayout(self)
+
+        query_layout = QHBoxLayout()
+        query_layout.addWidget(QLabel("Find:"))
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("cloth or type name, size:36, rate>400")
+        query_layout.addWidget(self.query_edit)
+        layout.addLayout(query_layout)
+
+        self.table_model = RowTableModel(headers=("Price List", "Cloth", "Type", "Match"), parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+
+        self.query_edit.textChanged.connect(self.search_timer.start)
+        self.query_edit.returnPressed.connect(self.run_search)
+        self.table.doubleClicked.connect(self.select_result)
+
+    def run_search(self):
+        self.search_timer.stop()
+        query = self.query_edit.text()
+        self.results = self.content_index.search(query, limit=CONTENT_SEARCH_LIMIT + 1)
+        more = len(self.results) > CONTENT_SEARCH_LIMIT
+        del self.results[CONTENT_SEARCH_LIMIT:]
+        self.table_model.set_rows(self.describe(node, query) for node in self.results)
+        count = f"{CONTENT_SEARCH_LIMIT}+" if more else str(len(self.results))
+        self.status_label.setText(f"{count} matches" if query.strip() else "")
+
+    def describe(self, node, query):
+        if isinstance(node, Cloth):
+            return (node.price_list.name, node.name, "", f"{len(node.types)} types")
+        cloth = node.cloth
+        _, size, rate_tests = parse_query(query)
+        cols = [i for i, s in enumerate(node.sizes) if size is None or s == size]
+        if rate_tests:
+            cols = [i for i in cols if all(test(node.rates[i], value) for test, value in rate_tests)]
+        match = ", ".join(f"{node.size_label(i)}: {format_rate(node.rates[i])}" for i in cols[:6])
+        if len(cols) > 6:
+            match += ", …"
+        return (cloth.price_list.name, cloth.name, node.name, match)
+
+    def select_result(self, index):
+        if index.isValid():
+            self.result_selected.emit(self.results[index.row()])
+
+class RepriceDialog(QDialog):
+    def __init__(self, catalog, price_list=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Reprice")
+        self.resize(800, 500)
+        self.plan = None
+
+        layout = QVBoxLayout(self)
+        form = QGridLayout()
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItem("Whole catalog", catalog)
+        if price_list is not None:
+            self.scope_combo.addItem(f"Price list: {price_list.name}", price_list)
+            for cloth in price_list.cloths:
+                self.scope_combo.addItem(f"Cloth: {cloth.name}", cloth)
+            self.scope_combo.setCurrentIndex(1)
+        self.min_size_spin = QSpinBox()
+        self.max_size_spin = QSpinBox()
+        for spin, value in ((self.min_size_spin, 0), (self.max_size_spin, 0xFFFF)):
+            spin.setRange(0, 0xFFFF)
+            spin.setValue(value)
+        self.percent_spin = QDoubleSpinBox()
+        self.percent_spin.setRange(-100, 1000)
+        self.percent_spin.setSuffix(" %")
+        self.step_spin = QDoubleSpinBox()
+        self.step_spin.setRange(-1e6, 1e6)
+        self.rounding_combo = QComboBox()
+        from reprice import ROUNDING   # with NumPy, loaded when first needed
+        for key, label in ROUNDING.items():
+            self.rounding_combo.addItem(label, key)
+
+        size_layout = QHBoxLayout()
+        size_layout.addWidget(self.min_size_spin)
+        size_layout.addWidget(QLabel("to"))
+        size_layout.addWidget(self.max_size_spin)
+        for row, (label, field) in enumerate((("Apply to:", self.scope_combo), ("Sizes:", size_layout),
+                                              ("Change by:", self.percent_spin), ("Then add:", self.step_spin),
+                                              ("Round:", self.rounding_combo))):
+            form.addWidget(QLabel(label), row, 0)
+            if isinstance(field, QHBoxLayout):
+                form.addLayout(field, row, 1)
+            else:
+                form.addWidget(field, row, 1)
+        layout.addLayout(form)
+
+        self.table_model = RowTableModel(headers=("Price List", "Cloth", "Type", "Size", "Old Rate", "New Rate"),
+                                         parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        btn_layout = QHBoxLayout()
+        self.preview_btn = QPushButton("Preview")
+        self.apply_btn = QPushButton("Apply")
+        self.apply_btn.setEnabled(False)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.preview_btn)
+        btn_layout.addWidget(self.apply_btn)
+        layout.addLayout(btn_layout)
+
+        self.preview_btn.clicked.connect(self.preview)
+        self.apply_btn.clicked.connect(self.accept)
+        for field in (self.scope_combo, self.rounding_combo):
+            field.currentIndexChanged.connect(self.clear_preview)
+        for field in (self.min_size_spin, self.max_size_spin, self.percent_spin, self.step_spin):
+            field.valueChanged.connect(self.clear_preview)
+
+    def clear_preview(self):
+        self.plan = None
+        self.apply_btn.setEnabled(False)
+
+    def preview(self):
+        from reprice import RepricePlan
+        self.plan = RepricePlan(self.scope_combo.currentData(), self.percent_spin.value(), self.step_spin.value(),
+                                self.rounding_combo.currentData(),
+                                self.min_size_spin.value(), self.max_size_spin.value())
+        rows = []
+        for cloth_type, col, size, old, new in self.plan.rows(REPRICE_PREVIEW_ROWS):
+            cloth = cloth_type.cloth
+            rows.append((cloth.price_list.name, cloth.name, cloth_type.name, str(size),
+                         format_rate(old), format_rate(new)))
+        self.table_model.set_rows(rows)
+        status = f"{len(self.plan)} rates will change"
+        if len(self.plan) > REPRICE_PREVIEW_ROWS:
+            status += f" (showing the first {REPRICE_PREVIEW_ROWS})"
+        self.status_label.setText(status)
+        self.apply_btn.setEnabled(len(self.plan) > 0)
+
+class SizeGridDialog(QDialog):
+    """Creates or changes a size grid and optionally moves a part of the catalog onto it."""
+
+    def __init__(self, catalog, price_list=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Size Grids")
+        self.resize(560, 0)
+        self.grid = None
+        self.scope = None
+
+        layout = QVBoxLayout(self)
+        form = QGridLayout()
+        self.grid_combo = QComboBox()
+        for grid in catalog.grids.values():
+            self.grid_combo.addItem(grid.name, grid)
+        self.grid_combo.addItem("New grid…", None)
+        self.name_edit = QLineEdit()
+        self.sizes_edit = QLineEdit()
+        self.sizes_edit.setPlaceholderText("20-34/2  or  20, 22, 24  or  S, M, L, XL")
+        self.usage_label = QLabel()
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItem("Only save the grid", None)
+        self.scope_combo.addItem("Whole catalog", catalog)
+        if price_list is not None:
+            self.scope_combo.addItem(f"Price list: {price_list.name}", price_list)
+            for cloth in price_list.cloths:
+                self.scope_combo.addItem(f"Cloth: {cloth.name}", cloth)
+
+        for row, (label, field) in enumerate((("Grid:", self.grid_combo), ("Name:", self.name_edit),
+                                              ("Sizes:", self.sizes_edit), ("", self.usage_label),
+                                              ("Apply to:", self.scope_combo))):
+            form.addWidget(QLabel(label), row, 0)
+            form.addWidget(field, row, 1)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        self.ok_btn = QPushButton("OK")
+        self.cancel_btn = QPushButton("Cancel")
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.ok_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        layout.addLayout(btn_layout)
+
+        self.grid_combo.currentIndexChanged.connect(self.show_grid)
+        self.ok_btn.clicked.connect(self.accept)
+        self.cancel_btn.clicked.connect(self.reject)
+        self.show_grid()
+
+    def show_grid(self):
+        grid = self.grid_combo.currentData()
+        self.name_edit.setText(grid.name if grid is not None else "")
+        self.sizes_edit.setText(grid.describe() if grid is not None else "")
+        if grid is None:
+            self.usage_label.setText("")
+        else:
+            count = sum(1 for t in grid.types if t.root() is not None)
+            self.usage_label.setText(f"Used by {count} types; changing the sizes changes all of them.")
+
+    def accept(self):
+        name = self.name_edit.text().strip()
+        if not name:
+            QMessageBox.warning(self, "Size Grids", "Give the grid a name.")
+            return
+        try:
+            self.sizes, self.labels = parse_grid(self.sizes_edit.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Size Grids", str(e))
+            return
+        self.name = name
+        self.grid = self.grid_combo.currentData()
+        self.scope = self.scope_combo.currentData()
+        super().accept()
+
 class PriceListManager(QWidget):
     selected = pyqtSignal(QWidget)
-    modification_started = pyqtSignal()
+    first_lists_shown = pyqtSignal()
+    loaded = pyqtSignal()
 
     def __init__(self):
         super().__init__()
@@ -415,6 +944,22 @@ class PriceListManager(QWidget):
         self.main_layout = QVBoxLayout(self)
         self.setLayout(self.main_layout)
         self.buttons = {}
+        self.store = PriceListStore(DB_FILE)
+        self.catalog = Catalog()    # filled in by load_next_chunk once the window is up
+        self.journal = Journal(JOURNAL_FILE)
+        self.undo_stack = UndoStack(self.catalog)
+        self.mirror_changes = False # set while code outside the widgets edits the model
+        self.cursor = PriceListCursor(self.catalog)  # before sync_widgets: it reads the new order
+        self.catalog.listeners.append(self.sync_widgets)
+        self.content_index = CatalogContentIndex(self.catalog)
+        self.print_layouts = LayoutCache(self.catalog)
+        self.change_tracker = ChangeTracker(self.catalog, self)
+        self.change_tracker.changed.connect(self.on_catalog_changed)
+        self.editing = False
+        self.import_job = None
+        self.loader = None
+        self.load_started = True
+        self.followed = None    # the list shown while loading, until the user moves off it
 
         self.main_layout.addWidget(self.main_toolbar())
         # Price List Code and Date Field Row
@@ -439,12 +984,26 @@ class PriceListManager(QWidget):
         self.date_edit.setCalendarPopup(True)
         self.date_edit.setDate(QDate.currentDate())
         self.date_edit.setFixedWidth(150)
+        self.code_edit.textChanged.connect(self.on_code_changed)
+        self.date_edit.dateChanged.connect(self.on_date_changed)
+
+        # Order of the Top/Back/Next/Last navigation
+        self.order_label = QLabel("Order by:")
+        self.order_label.setFont(row_font)
+        self.order_combo = QComboBox()
+        self.order_combo.setFont(row_font)
+        self.order_combo.addItem("Code", "code")
+        self.order_combo.addItem("Date", "date")
+        self.order_combo.currentIndexChanged.connect(self.change_order)
 
         row_layout.addWidget(self.code_label)
         row_layout.addWidget(self.code_edit)
         row_layout.addSpacing(60)  #spacing between code and date
         row_layout.addWidget(self.date_label)
         row_layout.addWidget(self.date_edit)
+        row_layout.addSpacing(60)
+        row_layout.addWidget(self.order_label)
+        row_layout.addWidget(self.order_combo)
         row_layout.addStretch()
 
         self.main_layout.addLayout(row_layout)
@@ -453,7 +1012,16 @@ class PriceListManager(QWidget):
         self.buttons['modify_btn'].clicked.connect(self.modify_selected_price_list)
         self.readonly_mode = True
         self.buttons['search_btn'].clicked.connect(self.open_search_dialog)
+        self.buttons['find_btn'].clicked.connect(self.open_content_search)
         self.buttons['print_btn'].clicked.connect(self.show_print_preview)
+        self.buttons['import_btn'].clicked.connect(self.import_csv)
+        self.buttons['export_btn'].clicked.connect(self.export_data)
+        self.buttons['reprice_btn'].clicked.connect(self.open_reprice_dialog)
+        self.buttons['sizes_btn'].clicked.connect(self.open_size_grid_dialog)
+        self.buttons['top_btn'].clicked.connect(lambda: self.go_to(self.cursor.first()))
+        self.buttons['back_btn'].clicked.connect(lambda: self.go_to(self.cursor.previous()))
+        self.buttons['next_btn'].clicked.connect(lambda: self.go_to(self.cursor.next()))
+        self.buttons['last_btn'].clicked.connect(lambda: self.go_to(self.cursor.last()))
         self.buttons['delete_btn'].clicked.connect(self.delete_selected_price_list)
         self.buttons['exit_btn'].clicked.connect(self.close)
         
@@ -464,27 +1032,102 @@ class PriceListManager(QWidget):
         self.price_list_layout.setContentsMargins(0, 0, 0, 0)
         self.price_list_layout.addStretch()
         self.scroll_area.setWidget(self.price_list_container)
-        self.main_layout.addWidget(self.scroll_area)
+        self.catalog_view = CatalogView(self.catalog)
+        self.view_stack = QStackedWidget()
+        self.view_stack.addWidget(self.scroll_area)
+        self.view_stack.addWidget(self.catalog_view)
+        self.main_layout.addWidget(self.view_stack)
+        self.buttons['grid_btn'].clicked.connect(self.toggle_catalog_view)
 
         btn_layout = QHBoxLayout()
         self.undo_btn = QPushButton("↶\nUndo")
         self.undo_btn.setObjectName("undo_btn")
+        self.undo_btn.setShortcut("Ctrl+Z")
+        self.redo_btn = QPushButton("↷\nRedo")
+        self.redo_btn.setObjectName("redo_btn")
+        self.redo_btn.setShortcut("Ctrl+Y")
         self.save_btn = QPushButton("💾\nSave")
         self.save_btn.setObjectName("save_btn")
-        for btn in (self.undo_btn, self.save_btn):
+        for btn in (self.undo_btn, self.redo_btn, self.save_btn):
             btn.setFixedSize(120, 60)
             
         btn_layout.addWidget(self.undo_btn)
+        btn_layout.addWidget(self.redo_btn)
         btn_layout.addWidget(self.save_btn)
         btn_layout.addStretch()
         self.main_layout.addLayout(btn_layout)
+        self.jobs = JobStatus(self)
+        self.main_layout.addWidget(self.jobs)
 
-        self.sizes = [20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44]
+        self.sizes = DEFAULT_SIZES # what new types start with
 
         self.current_price_list = None
-        self.save_btn.clicked.connect(self.exit_edit_mode)
-        self.undo_btn.clicked.connect(self.exit_edit_mode)
+        self.save_btn.clicked.connect(lambda: self.save_price_lists())
+        self.undo_btn.clicked.connect(self.undo)
+        self.redo_btn.clicked.connect(self.redo)
+        self.start_loading()
+
+    def start_loading(self):
+        """Reads the store a chunk per event loop turn, so the window shows before the lists do."""
+        self.set_toolbar_state(False)
+        for name in ('top_btn', 'back_btn', 'next_btn', 'last_btn', 'exit_btn'):
+            self.buttons[name].setEnabled(True)
+        for widget in (self.undo_btn, self.redo_btn, self.save_btn, self.code_edit, self.date_edit):
+            widget.setEnabled(False)
+        self.loader = self.store.stream(self.catalog)
+        self.load_started = False
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.load_started:
+            # Only once the window is on screen, so it appears before the lists do.
+            self.load_started = True
+            QTimer.singleShot(0, self.load_next_chunk)
+
+    def load_next_chunk(self):
+        if self.loader is None:
+            return
+        chunk = next(self.loader, None)
+        if chunk is None:
+            self.loader = None
+            self.finish_loading()
+            return
+        if self.sizes is DEFAULT_SIZES:
+            # The grids come in before the first chunk; widgets made from here on keep this.
+            self.sizes = self.catalog.find_grid(DEFAULT_GRID) or DEFAULT_SIZES
+        self.cursor.invalidate()
+        if self.cursor.current is self.followed:
+            self.followed = self.cursor.first()
+        self.show_window()
+        if len(self.catalog.price_lists) == len(chunk):
+            self.first_lists_shown.emit()
+        QTimer.singleShot(0, self.load_next_chunk)
+
+    def finish_loading(self):
+        self.followed = None
+        self.sizes = self.catalog.find_grid(DEFAULT_GRID) or DEFAULT_SIZES
         self.set_toolbar_state(True)
+        for widget in (self.undo_btn, self.redo_btn, self.save_btn, self.code_edit, self.date_edit):
+            widget.setEnabled(True)
+        recovered = 0
+        if self.journal.has_records():
+            self.mirror_changes = True
+            try:
+                recovered = self.journal.replay(self.catalog)
+            finally:
+                self.mirror_changes = False
+            self.undo_stack.clear()     # replayed edits are where the session starts, not steps to undo
+            self.change_tracker.flush()
+        self.journal.attach(self.catalog)
+        self.build_content_index()
+
+        if recovered:
+            self.enter_edit_mode()
+            QTimer.singleShot(0, lambda: QMessageBox.information(
+                self, "Recovered Changes",
+                f"{recovered} unsaved changes from the last session were recovered.\n"
+                "Save to keep them."))
+        self.loaded.emit()
 
     def open_search_dialog(self):
         dialog = SearchPriceListDialog(self)
@@ -493,412 +1136,370 @@ class PriceListManager(QWidget):
         
         dialog.exec_()
     
-    def load_selected_price_list(self, date_str, code, name):
-        self.code_edit.setText(code)
-        selected_date = QDate.fromString(date_str, "yyyy-MM-dd")
-        if selected_date.isValid():
-            self.date_edit.setDate(selected_date)
-
-        print(f"Price List '{name}' (Code: {code}) loaded. Now loading its categories/types...")
-        
-    def show_print_preview(self):
-        printer = QPrinter()
-        preview_dialog = QPrintPreviewDialog(printer, self)
-        preview_dialog.resize(1200, 800) 
-        preview_dialog.paintRequested.connect(self.paint_price_lists)
-        preview_dialog.exec_()
-
-    def to_roman(self, n):
-        """Converts an integer to a Roman numeral string."""
-        if not 0 < n < 40: 
-            return str(n)
-        
-        roman_map = {1: 'I', 4: 'IV', 5: 'V', 9: 'IX', 10: 'X'}
-        values = [10, 9, 5, 4, 1]
-        symbols = ['X', 'IX', 'V', 'IV', 'I']
-        result = ""
-        for i, value in enumerate(values):
-            while n >= value:
-                result += symbols[i]
-                n -= value
-        return result
-    
-    def draw_type_table(self, painter, type_widget, page_width, start_y, mm_to_units, line_height_mm, header_color, start_col_index, end_col_index, printer):
-        
-        table = type_widget.table
-        
-        segment_col_count = end_col_index - start_col_index
-        if segment_col_count <= 0:
-            return start_y
-
-        HEADER_COL_WIDTH = mm_to_units(15) 
-        COLUMN_MM_WIDTH = 11.5
-        
-        precise_col_width = (COLUMN_MM_WIDTH) * printer.width() / printer.pageRect(QPrinter.Millimeter).width()
-        row_height = mm_to_units(line_height_mm)
-
-        current_y = start_y
-        
-        painter.save()
-        table_font = painter.font()
-        table_font.setPointSizeF(8)
-        table_font.setBold(False) 
-        table_font.setWeight(QFont.Normal) 
-        painter.setFont(table_font)
-        
-        vertical_header_width = HEADER_COL_WIDTH
-        
-        painter.setBrush(header_color)
-        painter.drawRect(0, int(current_y), vertical_header_width, int(row_height * 2))
-        
-        painter.setPen(Qt.black)
-        
-        painter.drawText(QRect(0, current_y, vertical_header_width, row_height), 
-                          Qt.AlignCenter, "Size")
-        painter.drawText(QRect(0, current_y + row_height, vertical_header_width, row_height), 
-                          Qt.AlignCenter, "Rate")
+    def build_content_index(self):
+        job = self.jobs.new_job("Indexing price lists", self.content_index.build,
+                              self.content_index.prepare_build())
+        job.finished.connect(self.content_index.install)
+        job.start()
+
+    def open_content_search(self):
+        dialog = ContentSearchDialog(self.content_index, self)
+        dialog.result_selected.connect(self.show_node)
+        dialog.exec_()
 
-        for i in range(segment_col_count):
-            col = start_col_index + i
-            x_pos_float = vertical_header_width + precise_col_width * i
+    def show_node(self, node):
+        """Expands the widgets down to a cloth or type and scrolls to it."""
+        if self.view_stack.currentWidget() is not self.scroll_area:
+            self.toggle_catalog_view()
+        cloth = node if isinstance(node, Cloth) else node.cloth
+        price_list_widget = self.find_price_list_widget(lambda pl: pl is cloth.price_list)
+        if price_list_widget is None:
+            return
+        self.select_price_list(price_list_widget)
+        price_list_widget.expand()
+        target = None
+        for i in range(price_list_widget.cloth_layout.count()):
+            cloth_widget = price_list_widget.cloth_layout.itemAt(i).widget()
+            if cloth_widget and cloth_widget.model is cloth:
+                cloth_widget.expand()
+                target = cloth_widget
+                break
+        if target is not None and node is not cloth:
+            for i in range(target.type_layout.count()):
+                type_widget = target.type_layout.itemAt(i).widget()
+                if type_widget and type_widget.model is node:
+                    type_widget.expand()
+                    target = type_widget
+                    break
+        if target is not None:
+            QTimer.singleShot(0, lambda: self.scroll_to_widget(target))
+            edit = target.type_edit if isinstance(target, TypeWidget) else target.name_edit
+            edit.setFocus()
+
+    def scroll_to_widget(self, widget):
+        # Sections that were just expanded have not been laid out yet.
+        parent = widget
+        while parent is not None and parent is not self.price_list_container:
+            if parent.layout():
+                parent.layout().activate()
+            parent = parent.parentWidget()
+        container = self.price_list_container
+        container.resize(container.width(), max(container.height(), container.sizeHint().height()))
+        self.scroll_area.ensureWidgetVisible(widget, 50, 50)
 
-            x_pos = int(x_pos_float) 
-            col_w = int(precise_col_width)
-            
-            size_item = table.item(0, col)
-            text = size_item.text() if size_item else ""
-            
-            painter.setBrush(header_color)
-            painter.drawRect(x_pos, int(current_y), col_w, int(row_height))
-            
-            painter.drawText(QRect(x_pos, current_y, col_w, row_height), 
-                              Qt.AlignCenter, text)
-        
-            rate_item = table.item(1, col)
-            text = rate_item.text() if rate_item else ""
-            painter.setBrush(Qt.white)
-            painter.drawRect(int(x_pos), int(current_y + row_height), col_w, int(row_height))
-            painter.drawText(QRect(int(x_pos), current_y + row_height, col_w, row_height), 
-                              Qt.AlignCenter, text)
-
-        current_y += row_height * 2
-        
-        painter.setBrush(Qt.NoBrush)
-        painter.setPen(Qt.black)
-        
-        precise_col_width = (COLUMN_MM_WIDTH) * printer.width() / printer.pageRect(QPrinter.Millimeter).width()
-        table_segment_width_float = precise_col_width * segment_col_count + vertical_header_width
-        
-        table_segment_width = int(table_segment_width_float)
-        
-        painter.drawRect(0, start_y, table_segment_width, current_y - start_y)
-        
-        for col_idx in range(segment_col_count + 1):
-            x_pos = vertical_header_width + int(precise_col_width * col_idx) 
-            painter.drawLine(x_pos, start_y, x_pos, current_y)
-        
-        painter.drawLine(0, start_y, 0, current_y)
+    def load_selected_price_list(self, date_str, code, name):
+        # select_price_list fills the code and date fields once the list is current.
+        self.find_price_list_widget(
+            lambda pl: pl.code == code and pl.name == name and pl.date.isoformat() == date_str)
+
+    def toggle_catalog_view(self):
+        if self.view_stack.currentWidget() is self.scroll_area:
+            self.catalog_view.reload()
+            self.view_stack.setCurrentWidget(self.catalog_view)
+            return
+        # Bring the widgets up to date with what was edited in the tree.
+        changed = self.catalog_view.catalog_model.edited
+        if changed:
+            for i in range(self.price_list_layout.count() - 1):
+                widget = self.price_list_layout.itemAt(i).widget()
+                if isinstance(widget, PriceListWidget):
+                    widget.refresh_from_model(changed)
+            changed.clear()
+        self.view_stack.setCurrentWidget(self.scroll_area)
+
+    def undo(self):
+        if self.undo_stack.undo() is not None:
+            self.after_history_step()
+
+    def redo(self):
+        if self.undo_stack.redo() is not None:
+            self.after_history_step()
+
+    def after_history_step(self):
+        if self.view_stack.currentWidget() is self.catalog_view:
+            self.catalog_view.reload()
+        self.enter_edit_mode()
 
-        painter.drawLine(0, start_y + row_height, table_segment_width, start_y + row_height)
-        
-        painter.restore()
-        return current_y
-    
-    def draw_page_header(self, painter, printer, mm_to_units, TEXT_FONT_SIZE, MARGIN_MM, LINE_HEIGHT_MM):
-        page_width = printer.width() - mm_to_units(MARGIN_MM * 2)
-        start_x = mm_to_units(MARGIN_MM)
-        start_y = mm_to_units(MARGIN_MM)
-
-        # Calculate the Y-position for the Company Name text (This defines the main top line)
-        company_name_height_units = mm_to_units(LINE_HEIGHT_MM * 2)
-        name_rect_start_y = start_y
-
-        # Company Name (SHRI SHANKAR GARMENT)
-        painter.save()
-        font_name = QFont("Arial", int(TEXT_FONT_SIZE * 1.8))
-        font_name.setWeight(QFont.Black)
-        painter.setFont(font_name)
-        
-        name_label = "SHRI SHANKAR GARMENT"
-        
-        # FIX HORIZONTAL SHIFT: Increase the reserved space to push the text further right.
-        logo_reserved_space = mm_to_units(LOGO_WIDTH_MM) + mm_to_units(5) 
-        
-        text_rect_start_x = start_x + (logo_reserved_space / 2) 
-        
-        text_rect_width = page_width - logo_reserved_space 
-        
-        name_rect = painter.boundingRect(int(text_rect_start_x), name_rect_start_y, int(text_rect_width), company_name_height_units, 
-                                        Qt.AlignHCenter | Qt.AlignTop, name_label)
-        painter.drawText(name_rect, Qt.AlignHCenter | Qt.AlignTop, name_label)
-        current_y = name_rect.bottom()
-        painter.restore()
-
-        # Draw LOGO on the Left ---
-        logo_pixmap = QPixmap(LOGO_FILE)
-        if not logo_pixmap.isNull():
-            logo_width_units = mm_to_units(LOGO_WIDTH_MM)
-            logo_height_units = mm_to_units(LOGO_HEIGHT_MM)
-            
-            # Calculate the logo's vertical center based on the Company Name's bounding box.
-            logo_y_center = name_rect.top() + (name_rect.height() / 2)
-            logo_y = logo_y_center - (logo_height_units / 2)
-            
-            logo_y += mm_to_units(2) 
-            
-            painter.drawPixmap(start_x, int(logo_y), logo_width_units, logo_height_units, logo_pixmap)
-        painter.save()
-        font_subtitle = QFont("Arial", int(TEXT_FONT_SIZE * 0.9))
-        font_subtitle.setBold(True)
-        painter.setFont(font_subtitle)
-        
-        subtitle_label = "Manufacture & Suppliers of Sports Uniforms"
-        subtitle_rect = painter.boundingRect(start_x, current_y, page_width, mm_to_units(LINE_HEIGHT_MM), 
-                                            Qt.AlignHCenter | Qt.AlignTop, subtitle_label)
-        painter.drawText(subtitle_rect, Qt.AlignHCenter | Qt.AlignTop, subtitle_label)
-        current_y = subtitle_rect.bottom()
-        painter.restore()
-        
-        # Address/Contact Info (Centered)
-        painter.save()
-        font_contact = QFont("Arial", int(TEXT_FONT_SIZE * 0.8))
-        painter.setFont(font_contact)
-        
-        contact_info = [
-            "C27/B, Nagnath Laghu Udyog Society, A.Kalkot Road, M.I.D.C.,",
-            "Solapur 413 006. E-mail : shrishankargarment555@gmail.com"
-        ]
-        
-        full_width_for_center = page_width 
-        contact_block_start_x = start_x 
-        
-        for line in contact_info:
-            contact_rect = painter.boundingRect(contact_block_start_x, current_y, full_width_for_center, mm_to_units(LINE_HEIGHT_MM * 0.8), 
-                                                Qt.AlignHCenter | Qt.AlignTop, line)
-            
-            painter.drawText(contact_rect, Qt.AlignHCenter | Qt.AlignTop, line)
-            current_y = contact_rect.bottom()
-            
-        # Phone/Date (Right Aligned)
-        
-        phone_date_info = [
-            "✆ 9021236858",
-            "✆ 9665466052",
-            f"Date : {QDate.currentDate().toString('dd/MM/yyyy')}"
-        ]
-        
-        right_align_x = int(start_x + page_width * 0.65)
-        right_align_width = int(page_width * 0.35)
-        right_y = current_y - (len(contact_info) * mm_to_units(LINE_HEIGHT_MM * 0.8))
-        
-        for line in phone_date_info:
-            phone_rect = painter.boundingRect(right_align_x, right_y, right_align_width, mm_to_units(LINE_HEIGHT_MM * 0.8), 
-                                            Qt.AlignRight | Qt.AlignTop, line)
-            painter.drawText(phone_rect, Qt.AlignRight | Qt.AlignTop, line)
-            right_y = phone_rect.bottom()
-            
-        painter.restore()
+    def sync_widgets(self, node, change):
+        """Updates the widgets in place for model changes made by undo/redo or bulk edits."""
+        if not (self.undo_stack.applying or self.mirror_changes):
+            return
+        kind = change[0]
+        if kind == "attach":
+            self.add_node_widget(node, change[1])
+        elif kind == "detach":
+            widget = widget_for(node)
+            if widget is not None:
+                if widget is self.current_price_list:
+                    self.current_price_list = None
+                remove_node_widget(widget)
+            if isinstance(node, PriceList):
+                self.show_window()
+        elif kind == "grid":
+            for cloth_type in node.types:
+                widget = widget_for(cloth_type)
+                if widget is not None:
+                    widget.refresh_from_model()
+            return
+        elif kind in ("code", "date"):
+            if self.current_price_list and self.current_price_list.model is node:
+                self.code_edit.blockSignals(True)
+                self.date_edit.blockSignals(True)
+                self.code_edit.setText(node.code)
+                self.date_edit.setDate(QDate(node.date))
+                self.code_edit.blockSignals(False)
+                self.date_edit.blockSignals(False)
+            self.show_window()
+        else:
+            widget = widget_for(node)
+            if widget is not None:
+                widget.sync_change(change)
+        # A collapsed cloth shows a summary of its types.
+        owner = change[1] if kind == "detach" else node.parent
+        owner_widget = widget_for(owner) if isinstance(owner, Cloth) else None
+        if owner_widget is not None:
+            owner_widget.update_summary()
+
+    def add_node_widget(self, node, index):
+        """Shows a node that was attached to the catalog outside the widgets."""
+        if widget_for(node) is not None:
+            return
+        parent = node.parent
+        if parent is self.catalog:
+            self.show_window()
+            return
+        parent_widget = widget_for(parent)
+        if isinstance(parent_widget, PriceListWidget):
+            child_widget = parent_widget.add_cloth(node, index)
+        elif isinstance(parent_widget, ClothWidget):
+            child_widget = parent_widget.add_type_widget(node, index)
+        else:
+            return
+        if child_widget is not None:
+            child_widget.set_readonly_state(parent_widget.name_edit.isReadOnly())
 
-        return current_y + mm_to_units(LINE_HEIGHT_MM * 1.5)
+    def import_csv(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Price Lists", "", "CSV files (*.csv);;All files (*)")
+        if not path:
+            return
+        # The file is read and checked off the GUI thread; finish_import puts it in the catalog.
+        importer = CsvImporter(self.catalog, staged=True)
+        self.import_job = self.jobs.new_job(f"Importing {os.path.basename(path)}", importer.import_file, path)
+        self.import_job.finished.connect(lambda result: self.finish_import(importer, result))
+        self.import_job.failed.connect(
+            lambda e: QMessageBox.critical(self, "Import Failed", f"Could not import {path}:\n{e}"))
+        self.import_job.done.connect(self.import_done)
+        self.import_job.start()
+        self.buttons['import_btn'].setEnabled(False)
+
+    def import_done(self):
+        self.import_job = None
+        self.buttons['import_btn'].setEnabled(not self.editing)
+
+    def finish_import(self, importer, result):
+        container = self.scroll_area.widget()
+        container.setUpdatesEnabled(False)
+        try:
+            with self.undo_stack.group():
+                importer.commit(result)
+            for node, index in result.added:
+                self.add_node_widget(node, index)
+            for cloth_type in result.updated:
+                widget = widget_for(cloth_type)
+                if widget is not None:
+                    widget.refresh_from_model()
+                cloth_widget = widget_for(cloth_type.cloth)
+                if cloth_widget is not None:
+                    cloth_widget.update_summary()
+        finally:
+            container.setUpdatesEnabled(True)
+
+        if result.rows:
+            if self.view_stack.currentWidget() is self.catalog_view:
+                self.catalog_view.reload()
+            self.enter_edit_mode()
+        message = f"Imported {result.rows} rows."
+        if result.skipped:
+            lines = "\n".join(f"Line {line_no}: {error}" for line_no, error in result.errors[:10])
+            message += f"\nSkipped {result.skipped} rows:\n{lines}"
+        QMessageBox.information(self, "Import Price Lists", message)
+
+    def find_price_list_widget(self, predicate):
+        """Moves to the first price list matching predicate and returns its widget."""
+        price_list = next((pl for pl in self.catalog.price_lists if predicate(pl)), None)
+        return self.go_to(price_list)
+
+    def go_to(self, price_list):
+        """Makes price_list the current record: brings its widget in, selects and shows it."""
+        if price_list is None or self.cursor.move_to(price_list) is None:
+            return None
+        self.show_window()
+        widget = widget_for(price_list)
+        if widget is not None:
+            self.select_price_list(widget)
+            QTimer.singleShot(0, lambda: self.scroll_to_widget(widget))
+        return widget
+
+    def show_window(self):
+        """Keeps widgets only for the price lists in the cursor's window, in its order."""
+        window = self.cursor.window()
+        keep = set(window)
+        for i in reversed(range(self.price_list_layout.count() - 1)):
+            widget = self.price_list_layout.itemAt(i).widget()
+            if isinstance(widget, PriceListWidget) and widget.model not in keep:
+                if widget is self.current_price_list:
+                    self.current_price_list = None
+                remove_node_widget(widget)
+        for index, price_list in enumerate(window):
+            widget = widget_for(price_list)
+            if widget is None:
+                widget = self.add_price_list_widget(price_list, index)
+                widget.set_readonly_state(True)
+                widget.add_cloth_btn.hide()
+            elif self.price_list_layout.indexOf(widget) != index:
+                self.price_list_layout.removeWidget(widget)
+                self.price_list_layout.insertWidget(index, widget)
+
+    def change_order(self):
+        self.cursor.set_order(self.order_combo.currentData())
+        self.show_window()
+
+    def on_code_changed(self, text):
+        if self.readonly_mode or not self.current_price_list:
+            return
+        if self.current_price_list.model.code != text:
+            self.current_price_list.model.set_code(text)
 
-    def paint_price_lists(self, printer):
-        painter = QPainter(printer)
-        
-        MARGIN_MM = 10
-        LINE_HEIGHT_MM = 7
-        TEXT_FONT_SIZE = 10
-        TABLE_HEADER_COLOR = Qt.lightGray
-        FIXED_HEADER_COL_MM = 15
-        FIXED_DATA_COL_MM = 11.5
-
-        MAX_COLS_PER_LINE = 13
-        
-        def mm_to_units(mm):
-            return int(mm * printer.width() / printer.pageRect(QPrinter.Millimeter).width())
+    def on_date_changed(self, date):
+        if self.readonly_mode or not self.current_price_list:
+            return
+        if self.current_price_list.model.date != date.toPyDate():
+            self.current_price_list.model.set_date(date.toPyDate())
         
-        y_offset_units = mm_to_units(MARGIN_MM) 
+    def open_reprice_dialog(self):
+        price_list = self.current_price_list.model if self.current_price_list else None
+        dialog = RepriceDialog(self.catalog, price_list, self)
+        if dialog.exec_() != QDialog.Accepted or not dialog.plan:
+            return
+        self.mirror_changes = True
+        try:
+            with self.undo_stack.group():
+                dialog.plan.apply()
+        finally:
+            self.mirror_changes = False
+        if self.view_stack.currentWidget() is self.catalog_view:
+            self.catalog_view.reload()
+        self.enter_edit_mode()
 
-        LEFT_PAGE_MARGIN_UNITS = mm_to_units(MARGIN_MM) 
-        
-        CLOTH_INDENT_MM = 5 
-        
-        TYPE_INDENT_MM = 10
-        TABLE_INDENT_MM = TYPE_INDENT_MM
+    def open_size_grid_dialog(self):
+        price_list = self.current_price_list.model if self.current_price_list else None
+        dialog = SizeGridDialog(self.catalog, price_list, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        self.mirror_changes = True
+        try:
+            with self.undo_stack.group():
+                grid = dialog.grid
+                if grid is None:
+                    grid = self.catalog.add_grid(SizeGrid(dialog.name, dialog.sizes, dialog.labels))
+                else:
+                    grid.update(dialog.name, dialog.sizes, dialog.labels)
+                if dialog.scope is not None:
+                    apply_grid(grid, types_in(dialog.scope))
+        finally:
+            self.mirror_changes = False
+        if self.view_stack.currentWidget() is self.catalog_view:
+            self.catalog_view.reload()
+        self.enter_edit_mode()
 
-        required_content_width_mm = FIXED_HEADER_COL_MM + (MAX_COLS_PER_LINE * FIXED_DATA_COL_MM)
-        required_content_width_units = mm_to_units(required_content_width_mm)
-        
-        y_offset_units = mm_to_units(MARGIN_MM)
-        
-        painter.setFont(painter.font()) 
-        painter.font().setPointSizeF(TEXT_FONT_SIZE)
+    def export_data(self):
+        formats = ["PDF files (one per price list)", "CSV", "JSON Lines"]
+        choice, ok = QInputDialog.getItem(self, "Export", "Export as:", formats, 0, False)
+        if not ok:
+            return
+        if choice == formats[0]:
+            self.export_pdfs()
+            return
+        fmt = "csv" if choice == "CSV" else "jsonl"
+        price_lists = self.catalog.price_lists
+        if self.current_price_list:
+            reply = QMessageBox.question(self, "Export",
+                                         "Export only the selected price list?",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                price_lists = [self.current_price_list.model]
+        path, _ = QFileDialog.getSaveFileName(self, "Export Price Data", f"price_data.{fmt}",
+                                              f"{choice} (*.{fmt});;All files (*)")
+        if not path:
+            return
+        job = self.jobs.new_job(f"Exporting {os.path.basename(path)}", export_rows,
+                              Snapshot(price_lists), path, fmt)
+        job.finished.connect(
+            lambda count: QMessageBox.information(self, "Export", f"Wrote {count} rows to {path}."))
+        job.failed.connect(
+            lambda e: QMessageBox.critical(self, "Export Failed", f"Could not write {path}:\n{e}"))
+
+        def discard_partial_file():
+            if os.path.exists(path):
+                os.remove(path)
+
+        job.cancelled.connect(discard_partial_file)
+        job.start()
+
+    def export_pdfs(self):
+        out_dir = QFileDialog.getExistingDirectory(self, "Export Price Lists to Folder")
+        if not out_dir:
+            return
+        reply = QMessageBox.question(self, "Export Price Lists",
+                                     "Also combine all price lists into one book?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        book_path = os.path.join(out_dir, "price_book.pdf") if reply == QMessageBox.Yes else None
+
+        from pdf_export import export_price_lists
+        load_logo()     # a pixmap, so loaded here on the GUI thread before the job needs it
+        job = self.jobs.new_job("Exporting price lists to PDF", export_price_lists,
+                              Snapshot(self.catalog.price_lists), out_dir, book_path)
+        job.finished.connect(lambda paths: QMessageBox.information(
+            self, "Export Price Lists", f"Exported {len(paths)} price lists to {out_dir}."))
+        job.failed.connect(lambda e: QMessageBox.critical(
+            self, "Export Failed", f"Could not export price lists:\n{e}"))
+        job.start()
 
-        y_offset_units = self.draw_page_header(
-            painter, printer, mm_to_units, TEXT_FONT_SIZE, MARGIN_MM, LINE_HEIGHT_MM
-        )
-        
-        price_list_widgets = []
-        for i in range(self.price_list_layout.count() - 1):
-            widget = self.price_list_layout.itemAt(i).widget()
-            if isinstance(widget, PriceListWidget):
-                price_list_widgets.append(widget)
-
-        # Draw Price List Title (Centered on the print)
-        for pl_idx, pl_widget in enumerate(price_list_widgets):
-            pl_name = pl_widget.name_edit.text() or "Untitled Price List"
-            pl_label = f"PRICE LIST-({pl_idx + 1}) {pl_name}"
-            if pl_idx > 0:
-                printer.newPage()
-                y_offset_units = self.draw_page_header(
-                    painter, printer, mm_to_units, TEXT_FONT_SIZE, MARGIN_MM, LINE_HEIGHT_MM
-                )
-
-            pl_name = pl_widget.name_edit.text() or "Untitled Price List"
-            pl_label = f"PRICE LIST-({pl_idx + 1}) {pl_name}"
-            
-            if y_offset_units + mm_to_units(LINE_HEIGHT_MM * 2) > printer.height() - mm_to_units(MARGIN_MM):
-                printer.newPage()
-                y_offset_units = self.draw_page_header(
-                    painter, printer, mm_to_units, TEXT_FONT_SIZE, MARGIN_MM, LINE_HEIGHT_MM
-                )
-
-            pl_font = QFont(painter.font()) 
-            pl_font.setBold(True)
-            pl_font.setWeight(QFont.Black) 
-            pl_font.setPointSizeF(TEXT_FONT_SIZE * 1.2) 
-            painter.setFont(pl_font)
-            
-            # The Price List label is centered on the entire page width
-            page_width_units = printer.width() - mm_to_units(MARGIN_MM * 2) 
-            pl_rect = painter.boundingRect(LEFT_PAGE_MARGIN_UNITS, y_offset_units, page_width_units, mm_to_units(LINE_HEIGHT_MM * 1.5), 
-                                          Qt.AlignCenter, pl_label)
-            painter.drawText(pl_rect, Qt.AlignCenter, pl_label)
-            y_offset_units += pl_rect.height() + mm_to_units(LINE_HEIGHT_MM * 0.5)
-            painter.restore()
-
-            cloth_widgets = []
-            for i in range(pl_widget.cloth_layout.count()):
-                widget = pl_widget.cloth_layout.itemAt(i).widget()
-                if isinstance(widget, ClothWidget):
-                    cloth_widgets.append(widget)
-
-            # Draw Cloth Label (Aligned with the reduced indent)
-            for c_idx, c_widget in enumerate(cloth_widgets):
-                cloth_name = c_widget.name_edit.text() or "Untitled Cloth"
-                cloth_prefix = chr(65 + c_idx) # 'A', 'B', 'C', ...
-                cloth_label = f"[{cloth_prefix}. {cloth_name}]"
-
-                if y_offset_units + mm_to_units(LINE_HEIGHT_MM * 2) > printer.height() - mm_to_units(MARGIN_MM):
-                    printer.newPage()
-                    y_offset_units = self.draw_page_header(
-                        painter, printer, mm_to_units, TEXT_FONT_SIZE, MARGIN_MM, LINE_HEIGHT_MM
-                    )
-                    
-                painter.save()
-                c_font = QFont(painter.font())
-                c_font.setBold(True)
-                c_font.setWeight(QFont.Black) 
-                c_font.setPointSizeF(TEXT_FONT_SIZE * 1.1) 
-                painter.setFont(c_font)
-                
-                left_indent = LEFT_PAGE_MARGIN_UNITS + mm_to_units(CLOTH_INDENT_MM)
-                available_width = printer.width() - left_indent - LEFT_PAGE_MARGIN_UNITS 
-
-                c_rect = painter.boundingRect(left_indent, y_offset_units, available_width, mm_to_units(LINE_HEIGHT_MM), 
-                                              Qt.AlignLeft, cloth_label)
-                painter.drawText(c_rect, Qt.AlignLeft, cloth_label)
-                y_offset_units += c_rect.height() + mm_to_units(LINE_HEIGHT_MM * 0.3)
-                painter.restore()
-
-                type_widgets = []
-                for i in range(c_widget.type_layout.count()):
-                    widget = c_widget.type_layout.itemAt(i).widget()
-                    if isinstance(widget, TypeWidget):
-                        type_widgets.append(widget)
-
-                # Draw Type Label (Aligned with the reduced indent)
-                for t_idx, t_widget in enumerate(type_widgets):
-                    type_name = t_widget.type_edit.text() or "Untitled Type"
-                    type_label = f"{t_idx + 1}) {type_name}" 
-                    table_height_mm = LINE_HEIGHT_MM * 3 
-                    if y_offset_units + mm_to_units(LINE_HEIGHT_MM) + mm_to_units(table_height_mm) > printer.height() - mm_to_units(MARGIN_MM):
-                        printer.newPage()
-                        y_offset_units = self.draw_page_header(
-                            painter, printer, mm_to_units, TEXT_FONT_SIZE, MARGIN_MM, LINE_HEIGHT_MM
-                        )
-
-                    painter.save()
-                    t_font = QFont(painter.font())
-                    t_font.setBold(True)
-                    t_font.setWeight(QFont.Black) 
-                    t_font.setPointSizeF(TEXT_FONT_SIZE * 1.0) 
-                    painter.setFont(t_font)
-                    
-                    left_indent = LEFT_PAGE_MARGIN_UNITS + mm_to_units(TYPE_INDENT_MM)
-                    available_width = printer.width() - left_indent - LEFT_PAGE_MARGIN_UNITS
-                    
-                    t_rect = painter.boundingRect(left_indent, y_offset_units, available_width, mm_to_units(LINE_HEIGHT_MM), 
-                                                  Qt.AlignLeft, type_label)
-                    painter.drawText(t_rect, Qt.AlignLeft, type_label)
-                    y_offset_units += t_rect.height()
-                    painter.restore()
-                    
-                    y_offset_units += mm_to_units(LINE_HEIGHT_MM * 0.3)
-                    
-                    
-                    # Draw Table (Aligned with the reduced indent)
-                    table_indent_units = LEFT_PAGE_MARGIN_UNITS + mm_to_units(TABLE_INDENT_MM)
-
-                    total_columns = t_widget.table.columnCount()
-                    
-                    for start_col in range(0, total_columns, MAX_COLS_PER_LINE):
-                        end_col = min(start_col + MAX_COLS_PER_LINE, total_columns)
-                        
-                        required_table_height = mm_to_units(LINE_HEIGHT_MM * 2) + mm_to_units(LINE_HEIGHT_MM * 0.3)
-                        
-                        if y_offset_units + required_table_height > printer.height() - mm_to_units(MARGIN_MM):
-                            printer.newPage()
-                            y_offset_units = mm_to_units(MARGIN_MM)
-                            
-                        painter.save()
-                        painter.translate(table_indent_units, 0) 
-                        
-                        y_offset_units = self.draw_type_table(
-                            painter, t_widget, required_content_width_units, y_offset_units, 
-                            mm_to_units, LINE_HEIGHT_MM, TABLE_HEADER_COLOR,
-                            start_col, end_col, printer
-                        )
-                        
-                        painter.restore() 
-                        
-                        y_offset_units += mm_to_units(LINE_HEIGHT_MM * 0.3)
+    def show_print_preview(self):
+        from PyQt5.QtPrintSupport import QPrinter
+        from print_preview import PrintPreviewDialog
+        printer = QPrinter()
+        preview_dialog = PrintPreviewDialog(printer, self.catalog.price_lists, self.print_layouts, self)
+        preview_dialog.resize(1200, 800) 
+        preview_dialog.exec_()
 
     def add_new_price_list(self):
-        price_list_widget = PriceListWidget(self.sizes, parent=self)
-        self.price_list_layout.insertWidget(self.price_list_layout.count() - 1, price_list_widget)
-        price_list_widget.selected.connect(self.select_price_list)
-        price_list_widget.modification_started.connect(self.enter_edit_mode)
-        self.select_price_list(price_list_widget)
+        price_list = self.catalog.add_price_list(PriceList(date=self.date_edit.date().toPyDate()))
+        price_list_widget = self.go_to(price_list)
+        price_list_widget.set_readonly_state(False)
+        price_list_widget.add_cloth_btn.show()
+        self.readonly_mode = False
         self.enter_edit_mode()
 
+    def add_price_list_widget(self, price_list, index=None):
+        price_list_widget = PriceListWidget(self.sizes, parent=self, model=price_list)
+        if index is None:
+            index = self.price_list_layout.count() - 1
+        self.price_list_layout.insertWidget(index, price_list_widget)
+        price_list_widget.selected.connect(self.select_price_list)
+        return price_list_widget
+
     def select_price_list(self, price_list_widget):
         if self.current_price_list:
             self.current_price_list.set_selected(False)
             self.current_price_list.add_cloth_btn.hide()
         
         self.current_price_list = price_list_widget
+        self.cursor.move_to(price_list_widget.model)
         self.current_price_list.set_selected(True)
         self.current_price_list.add_cloth_btn.show()
-
-        self.current_price_list.modification_started.connect(self.enter_edit_mode)
-        for i in range(self.current_price_list.cloth_layout.count()):
-            cloth_widget = self.current_price_list.cloth_layout.itemAt(i).widget()
-            if cloth_widget:
-                cloth_widget.modification_started.connect(self.enter_edit_mode)
-                for j in range(cloth_widget.type_layout.count()):
-                    type_widget = cloth_widget.type_layout.itemAt(j).widget()
-                    if type_widget:
-                        type_widget.modification_started.connect(self.enter_edit_mode)
+        self.code_edit.setText(price_list_widget.model.code)
+        self.date_edit.setDate(QDate(price_list_widget.model.date))
     
     def delete_selected_price_list(self):
         if self.current_price_list:
@@ -906,17 +1507,29 @@ class PriceListManager(QWidget):
                                          f"Are you sure you want to delete '{self.current_price_list.name_edit.text()}'?",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
-                self.current_price_list.deleteLater()
+                self.current_price_list.model.detach()
+                remove_node_widget(self.current_price_list)
                 self.current_price_list = None
+                self.show_window()
+                self.change_tracker.flush()
                 self.exit_edit_mode()
 
     def set_toolbar_state(self, enabled):
         for name, btn in self.buttons.items():
             btn.setEnabled(enabled)
+        if self.import_job is not None:
+            self.buttons['import_btn'].setEnabled(False)
             
+    def on_catalog_changed(self, nodes):
+        self.enter_edit_mode()
+
     def enter_edit_mode(self):
+        if self.editing:
+            return
+        self.editing = True
         self.set_toolbar_state(False)
         self.undo_btn.setEnabled(True)
+        self.redo_btn.setEnabled(True)
         self.save_btn.setEnabled(True)
 
     def exit_edit_mode(self):
@@ -934,8 +1547,74 @@ class PriceListManager(QWidget):
             # Make all fields read-only after save
             self.current_price_list.set_readonly_state(True)
             self.readonly_mode = True
+        self.editing = False
         self.set_toolbar_state(True)
 
+    def save_price_lists(self, overwrite=False):
+        self.change_tracker.flush()
+        try:
+            self.store.save(self.catalog, overwrite)
+        except SaveConflict as e:
+            return self.resolve_save_conflict(e)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Save Failed", f"Could not save price lists:\n{e}")
+            return False
+        self.journal.reset()
+        self.exit_edit_mode()
+        return True
+
+    def resolve_save_conflict(self, conflict):
+        """Asks whether to take the other session's version or keep ours, then saves again."""
+        names = "\n".join(conflict.names)
+        box = QMessageBox(QMessageBox.Warning, "Save Conflict",
+                          f"These were saved by someone else after you opened them:\n\n{names}\n\n"
+                          "Reload them to get their version (Undo brings yours back), "
+                          "or overwrite theirs with yours. Your other changes are saved either way.",
+                          parent=self)
+        reload_btn = box.addButton("Reload Theirs", QMessageBox.AcceptRole)
+        overwrite_btn = box.addButton("Overwrite", QMessageBox.DestructiveRole)
+        box.addButton(QMessageBox.Cancel)
+        box.exec_()
+        if box.clickedButton() is overwrite_btn:
+            return self.save_price_lists(overwrite=True)
+        if box.clickedButton() is not reload_btn:
+            return False
+        current = self.cursor.current.uid if self.cursor.current is not None else None
+        self.mirror_changes = True
+        try:
+            with self.undo_stack.group():
+                self.store.reload(self.catalog, conflict.uids)
+        finally:
+            self.mirror_changes = False
+        if self.cursor.move_to(self.cursor.current) is None:
+            self.go_to(next((pl for pl in self.catalog.price_lists if pl.uid == current), None)
+                       or self.cursor.first())
+        if self.view_stack.currentWidget() is self.catalog_view:
+            self.catalog_view.reload()
+        return self.save_price_lists()
+
+    def closeEvent(self, event):
+        if self.catalog.has_changes():
+            reply = QMessageBox.question(self, 'Unsaved Changes',
+                                         "Save changes before closing?",
+                                         QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
+                                         QMessageBox.Save)
+            if reply == QMessageBox.Cancel or (reply == QMessageBox.Save and not self.save_price_lists()):
+                event.ignore()
+                return
+            if reply == QMessageBox.Discard:
+                self.journal.reset()
+        if self.loader is not None:
+            self.loader.close()
+            self.loader = None
+        self.jobs.cancel_all()
+        self.change_tracker.close()
+        self.cursor.close()
+        self.undo_stack.close()
+        self.journal.close()
+        self.store.close()
+        super().closeEvent(event)
+
     def create_btn(self, text, shortcut=None):
         btn = QPushButton(text)
         if shortcut:
@@ -958,7 +1637,13 @@ class PriceListManager(QWidget):
             ("📝\nModify", "Ctrl+O", left_layout, "modify_btn"),
             ("🗑\nDelete", "Ctrl+D", left_layout, "delete_btn"),
             ("🔍\nSearch", "Ctrl+F", left_layout, "search_btn"),
+            ("🔎\nFind", "Ctrl+Shift+F", left_layout, "find_btn"),
             ("🖨\nPrint", "Ctrl+P", left_layout, "print_btn"),
+            ("📥\nImport", "Ctrl+I", left_layout, "import_btn"),
+            ("📑\nExport", "Ctrl+E", left_layout, "export_btn"),
+            ("💱\nReprice", "Ctrl+R", left_layout, "reprice_btn"),
+            ("📏\nSizes", "Ctrl+K", left_layout, "sizes_btn"),
+            ("🗂\nGrid", "Ctrl+G", left_layout, "grid_btn"),
             ("▲\nTop", None, mid_layout, "top_btn"),
             ("◀\nBack", "Alt+Left", mid_layout, "back_btn"),
             ("▶\nNext", "Alt+Right", mid_layout, "next_btn"),
@@ -983,13 +1668,70 @@ class PriceListManager(QWidget):
         button_group.setLayout(button_layout)
         return button_group
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+class StartupTimer(QObject):
+    """Notes when the window is first painted, shows its first lists and has them all.
+
+    Times are in milliseconds from STARTED, the first line of this module,
+    so they include Python's imports but not starting the interpreter.
+    """
+    def __init__(self, window):
+        super().__init__(window)
+        self.marks = {}
+        self.window = window
+        window.installEventFilter(self)
+        window.first_lists_shown.connect(lambda: self.mark("first lists"))
+        window.loaded.connect(lambda: self.mark("loaded"))
+
+    def mark(self, name):
+        self.marks.setdefault(name, (time.perf_counter() - STARTED) * 1000)
+
+    def eventFilter(self, obj, event):
+        if obj is self.window and event.type() == QEvent.Paint:
+            self.mark("first frame")
+            obj.removeEventFilter(self)
+        return False
+
+    def report(self):
+        return "\n".join(f"{name:>12}: {ms:8.1f} ms" for name, ms in
+                         sorted(self.marks.items(), key=lambda item: item[1]))
+
+
+def load_stylesheet(app, path="style.css"):
+    # Qt only parses the sheet when widgets are polished, so reading and setting it is cheap.
     try:
-        with open("style.css", "r") as f:
+        with open(path, "r") as f:
             app.setStyleSheet(f.read())
     except FileNotFoundError:
-        print("style.css not found. Using default styles.")
+        print(f"{path} not found. Using default styles.")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Price list manager.")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print how long startup took, then quit; exit status 1 if over budget")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="time allowed until the window is first painted")
+    args, qt_args = parser.parse_known_args(argv[1:])
+
+    app = QApplication(argv[:1] + qt_args)
+    load_stylesheet(app)
     window = PriceListManager()
+    timer = StartupTimer(window) if args.startup_time else None
+    if timer is not None:
+        # Quit without closeEvent's unsaved-changes question; a recovered journal stays for next time.
+        window.loaded.connect(window.jobs.cancel_all)
+        window.loaded.connect(app.quit)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    status = app.exec_()
+    if timer is None:
+        return status
+    print(timer.report())
+    first_frame = timer.marks.get("first frame", float("inf"))
+    if first_frame > args.budget_ms:
+        print(f"first frame took {first_frame:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,542 @@
+"""Headless data model for the price list catalog.
+
+Catalog -> PriceList -> Cloth -> ClothType. Each type keeps its sizes and
+rates in compact typed arrays, so the catalog can be read, printed or saved
+without building any widgets. The widgets in main.py only display these
+objects and write edits back through the methods below.
+
+Every mutation marks the changed object dirty on its Catalog, so a save only
+has to write what changed since the last one, and is passed to the catalog's
+listeners (indexes, the journal, ...) as listener(node, change). The change
+is a tuple naming what happened and carrying the value it replaced:
+
+    ("name", old)  ("code", old)  ("date", old)
+    ("size", col, old)  ("rate", col, old)  ("rates", old_rates)
+    ("append_size",)  ("pop_size", size, rate)
+    ("sizes", old_sizes, old_rates, old_grid)
+    ("attach", index)  ("detach", parent, index)
+    ("grid", old_name, old_sizes, old_labels)      sent for a SizeGrid
+
+"attach" and "detach" are sent once for the root of the moved subtree.
+
+Types that use the same SizeGrid share one sizes array (the grid's) instead
+of a copy each. Changing the grid moves every type using it to the new
+sizes; editing the sizes of one such type gives it its own copy first.
+"""
+import datetime
+import uuid
+import weakref
+from array import array
+
+SIZE_TYPECODE = "H"   # unsigned short: sizes are small whole numbers
+RATE_TYPECODE = "d"   # double: rates keep their full precision
+
+
+def new_uid():
+    return uuid.uuid4().hex
+
+
+def format_rate(rate):
+    """Text shown for a rate in tables and on print."""
+    return str(float(rate))
+
+
+def parse_rate(text):
+    """Returns the rate typed in a cell, or None if it is not a number."""
+    try:
+        rate = float(text.strip())
+    except (AttributeError, ValueError):
+        return None
+    if rate != rate or rate in (float("inf"), float("-inf")):
+        return None
+    return rate
+
+
+def parse_grid(text):
+    """Parses a size row typed as "20-34/2", "20, 22, 24" or "S, M, L, XL".
+
+    Returns (sizes, labels): labels is empty for numeric sizes and otherwise
+    names each size, the sizes then being just 1, 2, 3... to keep the order.
+    Raises ValueError if the text describes no sizes.
+    """
+    text = text.strip()
+    if "-" in text and "," not in text:
+        bounds, _, step = text.partition("/")
+        start, _, stop = bounds.partition("-")
+        start, stop = parse_size(start), parse_size(stop)
+        step = parse_size(step) if step else 2
+        if start is None or stop is None or not step or stop < start:
+            raise ValueError(f"invalid size range {text!r}")
+        return list(range(start, stop + 1, step)), ()
+    items = [item.strip() for item in text.split(",") if item.strip()]
+    if not items:
+        raise ValueError("no sizes given")
+    sizes = [parse_size(item) for item in items]
+    if None not in sizes:
+        return sizes, ()
+    if len(items) > 0xFFFF:
+        raise ValueError("too many sizes")
+    return list(range(1, len(items) + 1)), tuple(items)
+
+
+def parse_size(text):
+    """Returns the size typed in a cell, or None if it is not a valid size."""
+    try:
+        size = int(str(text).strip())
+    except ValueError:
+        return None
+    if not 0 <= size <= 0xFFFF:
+        return None
+    return size
+
+
+class _Node:
+    """Shared parent/child bookkeeping for the catalog tree."""
+    __slots__ = ()
+
+    def root(self):
+        """Returns the Catalog this node belongs to, or None if detached."""
+        node = self
+        while node is not None and not isinstance(node, Catalog):
+            node = node.parent
+        return node
+
+    def _touch(self, change):
+        catalog = self.root()
+        if catalog is not None:
+            catalog.touch(self, change)
+
+    def _attach(self, children, child, index):
+        if index is None or index >= len(children):
+            index = len(children)
+            children.append(child)
+        else:
+            children.insert(index, child)
+        catalog = self.root()
+        if catalog is not None:
+            catalog.mark_tree(child)
+            # Later siblings moved down one position.
+            for sibling in children[index + 1:]:
+                catalog.dirty.add(sibling)
+            catalog.notify(child, ("attach", index))
+        return child
+
+    def index_in_parent(self):
+        parent = self.parent
+        if parent is None:
+            return -1
+        return parent.children.index(self)
+
+    def detach(self):
+        """Removes this node from its parent, if it has one."""
+        parent = self.parent
+        if parent is not None:
+            catalog = self.root()
+            index = parent.children.index(self)
+            del parent.children[index]
+            self._set_parent(None)
+            if catalog is not None:
+                catalog.forget_tree(self)
+                if parent is not catalog:
+                    catalog.dirty.add(parent)   # it lost a child
+                catalog.notify(self, ("detach", parent, index))
+
+
+class SizeGrid:
+    """A named size row shared by every ClothType that uses it.
+
+    Grids live in Catalog.grids rather than in the price list tree, but go
+    through the same dirty set and listeners as the tree's nodes.
+    """
+    __slots__ = ("uid", "name", "sizes", "labels", "types", "catalog", "__weakref__")
+
+    parent = None
+    children = ()
+
+    def __init__(self, name="", sizes=(), labels=(), uid=None):
+        self.uid = uid or new_uid()
+        self.name = name
+        self.sizes = array(SIZE_TYPECODE, sizes)
+        self.labels = tuple(labels)
+        if self.labels and len(self.labels) != len(self.sizes):
+            raise ValueError("need one label per size")
+        self.types = weakref.WeakSet()  # types sharing self.sizes
+        self.catalog = None
+
+    def root(self):
+        return self.catalog
+
+    def label(self, col):
+        return self.labels[col] if self.labels else str(self.sizes[col])
+
+    def describe(self):
+        if self.labels:
+            return ", ".join(self.labels)
+        return ", ".join(map(str, self.sizes))
+
+    def set_name(self, name):
+        if name != self.name:
+            self.update(name, self.sizes, self.labels)
+
+    def set_sizes(self, sizes, labels=()):
+        """Changes the grid and moves every type using it to the new sizes."""
+        self.update(self.name, sizes, labels)
+
+    def update(self, name, sizes, labels=()):
+        # An array('H') is taken over as it is, so undo can put back the
+        # very array the types still share.
+        if not (isinstance(sizes, array) and sizes.typecode == SIZE_TYPECODE):
+            sizes = array(SIZE_TYPECODE, sizes)
+        labels = tuple(labels)
+        if labels and len(labels) != len(sizes):
+            raise ValueError("need one label per size")
+        old = ("grid", self.name, self.sizes, self.labels)
+        if name == self.name and sizes == self.sizes and labels == self.labels:
+            return
+        self.name, self.sizes, self.labels = name, sizes, labels
+        if self.catalog is not None:
+            self.catalog.touch(self, old)
+        for cloth_type in list(self.types):
+            if cloth_type.sizes is not sizes:
+                cloth_type.set_sizes(grid=self)
+
+
+class ClothType(_Node):
+    __slots__ = ("uid", "name", "sizes", "rates", "grid", "cloth", "__weakref__")
+
+    def __init__(self, sizes=(), name="", rates=None, uid=None):
+        """sizes is a sequence of sizes, or a SizeGrid to share the sizes of."""
+        self.uid = uid or new_uid()
+        self.name = name
+        self.grid = None
+        if isinstance(sizes, SizeGrid):
+            self.grid = sizes
+            self.sizes = sizes.sizes
+            sizes.types.add(self)
+        else:
+            self.sizes = array(SIZE_TYPECODE, sizes)
+        if rates is None:
+            self.rates = array(RATE_TYPECODE, bytes(8 * len(self.sizes)))
+        else:
+            self.rates = array(RATE_TYPECODE, rates)
+        if len(self.rates) != len(self.sizes):
+            raise ValueError("sizes and rates must have the same length")
+        self.cloth = None
+
+    @property
+    def parent(self):
+        return self.cloth
+
+    def _set_parent(self, cloth):
+        self.cloth = cloth
+
+    @property
+    def children(self):
+        return ()
+
+    def set_name(self, name):
+        old, self.name = self.name, name
+        self._touch(("name", old))
+
+    def size_label(self, col):
+        if self.grid is not None:
+            return self.grid.label(col)
+        return str(self.sizes[col])
+
+    def _own_sizes(self):
+        """Stops sharing the grid's sizes before this type changes them."""
+        if self.grid is not None:
+            self.grid.types.discard(self)
+            self.grid = None
+            self.sizes = array(SIZE_TYPECODE, self.sizes)
+
+    def set_size(self, col, size):
+        self._own_sizes()
+        old, self.sizes[col] = self.sizes[col], size
+        self._touch(("size", col, old))
+
+    def set_rate(self, col, rate):
+        old, self.rates[col] = self.rates[col], rate
+        self._touch(("rate", col, old))
+
+    def set_rates(self, rates):
+        """Replaces every rate at once, as a single change."""
+        rates = array(RATE_TYPECODE, rates)
+        if len(rates) != len(self.sizes):
+            raise ValueError("need one rate per size")
+        if rates == self.rates:
+            return
+        old, self.rates = self.rates, rates
+        self._touch(("rates", old))
+
+    def set_sizes(self, sizes=None, rates=None, grid=None):
+        """Replaces the whole size row as a single change.
+
+        With a grid the type shares the grid's sizes (or the given array, when
+        undo puts back one the grid used to have). Rates default to the old
+        rate of every size that stays and 0 for new sizes.
+        """
+        if grid is not None:
+            if sizes is None:
+                sizes = grid.sizes
+        else:
+            sizes = array(SIZE_TYPECODE, sizes)
+        if rates is None:
+            old_rates = dict(zip(self.sizes, self.rates))
+            rates = array(RATE_TYPECODE, (old_rates.get(size, 0.0) for size in sizes))
+        else:
+            rates = array(RATE_TYPECODE, rates)
+        if len(rates) != len(sizes):
+            raise ValueError("need one rate per size")
+        old = ("sizes", self.sizes, self.rates, self.grid)
+        if self.grid is not None:
+            self.grid.types.discard(self)
+        if grid is not None:
+            grid.types.add(self)
+        self.sizes, self.rates, self.grid = sizes, rates, grid
+        self._touch(old)
+
+    def append_size(self, size, rate=0.0):
+        self._own_sizes()
+        self.sizes.append(size)
+        self.rates.append(rate)
+        self._touch(("append_size",))
+
+    def pop_size(self):
+        """Removes the last size column and returns its (size, rate)."""
+        self._own_sizes()
+        size, rate = self.sizes.pop(), self.rates.pop()
+        self._touch(("pop_size", size, rate))
+        return size, rate
+
+    def next_size(self):
+        return (max(self.sizes) + 2) if self.sizes else 20
+
+
+class Cloth(_Node):
+    __slots__ = ("uid", "name", "types", "price_list", "__weakref__")
+
+    def __init__(self, name="", uid=None):
+        self.uid = uid or new_uid()
+        self.name = name
+        self.types = []
+        self.price_list = None
+
+    @property
+    def parent(self):
+        return self.price_list
+
+    @property
+    def children(self):
+        return self.types
+
+    def _set_parent(self, price_list):
+        self.price_list = price_list
+
+    def set_name(self, name):
+        old, self.name = self.name, name
+        self._touch(("name", old))
+
+    def add_type(self, cloth_type, index=None):
+        cloth_type.detach()
+        cloth_type._set_parent(self)
+        return self._attach(self.types, cloth_type, index)
+
+
+class PriceList(_Node):
+    __slots__ = ("uid", "code", "name", "date", "cloths", "catalog", "__weakref__")
+
+    def __init__(self, name="", code="", date=None, uid=None):
+        self.uid = uid or new_uid()
+        self.code = code
+        self.name = name
+        self.date = date or datetime.date.today()
+        self.cloths = []
+        self.catalog = None
+
+    @property
+    def parent(self):
+        return self.catalog
+
+    @property
+    def children(self):
+        return self.cloths
+
+    def _set_parent(self, catalog):
+        self.catalog = catalog
+
+    def set_name(self, name):
+        old, self.name = self.name, name
+        self._touch(("name", old))
+
+    def set_code(self, code):
+        old, self.code = self.code, code
+        self._touch(("code", old))
+
+    def set_date(self, date):
+        old, self.date = self.date, date
+        self._touch(("date", old))
+
+    def add_cloth(self, cloth, index=None):
+        cloth.detach()
+        cloth._set_parent(self)
+        return self._attach(self.cloths, cloth, index)
+
+    def iter_types(self):
+        for cloth in self.cloths:
+            yield from cloth.types
+
+
+class Catalog(_Node):
+    """Root of the model: every price list known to the application."""
+    __slots__ = ("price_lists", "grids", "dirty", "deleted", "listeners", "__weakref__")
+
+    def __init__(self):
+        self.price_lists = []
+        self.grids = {}         # uid -> SizeGrid
+        self.dirty = set()      # nodes to write on the next save
+        self.deleted = {}       # uid -> node class, for rows to delete
+        self.listeners = []     # callables taking (node, change)
+
+    parent = None
+
+    @property
+    def children(self):
+        return self.price_lists
+
+    def add_price_list(self, price_list, index=None):
+        price_list.detach()
+        price_list._set_parent(self)
+        return self._attach(self.price_lists, price_list, index)
+
+    def adopt(self, price_lists):
+        """Appends price lists read from storage. They are not changes, so listeners aren't told."""
+        for price_list in price_lists:
+            price_list._set_parent(self)
+            self.price_lists.append(price_list)
+
+    def add_grid(self, grid):
+        grid.catalog = self
+        self.grids[grid.uid] = grid
+        self.touch(grid, ("grid", None, None, None))
+        return grid
+
+    def find_grid(self, name):
+        return next((g for g in self.grids.values() if g.name == name), None)
+
+    def notify(self, node, change):
+        for listener in self.listeners:
+            listener(node, change)
+
+    def touch(self, node, change):
+        self.dirty.add(node)
+        self.deleted.pop(node.uid, None)
+        self.notify(node, change)
+
+    def mark_tree(self, node):
+        self.dirty.add(node)
+        self.deleted.pop(node.uid, None)
+        for child in node.children:
+            self.mark_tree(child)
+
+    def forget_tree(self, node):
+        self.dirty.discard(node)
+        self.deleted[node.uid] = type(node)
+        for child in node.children:
+            self.forget_tree(child)
+
+    def has_changes(self):
+        return bool(self.dirty or self.deleted)
+
+    def clear_changes(self):
+        self.dirty.clear()
+        self.deleted.clear()
+
+    def iter_cloths(self):
+        for price_list in self.price_lists:
+            yield from price_list.cloths
+
+    def iter_types(self):
+        for price_list in self.price_lists:
+            yield from price_list.iter_types()
+
+
+def types_in(scope):
+    """Every ClothType in a Catalog, PriceList, Cloth or ClothType."""
+    if isinstance(scope, ClothType):
+        return [scope]
+    if isinstance(scope, Cloth):
+        return list(scope.types)
+    if isinstance(scope, PriceList):
+        return [t for cloth in scope.cloths for t in cloth.types]
+    if isinstance(scope, Catalog):
+        return list(scope.iter_types())
+    raise TypeError(f"cannot reprice {type(scope).__name__}")
+
+
+def apply_grid(grid, types):
+    """Moves the given types onto a grid (or off it, for None) and returns how many changed."""
+    changed = 0
+    for cloth_type in types:
+        if grid is None:
+            if cloth_type.grid is not None:
+                cloth_type.set_sizes(cloth_type.sizes)
+                changed += 1
+        elif cloth_type.sizes is not grid.sizes:
+            cloth_type.set_sizes(grid=grid)
+            changed += 1
+    return changed
+
+
+def attach(parent, node, index=None):
+    """Adds node under parent (Catalog, PriceList or Cloth) at index."""
+    if isinstance(node, PriceList):
+        return parent.add_price_list(node, index)
+    if isinstance(node, Cloth):
+        return parent.add_cloth(node, index)
+    return parent.add_type(node, index)
+
+
+def iter_tree(node):
+    """Yields node and every node below it."""
+    yield node
+    for child in node.children:
+        yield from iter_tree(child)
+
+
+def dump_node(node):
+    """Plain, JSON-friendly copy of a node and everything below it."""
+    if isinstance(node, ClothType):
+        data = {"kind": "type", "uid": node.uid, "name": node.name,
+                "sizes": node.sizes.tolist(), "rates": node.rates.tolist()}
+        if node.grid is not None:
+            data["grid"] = node.grid.uid
+        return data
+    if isinstance(node, Cloth):
+        return {"kind": "cloth", "uid": node.uid, "name": node.name,
+                "types": [dump_node(t) for t in node.types]}
+    return {"kind": "price_list", "uid": node.uid, "name": node.name, "code": node.code,
+            "date": node.date.isoformat(), "cloths": [dump_node(c) for c in node.cloths]}
+
+
+def load_node(data, grids=None):
+    """Builds a detached node tree from dump_node() output.
+
+    grids (uid -> SizeGrid) lets types share the sizes of their grid again.
+    """
+    kind = data["kind"]
+    if kind == "type":
+        grid = grids.get(data.get("grid")) if grids else None
+        if grid is not None and grid.sizes.tolist() == data["sizes"]:
+            return ClothType(grid, data["name"], data["rates"], uid=data["uid"])
+        return ClothType(data["sizes"], data["name"], data["rates"], uid=data["uid"])
+    if kind == "cloth":
+        cloth = Cloth(data["name"], uid=data["uid"])
+        for item in data["types"]:
+            cloth.add_type(load_node(item, grids))
+        return cloth
+    price_list = PriceList(data["name"], data["code"],
+                           datetime.date.fromisoformat(data["date"]), uid=data["uid"])
+    for item in data["cloths"]:
+        price_list.add_cloth(load_node(item, grids))
+    return price_list
@@ -0,0 +1,92 @@
+"""Record cursor over the price lists for the Top/Back/Next/Last buttons.
+
+The lists are ordered by code or by date (the order is rebuilt only after a
+list is added, removed or gets a new code or date). The cursor points at
+one list, and window() gives the few lists around it: the only ones the
+editor keeps widgets for, however many lists the catalog holds.
+"""
+from models import PriceList
+
+WINDOW = 10
+
+ORDERS = {
+    "code": lambda pl: (pl.code.casefold(), pl.date, pl.name.casefold()),
+    "date": lambda pl: (pl.date, pl.code.casefold(), pl.name.casefold()),
+}
+
+
+class PriceListCursor:
+    def __init__(self, catalog, order="code", window=WINDOW):
+        self.catalog = catalog
+        self.order = order
+        self.window_size = window
+        self.current = None
+        self._ordered = None    # price lists in order, None when stale
+        self._index = {}        # price list -> position in _ordered
+        catalog.listeners.append(self.on_change)
+
+    def close(self):
+        self.catalog.listeners.remove(self.on_change)
+
+    def on_change(self, node, change):
+        kind = change[0]
+        if kind in ("attach", "detach"):
+            if isinstance(node, PriceList):
+                self._ordered = None
+        elif kind in ("code", "date"):
+            self._ordered = None
+
+    def invalidate(self):
+        """Rebuilds the order on next use, after lists were added without notifying (Catalog.adopt)."""
+        self._ordered = None
+
+    def set_order(self, order):
+        if order not in ORDERS:
+            raise ValueError(f"unknown order {order!r}")
+        self.order = order
+        self._ordered = None
+
+    def ordered(self):
+        if self._ordered is None:
+            self._ordered = sorted(self.catalog.price_lists, key=ORDERS[self.order])
+            self._index = {pl: i for i, pl in enumerate(self._ordered)}
+        return self._ordered
+
+    def position(self):
+        """Index of the current list in the order, or -1."""
+        self.ordered()
+        return self._index.get(self.current, -1)
+
+    def move_to(self, price_list):
+        self.ordered()
+        self.current = price_list if price_list in self._index else None
+        return self.current
+
+    def _step_to(self, index):
+        ordered = self.ordered()
+        if not ordered:
+            self.current = None
+            return None
+        self.current = ordered[max(0, min(index, len(ordered) - 1))]
+        return self.current
+
+    def first(self):
+        return self._step_to(0)
+
+    def last(self):
+        return self._step_to(len(self.ordered()) - 1)
+
+    def next(self):
+        position = self.position()
+        return self._step_to(position + 1 if position >= 0 else 0)
+
+    def previous(self):
+        position = self.position()
+        return self._step_to(position - 1 if position >= 0 else 0)
+
+    def window(self):
+        """The lists around the current one, in order."""
+        ordered = self.ordered()
+        position = max(0, self.position())
+        start = max(0, min(position - self.window_size // 2, len(ordered) - self.window_size))
+        return ordered[start:start + self.window_size]
@@ -0,0 +1,119 @@
+"""Exports every price list to its own PDF, in a pool of worker processes.
+
+Each worker starts its own offscreen Qt application and renders the lists it
+is sent, which travel as dump_node() dicts. With a book path, the parent lays
+out all lists first (cheap, no painting) so the workers can number the pages
+across the whole book, then the files are joined with pypdf. Nothing is
+painted in this process, which may be a job thread rather than the GUI thread.
+
+    python pdf_export.py OUT_DIR [--book book.pdf] [--jobs N] [--db price_lists.db]
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pypdf import PdfWriter
+
+import render
+from models import dump_node, load_node
+
+TASKS_PER_WORKER = 4    # chunks per worker, so a slow chunk doesn't hold up the end
+
+
+def pdf_file_name(pl_idx, price_list):
+    label = re.sub(r"[^\w.-]+", "_", price_list.code or price_list.name).strip("_")
+    return f"{pl_idx + 1:03d}_{label or 'price_list'}.pdf"
+
+
+def _init_worker():
+    render.ensure_app()
+
+
+def _render_chunk(tasks):
+    for data, pl_idx, path, first_page, page_count in tasks:
+        printer = render.make_pdf_printer(path)
+        ctx = render.RenderContext(printer)
+        pages = render.layout_price_list(ctx, pl_idx, load_node(data))
+        render.paint_pages(printer, ctx, pages, first_page, page_count)
+    return len(tasks)
+
+
+def merge_pdfs(paths, book_path):
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    with open(book_path, "wb") as f:
+        writer.write(f)
+
+
+def export_price_lists(price_lists, out_dir, book_path=None, workers=None, progress=None):
+    """Writes one PDF per price list into out_dir and returns their paths.
+
+    progress, if given, is called with (done, total) as lists finish.
+    """
+    render.ensure_app()
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    price_lists = list(price_lists)
+    paths = [os.path.join(out_dir, pdf_file_name(i, pl)) for i, pl in enumerate(price_lists)]
+
+    first_pages = [0] * len(price_lists)
+    page_counts = [None] * len(price_lists)
+    if book_path:
+        ctx = render.RenderContext(render.make_pdf_printer(os.devnull))
+        total = 0
+        for i, price_list in enumerate(price_lists):
+            first_pages[i] = total
+            total += len(render.layout_price_list(ctx, i, price_list))
+        page_counts = [total] * len(price_lists)
+
+    tasks = [(dump_node(pl), i, paths[i], first_pages[i], page_counts[i])
+             for i, pl in enumerate(price_lists)]
+    size = max(1, len(tasks) // (workers * TASKS_PER_WORKER))
+    chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+
+    done = 0
+    # spawn: a forked child would inherit the parent's Qt state.
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker) as pool:
+        futures = [pool.submit(_render_chunk, chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                done += future.result()
+                if progress is not None:
+                    progress(done, len(tasks))
+        except BaseException:
+            # Stopped (progress may raise to cancel): don't render the chunks not started yet.
+            for future in futures:
+                future.cancel()
+            raise
+
+    if book_path:
+        merge_pdfs(paths, book_path)
+    return paths
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export every price list to its own PDF.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--book", help="also write all lists into this one PDF")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--db", default="price_lists.db")
+    args = parser.parse_args(argv[1:])
+
+    from storage import PriceListStore
+    store = PriceListStore(args.db)
+    try:
+        catalog = store.load()
+    finally:
+        store.close()
+    paths = export_price_lists(catalog.price_lists, args.out_dir, args.book, args.jobs)
+    print(f"Wrote {len(paths)} PDF files to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
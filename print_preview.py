@@ -0,0 +1,227 @@
+"""Print preview that only paints the pages in view.
+
+The pages come from render.layout_price_list, laid out once per job (and per
+price list through the LayoutCache), so zooming and scrolling never lay out
+the catalog again. A page is painted into an image the first time it
+scrolls into view at a given zoom, and the last few images are kept.
+
+The layout itself runs as a background job, so the dialog opens at once
+and shows how far it got; closing the dialog cancels it. The job lays out
+detached copies of the lists that are not cached, and the cache is only
+filled from the GUI thread once it is done.
+"""
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QAbstractScrollArea
+from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtPrintSupport import QPrintDialog
+
+from jobs import Job, Snapshot
+from render import Page, RenderContext, layout_numbered, paint_pages, render_page_image
+
+PAGE_SPACING = 16
+CACHED_PAGES = 12
+ZOOM_STEP = 1.25
+
+
+class PageView(QAbstractScrollArea):
+    current_page_changed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ctx = None
+        self.pages = []
+        self.zoom = None        # image pixels per printer unit; None fits the width
+        self._images = OrderedDict()
+        self._current = 0
+        self.viewport().setAutoFillBackground(False)
+
+    def set_pages(self, ctx, pages):
+        self.ctx = ctx
+        self.pages = pages
+        self._images.clear()
+        self.update_scroll_bars()
+        self.viewport().update()
+        self.emit_current_page(force=True)
+
+    def scale(self):
+        if self.zoom is not None:
+            return self.zoom
+        return max(0.01, (self.viewport().width() - 2 * PAGE_SPACING) / self.ctx.width)
+
+    def set_zoom(self, zoom):
+        page = self.current_page()
+        self.zoom = zoom
+        self._images.clear()
+        self.update_scroll_bars()
+        self.go_to_page(page)
+
+    def page_size(self):
+        scale = self.scale()
+        return int(self.ctx.width * scale), int(self.ctx.height * scale)
+
+    def update_scroll_bars(self):
+        if self.ctx is None:
+            return
+        width, height = self.page_size()
+        viewport = self.viewport()
+        total_height = len(self.pages) * (height + PAGE_SPACING) + PAGE_SPACING
+        self.verticalScrollBar().setRange(0, max(0, total_height - viewport.height()))
+        self.verticalScrollBar().setPageStep(viewport.height())
+        self.verticalScrollBar().setSingleStep(max(1, height // 20))
+        self.horizontalScrollBar().setRange(0, max(0, width + 2 * PAGE_SPACING - viewport.width()))
+        self.horizontalScrollBar().setPageStep(viewport.width())
+
+    def current_page(self):
+        if not self.pages:
+            return 0
+        stride = self.page_size()[1] + PAGE_SPACING
+        middle = self.verticalScrollBar().value() + self.viewport().height() // 2
+        return min(len(self.pages) - 1, max(0, middle // stride))
+
+    def go_to_page(self, page_index):
+        stride = self.page_size()[1] + PAGE_SPACING
+        self.verticalScrollBar().setValue(page_index * stride)
+
+    def emit_current_page(self, force=False):
+        page = self.current_page()
+        if force or page != self._current:
+            self._current = page
+            self.current_page_changed.emit(page)
+
+    def page_image(self, page_index, scale):
+        key = (page_index, scale)
+        image = self._images.get(key)
+        if image is None:
+            image = self._images[key] = render_page_image(self.ctx, self.pages, page_index, scale)
+            while len(self._images) > CACHED_PAGES:
+                self._images.popitem(last=False)
+        else:
+            self._images.move_to_end(key)
+        return image
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.ctx is not None:
+            if self.zoom is None:
+                self._images.clear()
+            self.update_scroll_bars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+        self.emit_current_page()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor("#8a8a8a"))
+        if self.ctx is None or not self.pages:
+            return
+        scale = self.scale()
+        width, height = self.page_size()
+        stride = height + PAGE_SPACING
+        top = self.verticalScrollBar().value()
+        first = max(0, (top - PAGE_SPACING) // stride)
+        last = min(len(self.pages) - 1, (top + self.viewport().height()) // stride)
+        x = max(PAGE_SPACING, (self.viewport().width() - width) // 2) - self.horizontalScrollBar().value()
+        for page_index in range(first, last + 1):
+            y = PAGE_SPACING + page_index * stride - top
+            painter.drawImage(x, y, self.page_image(page_index, scale))
+
+
+class PrintPreviewDialog(QDialog):
+    def __init__(self, printer, price_lists, layouts=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Print Preview")
+        self.printer = printer
+        self.price_lists = price_lists
+        self.layouts = layouts
+        self.pages = []
+        self.job = None
+
+        layout = QVBoxLayout(self)
+        tool_layout = QHBoxLayout()
+        self.fit_btn = QPushButton("Fit Width")
+        self.zoom_out_btn = QPushButton("−")
+        self.zoom_in_btn = QPushButton("+")
+        self.page_label = QLabel()
+        self.print_btn = QPushButton("🖨 Print…")
+        for btn in (self.fit_btn, self.zoom_out_btn, self.zoom_in_btn):
+            tool_layout.addWidget(btn)
+        tool_layout.addStretch()
+        tool_layout.addWidget(self.page_label)
+        tool_layout.addStretch()
+        tool_layout.addWidget(self.print_btn)
+        layout.addLayout(tool_layout)
+
+        self.page_view = PageView()
+        layout.addWidget(self.page_view)
+
+        self.fit_btn.clicked.connect(lambda: self.page_view.set_zoom(None))
+        self.zoom_out_btn.clicked.connect(lambda: self.zoom_by(1 / ZOOM_STEP))
+        self.zoom_in_btn.clicked.connect(lambda: self.zoom_by(ZOOM_STEP))
+        self.print_btn.clicked.connect(self.print_pages)
+        self.page_view.current_page_changed.connect(self.show_page_number)
+        self.lay_out()
+
+    def lay_out(self, then=None):
+        """Starts laying out the pages; then, if given, is called once they are shown."""
+        self.cancel_layout()
+        self.print_btn.setEnabled(False)
+        self.page_label.setText("Laying out pages…")
+        # The context holds the logo pixmap, so it is made here on the GUI thread.
+        ctx = RenderContext(self.printer)
+        price_lists = list(self.price_lists)
+        layouts = {}
+        missing = []
+        for pl_idx, price_list in enumerate(price_lists):
+            pages = self.layouts.lookup(ctx, pl_idx, price_list) if self.layouts is not None else None
+            if pages is None:
+                missing.append(pl_idx)
+            else:
+                layouts[pl_idx] = pages
+        generation = self.layouts.generation if self.layouts is not None else None
+        copies = Snapshot(price_lists[pl_idx] for pl_idx in missing)
+        job = self.job = Job("Print layout", layout_numbered, ctx, missing, copies)
+        job.progressed.connect(
+            lambda done, total: self.page_label.setText(f"Laying out pages… {done} of {total} price lists"))
+        job.finished.connect(lambda laid_out: self.show_pages(job, ctx, price_lists, layouts, laid_out, generation, then))
+        job.failed.connect(lambda e: self.page_label.setText(f"Layout failed: {e}"))
+        job.start()
+
+    def cancel_layout(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+    def show_pages(self, job, ctx, price_lists, layouts, laid_out, generation, then=None):
+        if job is not self.job:
+            return      # a layout that was replaced or cancelled
+        self.job = None
+        if self.layouts is not None:
+            for pl_idx, pages in laid_out.items():
+                self.layouts.put(ctx, pl_idx, price_lists[pl_idx], pages, generation)
+        layouts.update(laid_out)
+        pages = [page for pl_idx in sorted(layouts) for page in layouts[pl_idx]] or [Page()]
+        self.ctx = ctx
+        self.pages = pages
+        self.page_view.set_pages(ctx, pages)
+        self.print_btn.setEnabled(True)
+        if then is not None:
+            then()
+
+    def done(self, result):
+        self.cancel_layout()
+        super().done(result)
+
+    def zoom_by(self, factor):
+        self.page_view.set_zoom(self.page_view.scale() * factor)
+
+    def show_page_number(self, page_index):
+        self.page_label.setText(f"Page {page_index + 1} of {len(self.pages)}")
+
+    def print_pages(self):
+        dialog = QPrintDialog(self.printer, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        self.lay_out(lambda: paint_pages(self.printer, self.ctx, self.pages))
@@ -0,0 +1,556 @@
+"""Print rendering of price lists, independent of the editor widgets.
+
+Everything here reads the model (PriceList, Cloth, ClothType) and paints
+into a QPrinter, so the same code drives the print preview, the print dialog
+and a PDF export run from the command line under the offscreen platform:
+
+    python render.py book.pdf [price_lists.db]
+
+Printing is done in two passes. The layout pass measures the text and
+decides the page breaks, producing a list of Pages with positioned items;
+the paint pass draws any page from its items alone. That gives the page
+count up front ("Page X of Y") and lets the preview paint just the pages in
+view. Every price list starts on a new page, so LayoutCache keeps layouts per
+list and only lays out again the lists that changed.
+"""
+import os
+import sys
+
+from PyQt5.QtGui import QGuiApplication, QPainter, QPicture, QFont, QFontMetrics, QPixmap, QImage
+from PyQt5.QtCore import Qt, QRect, QDate
+
+# QtPrintSupport is imported where a printer is made or measured, so the
+# editor can import this module (for LayoutCache) without loading it at startup.
+from models import format_rate
+
+LOGO_FILE = "media/logo.png" 
+LOGO_WIDTH_MM = 45 
+LOGO_HEIGHT_MM = 35 
+
+MARGIN_MM = 10
+LINE_HEIGHT_MM = 7
+TEXT_FONT_SIZE = 10
+TABLE_HEADER_COLOR = Qt.lightGray
+HEADER_COL_MM = 15
+COLUMN_MM_WIDTH = 11.5
+MAX_COLS_PER_LINE = 13
+CLOTH_INDENT_MM = 5
+TYPE_INDENT_MM = 10
+TABLE_INDENT_MM = TYPE_INDENT_MM
+
+
+def to_roman(n):
+    """Converts an integer to a Roman numeral string."""
+    if not 0 < n < 40: 
+        return str(n)
+
+    roman_map = {1: 'I', 4: 'IV', 5: 'V', 9: 'IX', 10: 'X'}
+    values = [10, 9, 5, 4, 1]
+    symbols = ['X', 'IX', 'V', 'IV', 'I']
+    result = ""
+    for i, value in enumerate(values):
+        while n >= value:
+            result += symbols[i]
+            n -= value
+    return result
+
+
+class RenderContext:
+    """Page-invariant resources for one print job.
+
+    The unit scale, fonts and logo are set up once, and the company header is
+    recorded once as a QPicture that every page replays.
+    """
+
+    def __init__(self, printer):
+        from PyQt5.QtPrintSupport import QPrinter
+        self.printer = printer
+        self.width = printer.width()
+        self.height = printer.height()
+        self.units_per_mm = printer.width() / printer.pageRect(QPrinter.Millimeter).width()
+        self.dpi = printer.logicalDpiY()
+        self.margin = self.mm_to_units(MARGIN_MM)
+        self.bottom = self.height - self.margin
+        self.col_width = COLUMN_MM_WIDTH * self.units_per_mm
+
+        self.list_font = body_font(TEXT_FONT_SIZE * 1.2, QFont.Black)
+        self.cloth_font = body_font(TEXT_FONT_SIZE * 1.1, QFont.Black)
+        self.type_font = body_font(TEXT_FONT_SIZE * 1.0, QFont.Black)
+        self.table_font = body_font(8, QFont.Normal)
+        self.footer_font = body_font(8, QFont.Normal)
+        self.metrics = {font: QFontMetrics(font, printer)
+                        for font in (self.list_font, self.cloth_font, self.type_font)}
+        self.page_key = (self.width, self.height, self.dpi)
+        self.logo = load_logo()
+
+        self.header = QPicture()
+        painter = QPainter(self.header)
+        self.header_bottom, self.logo_rect = record_page_header(painter, self)
+        painter.end()
+
+    def mm_to_units(self, mm):
+        return int(mm * self.units_per_mm)
+
+    def header_font(self, point_size, weight=QFont.Normal):
+        # Pixel sizes keep the recorded layout independent of the QPicture's own dpi.
+        font = QFont("Arial")
+        font.setPixelSize(round(int(point_size) * self.dpi / 72))
+        font.setWeight(weight)
+        return font
+
+    def draw_page_header(self, painter):
+        """Replays the recorded header and returns the y where the page content starts."""
+        painter.save()
+        device = painter.device()
+        painter.scale(self.header.logicalDpiX() / device.logicalDpiX(),
+                      self.header.logicalDpiY() / device.logicalDpiY())
+        painter.drawPicture(0, 0, self.header)
+        painter.restore()
+        # The logo is drawn directly so the PDF embeds the image once, not per page.
+        if not self.logo.isNull():
+            painter.drawPixmap(self.logo_rect, self.logo)
+        return self.header_bottom
+
+
+def body_font(point_size, weight):
+    font = QFont()
+    font.setPointSizeF(point_size)
+    font.setWeight(weight)
+    return font
+
+
+_logo = None
+
+
+def load_logo():
+    """The logo pixmap, decoded once per process."""
+    global _logo
+    if _logo is None:
+        _logo = QPixmap(LOGO_FILE)
+    return _logo
+
+
+def draw_type_table(painter, ctx, cloth_type, start_y, start_col_index, end_col_index):
+
+    segment_col_count = end_col_index - start_col_index
+    if segment_col_count <= 0:
+        return start_y
+
+    precise_col_width = ctx.col_width
+    row_height = ctx.mm_to_units(LINE_HEIGHT_MM)
+    vertical_header_width = ctx.mm_to_units(HEADER_COL_MM)
+
+    current_y = start_y
+
+    painter.save()
+    painter.setFont(ctx.table_font)
+
+    painter.setBrush(TABLE_HEADER_COLOR)
+    painter.drawRect(0, int(current_y), vertical_header_width, int(row_height * 2))
+
+    painter.setPen(Qt.black)
+
+    painter.drawText(QRect(0, current_y, vertical_header_width, row_height), 
+                      Qt.AlignCenter, "Size")
+    painter.drawText(QRect(0, current_y + row_height, vertical_header_width, row_height), 
+                      Qt.AlignCenter, "Rate")
+
+    col_w = int(precise_col_width)
+    for i in range(segment_col_count):
+        col = start_col_index + i
+        x_pos = int(vertical_header_width + precise_col_width * i)
+
+        text = cloth_type.size_label(col)
+
+        painter.setBrush(TABLE_HEADER_COLOR)
+        painter.drawRect(x_pos, int(current_y), col_w, int(row_height))
+
+        painter.drawText(QRect(x_pos, current_y, col_w, row_height), 
+                          Qt.AlignCenter, text)
+
+        text = format_rate(cloth_type.rates[col])
+        painter.setBrush(Qt.white)
+        painter.drawRect(int(x_pos), int(current_y + row_height), col_w, int(row_height))
+        painter.drawText(QRect(int(x_pos), current_y + row_height, col_w, row_height), 
+                          Qt.AlignCenter, text)
+
+    current_y += row_height * 2
+
+    painter.setBrush(Qt.NoBrush)
+    painter.setPen(Qt.black)
+
+    table_segment_width = int(precise_col_width * segment_col_count + vertical_header_width)
+
+    painter.drawRect(0, start_y, table_segment_width, current_y - start_y)
+
+    for col_idx in range(segment_col_count + 1):
+        x_pos = vertical_header_width + int(precise_col_width * col_idx) 
+        painter.drawLine(x_pos, start_y, x_pos, current_y)
+
+    painter.drawLine(0, start_y, 0, current_y)
+
+    painter.drawLine(0, start_y + row_height, table_segment_width, start_y + row_height)
+
+    painter.restore()
+    return current_y
+
+
+def record_page_header(painter, ctx):
+    """Draws the company header text; returns its bottom y and where the logo goes."""
+    mm_to_units = ctx.mm_to_units
+    page_width = ctx.width - mm_to_units(MARGIN_MM * 2)
+    start_x = mm_to_units(MARGIN_MM)
+    start_y = mm_to_units(MARGIN_MM)
+
+    # Calculate the Y-position for the Company Name text (This defines the main top line)
+    company_name_height_units = mm_to_units(LINE_HEIGHT_MM * 2)
+    name_rect_start_y = start_y
+
+    # Company Name (SHRI SHANKAR GARMENT)
+    painter.save()
+    painter.setFont(ctx.header_font(TEXT_FONT_SIZE * 1.8, QFont.Black))
+
+    name_label = "SHRI SHANKAR GARMENT"
+
+    # FIX HORIZONTAL SHIFT: Increase the reserved space to push the text further right.
+    logo_reserved_space = mm_to_units(LOGO_WIDTH_MM) + mm_to_units(5) 
+
+    text_rect_start_x = start_x + (logo_reserved_space / 2) 
+
+    text_rect_width = page_width - logo_reserved_space 
+
+    name_rect = painter.boundingRect(int(text_rect_start_x), name_rect_start_y, int(text_rect_width), company_name_height_units, 
+                                    Qt.AlignHCenter | Qt.AlignTop, name_label)
+    painter.drawText(name_rect, Qt.AlignHCenter | Qt.AlignTop, name_label)
+    current_y = name_rect.bottom()
+    painter.restore()
+
+    # LOGO on the Left ---
+    logo_width_units = mm_to_units(LOGO_WIDTH_MM)
+    logo_height_units = mm_to_units(LOGO_HEIGHT_MM)
+
+    # Calculate the logo's vertical center based on the Company Name's bounding box.
+    logo_y_center = name_rect.top() + (name_rect.height() / 2)
+    logo_y = logo_y_center - (logo_height_units / 2)
+
+    logo_y += mm_to_units(2) 
+
+    logo_rect = QRect(start_x, int(logo_y), logo_width_units, logo_height_units)
+    painter.save()
+    font_subtitle = ctx.header_font(TEXT_FONT_SIZE * 0.9)
+    font_subtitle.setBold(True)
+    painter.setFont(font_subtitle)
+
+    subtitle_label = "Manufacture & Suppliers of Sports Uniforms"
+    subtitle_rect = painter.boundingRect(start_x, current_y, page_width, mm_to_units(LINE_HEIGHT_MM), 
+                                        Qt.AlignHCenter | Qt.AlignTop, subtitle_label)
+    painter.drawText(subtitle_rect, Qt.AlignHCenter | Qt.AlignTop, subtitle_label)
+    current_y = subtitle_rect.bottom()
+    painter.restore()
+
+    # Address/Contact Info (Centered)
+    painter.save()
+    painter.setFont(ctx.header_font(TEXT_FONT_SIZE * 0.8))
+
+    contact_info = [
+        "C27/B, Nagnath Laghu Udyog Society, A.Kalkot Road, M.I.D.C.,",
+        "Solapur 413 006. E-mail : shrishankargarment555@gmail.com"
+    ]
+
+    full_width_for_center = page_width 
+    contact_block_start_x = start_x 
+
+    for line in contact_info:
+        contact_rect = painter.boundingRect(contact_block_start_x, current_y, full_width_for_center, mm_to_units(LINE_HEIGHT_MM * 0.8), 
+                                            Qt.AlignHCenter | Qt.AlignTop, line)
+
+        painter.drawText(contact_rect, Qt.AlignHCenter | Qt.AlignTop, line)
+        current_y = contact_rect.bottom()
+
+    # Phone/Date (Right Aligned)
+
+    phone_date_info = [
+        "✆ 9021236858",
+        "✆ 9665466052",
+        f"Date : {QDate.currentDate().toString('dd/MM/yyyy')}"
+    ]
+
+    right_align_x = int(start_x + page_width * 0.65)
+    right_align_width = int(page_width * 0.35)
+    right_y = current_y - (len(contact_info) * mm_to_units(LINE_HEIGHT_MM * 0.8))
+
+    for line in phone_date_info:
+        phone_rect = painter.boundingRect(right_align_x, right_y, right_align_width, mm_to_units(LINE_HEIGHT_MM * 0.8), 
+                                        Qt.AlignRight | Qt.AlignTop, line)
+        painter.drawText(phone_rect, Qt.AlignRight | Qt.AlignTop, line)
+        right_y = phone_rect.bottom()
+
+    painter.restore()
+
+    return current_y + mm_to_units(LINE_HEIGHT_MM * 1.5), logo_rect
+
+
+class Page:
+    """Layout of one page: whether it carries the header, and what to draw."""
+    __slots__ = ("header", "items")
+
+    def __init__(self, header=True):
+        self.header = header
+        self.items = []     # ("text", font, rect, flags, label) or ("table", x, y, type, start, end)
+
+
+def layout_price_list(ctx, pl_idx, price_list):
+    """Works out the page breaks and positions for one price list, without painting.
+
+    Every price list starts on a new page, so lists are laid out independently.
+    """
+    mm_to_units = ctx.mm_to_units
+    LEFT_PAGE_MARGIN_UNITS = ctx.margin
+    line_units = mm_to_units(LINE_HEIGHT_MM)
+    gap_units = mm_to_units(LINE_HEIGHT_MM * 0.3)
+    page_bottom = ctx.bottom
+    pages = []
+
+    def new_page(header=True):
+        pages.append(Page(header))
+        return ctx.header_bottom if header else ctx.margin
+
+    def add_text(font, x, y, width, height, flags, label):
+        rect = ctx.metrics[font].boundingRect(QRect(x, y, width, height), flags, label)
+        pages[-1].items.append(("text", font, rect, flags, label))
+        return rect
+
+    y_offset_units = new_page()
+
+    # Price List Title (Centered on the print)
+    pl_name = price_list.name or "Untitled Price List"
+    pl_label = f"PRICE LIST-({pl_idx + 1}) {pl_name}"
+
+    if y_offset_units + mm_to_units(LINE_HEIGHT_MM * 2) > page_bottom:
+        y_offset_units = new_page()
+
+    # The Price List label is centered on the entire page width
+    page_width_units = ctx.width - mm_to_units(MARGIN_MM * 2) 
+    pl_rect = add_text(ctx.list_font, LEFT_PAGE_MARGIN_UNITS, y_offset_units, page_width_units,
+                       mm_to_units(LINE_HEIGHT_MM * 1.5), Qt.AlignCenter, pl_label)
+    y_offset_units += pl_rect.height() + mm_to_units(LINE_HEIGHT_MM * 0.5)
+
+    # Cloth Label (Aligned with the reduced indent)
+    for c_idx, cloth in enumerate(price_list.cloths):
+        cloth_name = cloth.name or "Untitled Cloth"
+        cloth_prefix = chr(65 + c_idx) # 'A', 'B', 'C', ...
+        cloth_label = f"[{cloth_prefix}. {cloth_name}]"
+
+        if y_offset_units + mm_to_units(LINE_HEIGHT_MM * 2) > page_bottom:
+            y_offset_units = new_page()
+
+        left_indent = LEFT_PAGE_MARGIN_UNITS + mm_to_units(CLOTH_INDENT_MM)
+        available_width = ctx.width - left_indent - LEFT_PAGE_MARGIN_UNITS 
+        c_rect = add_text(ctx.cloth_font, left_indent, y_offset_units, available_width, line_units,
+                          Qt.AlignLeft, cloth_label)
+        y_offset_units += c_rect.height() + gap_units
+
+        # Type Label (Aligned with the reduced indent)
+        for t_idx, cloth_type in enumerate(cloth.types):
+            type_name = cloth_type.name or "Untitled Type"
+            type_label = f"{t_idx + 1}) {type_name}" 
+            table_height_mm = LINE_HEIGHT_MM * 3 
+            if y_offset_units + line_units + mm_to_units(table_height_mm) > page_bottom:
+                y_offset_units = new_page()
+
+            left_indent = LEFT_PAGE_MARGIN_UNITS + mm_to_units(TYPE_INDENT_MM)
+            available_width = ctx.width - left_indent - LEFT_PAGE_MARGIN_UNITS
+            t_rect = add_text(ctx.type_font, left_indent, y_offset_units, available_width, line_units,
+                              Qt.AlignLeft, type_label)
+            y_offset_units += t_rect.height() + gap_units
+
+            # Table (Aligned with the reduced indent)
+            table_indent_units = LEFT_PAGE_MARGIN_UNITS + mm_to_units(TABLE_INDENT_MM)
+            total_columns = len(cloth_type.sizes)
+            table_height = mm_to_units(LINE_HEIGHT_MM) * 2
+
+            for start_col in range(0, total_columns, MAX_COLS_PER_LINE):
+                end_col = min(start_col + MAX_COLS_PER_LINE, total_columns)
+
+                if y_offset_units + table_height + gap_units > page_bottom:
+                    y_offset_units = new_page(header=False)
+
+                pages[-1].items.append(("table", table_indent_units, y_offset_units,
+                                        cloth_type, start_col, end_col))
+                y_offset_units += table_height + gap_units
+
+    return pages
+
+
+def layout_pages(ctx, price_lists, cache=None, progress=None):
+    """Pages for the whole print job, reusing cached list layouts when given a LayoutCache.
+
+    progress, if given, is called with (lists done, total) after each list.
+    """
+    pages = []
+    for pl_idx, price_list in enumerate(price_lists):
+        if cache is not None:
+            pages.extend(cache.get(ctx, pl_idx, price_list))
+        else:
+            pages.extend(layout_price_list(ctx, pl_idx, price_list))
+        if progress is not None:
+            progress(pl_idx + 1, len(price_lists))
+    return pages or [Page()]
+
+
+def layout_numbered(ctx, indexes, price_lists, progress=None):
+    """Layouts of the price lists at the given indexes, as {index: pages}; for a job laying out copies."""
+    layouts = {}
+    for done, (pl_idx, price_list) in enumerate(zip(indexes, price_lists), 1):
+        layouts[pl_idx] = layout_price_list(ctx, pl_idx, price_list)
+        if progress is not None:
+            progress(done, len(indexes))
+    return layouts
+
+
+class LayoutCache:
+    """Page layouts per price list, kept until the list or anything in it changes.
+
+    A layout made off the GUI thread is stored with put() and the generation
+    read when its job started; any change since then makes put() drop it.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._layouts = {}      # price list -> ((index, page key), pages)
+        self.generation = 0     # counts the changes to the catalog
+        catalog.listeners.append(self.on_change)
+
+    def close(self):
+        self.catalog.listeners.remove(self.on_change)
+
+    def on_change(self, node, change):
+        self.generation += 1
+        if change[0] == "grid":
+            self._layouts.clear()   # its labels may be printed on any list
+            return
+        if change[0] == "detach":
+            self._layouts.pop(node, None)
+            node = change[1]
+        while node is not None:
+            self._layouts.pop(node, None)
+            node = node.parent
+
+    def get(self, ctx, pl_idx, price_list):
+        pages = self.lookup(ctx, pl_idx, price_list)
+        if pages is None:
+            pages = layout_price_list(ctx, pl_idx, price_list)
+            self._layouts[price_list] = ((pl_idx, ctx.page_key), pages)
+        return pages
+
+    def lookup(self, ctx, pl_idx, price_list):
+        """The cached pages of a list, or None if it has to be laid out."""
+        cached = self._layouts.get(price_list)
+        if cached is None or cached[0] != (pl_idx, ctx.page_key):
+            return None
+        return cached[1]
+
+    def put(self, ctx, pl_idx, price_list, pages, generation):
+        """Keeps pages laid out from the catalog as it was at generation, unless it changed since."""
+        if generation == self.generation:
+            self._layouts[price_list] = ((pl_idx, ctx.page_key), pages)
+
+
+def paint_page(painter, ctx, page, page_index, page_count):
+    if page.header:
+        ctx.draw_page_header(painter)
+    for item in page.items:
+        if item[0] == "text":
+            _, font, rect, flags, label = item
+            painter.setFont(font)
+            painter.drawText(rect, flags, label)
+        else:
+            _, x, y, cloth_type, start_col, end_col = item
+            painter.save()
+            painter.translate(x, 0)
+            draw_type_table(painter, ctx, cloth_type, y, start_col, end_col)
+            painter.restore()
+
+    painter.setFont(ctx.footer_font)
+    painter.drawText(QRect(ctx.margin, ctx.bottom, ctx.width - 2 * ctx.margin, ctx.margin),
+                     Qt.AlignCenter, f"Page {page_index + 1} of {page_count}")
+
+
+def paint_pages(printer, ctx, pages, first_page=0, page_count=None):
+    """Paints pages into the printer; first_page and page_count number them within a larger book."""
+    if page_count is None:
+        page_count = first_page + len(pages)
+    painter = QPainter(printer)
+    for page_index, page in enumerate(pages):
+        if page_index:
+            printer.newPage()
+        paint_page(painter, ctx, page, first_page + page_index, page_count)
+    painter.end()
+
+
+def paint_price_lists(printer, price_lists, cache=None):
+    ctx = RenderContext(printer)
+    paint_pages(printer, ctx, layout_pages(ctx, price_lists, cache))
+
+
+def render_page_image(ctx, pages, page_index, scale):
+    """Paints one page into an image, scale being image pixels per printer unit."""
+    image = QImage(max(1, int(ctx.width * scale)), max(1, int(ctx.height * scale)),
+                   QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.white)
+    # Same dpi as the printer, so point-sized fonts come out as in print.
+    dots_per_meter = round(ctx.dpi / 0.0254)
+    image.setDotsPerMeterX(dots_per_meter)
+    image.setDotsPerMeterY(dots_per_meter)
+    painter = QPainter(image)
+    painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing | QPainter.SmoothPixmapTransform)
+    painter.scale(scale, scale)
+    paint_page(painter, ctx, pages[page_index], page_index, len(pages))
+    painter.end()
+    return image
+
+
+def make_pdf_printer(path):
+    from PyQt5.QtPrintSupport import QPrinter
+    printer = QPrinter(QPrinter.HighResolution)
+    printer.setOutputFormat(QPrinter.PdfFormat)
+    printer.setOutputFileName(path)
+    printer.setPageSize(QPrinter.A4)
+    return printer
+
+
+_app = None
+
+
+def ensure_app():
+    """Returns the running Qt application, starting an offscreen one if there is none."""
+    global _app
+    app = QGuiApplication.instance()
+    if app is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        app = _app = QGuiApplication([sys.argv[0]])
+    return app
+
+
+def export_pdf(price_lists, path):
+    """Renders the price lists into one PDF file, without any widgets."""
+    ensure_app()
+    paint_price_lists(make_pdf_printer(path), price_lists)
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("usage: render.py OUTPUT.pdf [DATABASE]")
+        return 2
+    from storage import PriceListStore
+    store = PriceListStore(argv[2] if len(argv) > 2 else "price_lists.db")
+    try:
+        catalog = store.load()
+    finally:
+        store.close()
+    export_pdf(catalog.price_lists, argv[1])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
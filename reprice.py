@@ -0,0 +1,88 @@
+"""Bulk repricing of rates over a part of the catalog.
+
+A RepricePlan gathers the rates of every type in scope into one NumPy array
+(np.frombuffer over the rate arrays, no per-cell Python work), applies the
+change and rounding to the whole array at once and keeps the result as a
+preview. Applying it writes each changed type with a single set_rates(), so
+listeners get one change per type and the widgets one refresh per table.
+"""
+import numpy as np
+
+from models import RATE_TYPECODE, types_in
+
+ROUNDING = {
+    "none": "No rounding",
+    "1": "Nearest 1",
+    "5": "Nearest 5",
+    "10": "Nearest 10",
+    "end9": "Up to ...9",
+    "end99": "Up to .99",
+}
+
+
+def round_to(rates, step):
+    """Rounds to the nearest multiple of step, halves up: 12.5 -> 13, not np.round's 12."""
+    return np.floor(rates / step + 0.5) * step
+
+
+def round_rates(rates, rounding):
+    if rounding == "1":
+        return round_to(rates, 1)
+    if rounding == "5":
+        return round_to(rates, 5)
+    if rounding == "10":
+        return round_to(rates, 10)
+    if rounding == "end9":
+        # Smallest whole price ending in 9 that is not below the rate: 241 -> 249.
+        return np.ceil((rates + 1) / 10) * 10 - 1
+    if rounding == "end99":
+        return np.round(np.ceil(rates + 0.01) - 0.01, 2)
+    return rates
+
+
+class RepricePlan:
+    def __init__(self, scope, percent=0.0, step=0.0, rounding="none", min_size=None, max_size=None):
+        self.types = [t for t in types_in(scope) if len(t.rates)]
+        counts = np.fromiter((len(t.rates) for t in self.types), dtype=np.intp, count=len(self.types))
+        self.offsets = np.zeros(len(self.types) + 1, dtype=np.intp)
+        np.cumsum(counts, out=self.offsets[1:])
+        if self.types:
+            self.old = np.concatenate([np.frombuffer(t.rates, dtype=np.float64) for t in self.types])
+            sizes = np.concatenate([np.asarray(t.sizes, dtype=np.int64) for t in self.types])
+        else:
+            self.old = np.zeros(0)
+            sizes = np.zeros(0, dtype=np.int64)
+
+        in_range = np.ones(len(sizes), dtype=bool)
+        if min_size is not None:
+            in_range &= sizes >= min_size
+        if max_size is not None:
+            in_range &= sizes <= max_size
+        new = round_rates(self.old * (1 + percent / 100) + step, rounding)
+        self.new = np.where(in_range, np.maximum(new, 0), self.old)
+        self.changed = np.flatnonzero(self.new != self.old)
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.changed)
+
+    def rows(self, limit=None):
+        """(type, column, size, old rate, new rate) for the changed cells, in catalog order."""
+        changed = self.changed if limit is None else self.changed[:limit]
+        type_indexes = np.searchsorted(self.offsets, changed, side="right") - 1
+        for cell, type_index in zip(changed.tolist(), type_indexes.tolist()):
+            yield (self.types[type_index], cell - int(self.offsets[type_index]),
+                   int(self.sizes[cell]), float(self.old[cell]), float(self.new[cell]))
+
+    def apply(self):
+        """Writes the new rates; returns how many types changed."""
+        if not len(self.changed):
+            return 0
+        type_indexes = np.unique(np.searchsorted(self.offsets, self.changed, side="right") - 1)
+        for type_index in type_indexes.tolist():
+            start, end = self.offsets[type_index], self.offsets[type_index + 1]
+            cloth_type = self.types[type_index]
+            if len(cloth_type.rates) != end - start:
+                continue    # edited since the preview was made
+            cloth_type.set_rates(self.new[start:end].astype(RATE_TYPECODE).tobytes())
+        return len(type_indexes)
@@ -0,0 +1,292 @@
+"""In-memory indexes used by the search dialogs.
+
+NgramIndex answers case-insensitive substring queries over a column of
+short keys (price list codes, names). Every key is split into trigrams and
+each trigram keeps a sorted array of the rows containing it. A query only
+has to verify the rows in the posting of its rarest trigram, and the rows
+come back already in order. Queries shorter than a trigram fall back to a
+scan of the lowercased keys, which is still a tight loop in C.
+
+CatalogContentIndex is an inverted index over the contents of the catalog:
+words of cloth and type names, and the sizes of every type. It listens to
+the catalog and only re-indexes the nodes that changed, on the next query.
+The first full build can be done by a background job instead: build() only
+reads the nodes it is given and fills new tables, and install() puts them
+in use along with whatever changed meanwhile.
+"""
+import operator
+import re
+from array import array
+from bisect import bisect_left
+
+from models import Cloth, ClothType, iter_tree
+
+NGRAM = 3
+
+
+def trigrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class NgramIndex:
+    def __init__(self, keys=()):
+        self.keys = []
+        self._postings = {}
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        """Indexes key as the next row and returns its row number."""
+        row = len(self.keys)
+        key = key.lower()
+        self.keys.append(key)
+        for gram in trigrams(key):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("I")
+            posting.append(row)
+        return row
+
+    def candidates(self, query):
+        """Rows that may contain query: a sorted sequence, or None for all rows."""
+        if len(query) < NGRAM:
+            return None
+        best = None
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return ()
+            if best is None or len(posting) < len(best):
+                best = posting
+        return best
+
+
+class PriceListSearchIndex:
+    """Code/name filter over the rows of the price list search table."""
+
+    def __init__(self, codes, names):
+        self.codes = NgramIndex(codes)
+        self.names = NgramIndex(names)
+        self._last = ("", "", range(len(self.codes)))
+
+    def search(self, code_query, name_query):
+        """Returns the sorted rows whose code and name contain the queries."""
+        code_query = code_query.lower()
+        name_query = name_query.lower()
+        if not code_query and not name_query:
+            rows = range(len(self.codes))
+            self._last = ("", "", rows)
+            return rows
+
+        pool = None
+        for index, query in ((self.codes, code_query), (self.names, name_query)):
+            if query:
+                found = index.candidates(query)
+                if found is not None and (pool is None or len(found) < len(pool)):
+                    pool = found
+        # Typing more characters can only narrow the previous result.
+        last_code, last_name, last_rows = self._last
+        if last_code in code_query and last_name in name_query:
+            if pool is None or len(last_rows) < len(pool):
+                pool = last_rows
+        if pool is None:
+            pool = range(len(self.codes))
+
+        codes, names = self.codes.keys, self.names.keys
+        if code_query and name_query:
+            rows = [r for r in pool if code_query in codes[r] and name_query in names[r]]
+        elif code_query:
+            rows = [r for r in pool if code_query in codes[r]]
+        else:
+            rows = [r for r in pool if name_query in names[r]]
+        self._last = (code_query, name_query, rows)
+        return rows
+
+
+WORD_RE = re.compile(r"\w+")
+FILTER_RE = re.compile(r"^(size|rate)\s*(:|=|<=|>=|<|>)\s*(\d+(?:\.\d+)?)$")
+COMPARE = {":": operator.eq, "=": operator.eq, "<": operator.lt, ">": operator.gt,
+           "<=": operator.le, ">=": operator.ge}
+
+
+def words(text):
+    return set(WORD_RE.findall(text.lower()))
+
+
+def parse_query(query):
+    """Splits a query into words, a size and rate conditions.
+
+    "cotton size:36 rate>400" -> ({"cotton"}, 36, [(operator.gt, 400.0)])
+    """
+    found_words, size, rate_tests = set(), None, []
+    for token in re.sub(r"\s*(:|=|<=|>=|<|>)\s*", r"\1", query).split():
+        match = FILTER_RE.match(token.lower())
+        if not match:
+            found_words |= words(token)
+        elif match.group(1) == "size":
+            size = int(float(match.group(3)))
+        else:
+            rate_tests.append((COMPARE[match.group(2)], float(match.group(3))))
+    return found_words, size, rate_tests
+
+
+def _index_into(tables, node):
+    if not isinstance(node, (Cloth, ClothType)):
+        return
+    terms, sizes, indexed = tables
+    node_words = words(node.name)
+    node_sizes = set(node.sizes) if isinstance(node, ClothType) else ()
+    for word in node_words:
+        terms.setdefault(word, set()).add(node)
+    for size in node_sizes:
+        sizes.setdefault(size, set()).add(node)
+    indexed[node] = (node_words, node_sizes)
+
+
+class CatalogContentIndex:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._terms = {}        # word -> set of Cloth/ClothType nodes
+        self._sorted_terms = None   # the words of _terms in order, for prefix matches; None when stale
+        self._sizes = {}        # size -> set of ClothType nodes
+        self._indexed = {}      # node -> (words, sizes) it was indexed under
+        self._pending = None    # None until the first full build
+        self._building = None   # changes made while build() runs, until install()
+        catalog.listeners.append(self.on_change)
+
+    def close(self):
+        self.catalog.listeners.remove(self.on_change)
+
+    def on_change(self, node, change):
+        changed = self._pending if self._pending is not None else self._building
+        if changed is None:
+            return
+        if change[0] in ("attach", "detach"):
+            changed.update(iter_tree(node))
+        else:
+            changed.add(node)
+
+    def prepare_build(self):
+        """The cloths for build(); changes made from now on are caught up by install()."""
+        self._building = set()
+        return list(self.catalog.iter_cloths())
+
+    def build(self, cloths, progress=None):
+        """Indexes the cloths and their types into new tables, on any thread."""
+        tables = ({}, {}, {})
+        for i, cloth in enumerate(cloths):
+            _index_into(tables, cloth)
+            for cloth_type in cloth.types:
+                _index_into(tables, cloth_type)
+            if progress is not None and i % 100 == 0:
+                progress(i, len(cloths))
+        return tables
+
+    def install(self, tables):
+        if self._pending is None and self._building is not None:
+            self._terms, self._sizes, self._indexed = tables
+            self._sorted_terms = None
+            self._pending = self._building
+        self._building = None
+
+    def _unindex(self, node):
+        node_words, node_sizes = self._indexed.pop(node, ((), ()))
+        for word in node_words:
+            nodes = self._terms[word]
+            nodes.discard(node)
+            if not nodes:
+                del self._terms[word]
+                self._sorted_terms = None
+        for size in node_sizes:
+            nodes = self._sizes[size]
+            nodes.discard(node)
+            if not nodes:
+                del self._sizes[size]
+
+    def _index(self, node):
+        known = len(self._terms)
+        _index_into((self._terms, self._sizes, self._indexed), node)
+        if len(self._terms) != known:
+            self._sorted_terms = None
+
+    def _refresh(self):
+        if self._pending is None:
+            self._pending = set()
+            self._building = None
+            for cloth in self.catalog.iter_cloths():
+                self._index(cloth)
+                for cloth_type in cloth.types:
+                    self._index(cloth_type)
+            return
+        for node in self._pending:
+            self._unindex(node)
+            if node.root() is self.catalog:
+                self._index(node)
+        self._pending.clear()
+
+    def _match_word(self, word):
+        """Nodes with a name word starting with word."""
+        terms = self._sorted_terms
+        if terms is None:
+            terms = self._sorted_terms = sorted(self._terms)
+        found = set()
+        # The words starting with word are the run of terms from where it would go.
+        for i in range(bisect_left(terms, word), len(terms)):
+            if not terms[i].startswith(word):
+                break
+            found |= self._terms[terms[i]]
+        return found
+
+    def search(self, query, limit=None):
+        """Returns matching Cloth and ClothType nodes for a query.
+
+        Every word must appear in the name of a cloth, or in the name of a
+        type or its cloth. "size:36" keeps types that have that size and
+        "rate>400" (also <, <=, >=, =) tests the rates, at that size if one
+        is given.
+        """
+        self._refresh()
+        query_words, size, rate_tests = parse_query(query)
+        if not query_words and size is None and not rate_tests:
+            return []
+
+        cloths, types = [], []
+        if query_words:
+            matches = [self._match_word(word) for word in query_words]
+            candidates = set()
+            for nodes in matches:
+                candidates |= {n for n in nodes if isinstance(n, ClothType)}
+            types = [t for t in candidates
+                     if all(t in nodes or t.cloth in nodes for nodes in matches)]
+            if size is None and not rate_tests:
+                cloths = set.intersection(*matches)
+                cloths = [c for c in cloths if isinstance(c, Cloth)]
+        elif size is not None:
+            types = list(self._sizes.get(size, ()))
+        else:
+            types = list(self.catalog.iter_types())
+
+        if size is not None or rate_tests:
+            types = [t for t in types if self._rates_match(t, size, rate_tests)]
+
+        results = sorted(cloths + types, key=self._sort_key)
+        return results if limit is None else results[:limit]
+
+    @staticmethod
+    def _rates_match(cloth_type, size, rate_tests):
+        if size is None:
+            cols = range(len(cloth_type.sizes))
+        else:
+            cols = [i for i, s in enumerate(cloth_type.sizes) if s == size]
+        return any(all(test(cloth_type.rates[col], value) for test, value in rate_tests)
+                   for col in cols)
+
+    @staticmethod
+    def _sort_key(node):
+        cloth = node if isinstance(node, Cloth) else node.cloth
+        price_list = cloth.price_list
+        return (price_list.name.lower(), price_list.uid, cloth.name.lower(), cloth.uid,
+                isinstance(node, ClothType), node.name.lower())
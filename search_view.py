@@ -0,0 +1,94 @@
+"""Item models behind the price list search table.
+
+RowTableModel holds the rows (tuples of display text) once. RowSubsetProxyModel
+shows a subset of those rows given as a sorted sequence of source rows, so
+changing the filter swaps one sequence instead of creating and destroying
+table items; the view only asks for the rows it paints.
+"""
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex
+
+HEADERS = ("Date", "Code", "Name")
+
+
+class RowTableModel(QAbstractTableModel):
+    def __init__(self, rows=(), headers=HEADERS, parent=None):
+        super().__init__(parent)
+        self.rows = list(rows)
+        self.headers = headers
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.endResetModel()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+
+class RowSubsetProxyModel(QAbstractProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = range(0)
+        self._proxy_rows = None
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        self._rows = range(model.rowCount())
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        """Shows only the given source rows, in the given order."""
+        self.beginResetModel()
+        self._rows = rows
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        source = self.sourceModel()
+        return 0 if parent.isValid() or source is None else source.columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._proxy_rows is None:
+            self._proxy_rows = {row: i for i, row in enumerate(self._rows)}
+        row = self._proxy_rows.get(source_index.row())
+        if row is None:
+            return QModelIndex()
+        return self.createIndex(row, source_index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        return section + 1 if role == Qt.DisplayRole else None
@@ -0,0 +1,410 @@
+"""SQLite persistence for the catalog.
+
+The store runs in WAL mode and writes a save as one transaction. Only the
+nodes in Catalog.dirty and Catalog.deleted are written, each kind with a
+single executemany over one cached prepared statement, so saving after a
+small edit costs the same however many price lists the file holds. Sizes
+and rates are stored as little-endian array blobs.
+
+Size grids have their own table. A type row keeps its sizes blob either
+way, plus the uid of the grid it shares them with, if any.
+
+Each save also records a dated version of every list it changed, in the
+same transaction (see versions.py).
+
+Several sessions may share one store file. Readers never wait for a save:
+load() and stream() read inside one transaction, so they see a single
+committed state while another session writes. Writers are optimistic.
+Every price list and size grid row carries a stamp that each save of it
+increments; the store remembers the stamps it read, and save() raises
+SaveConflict, writing nothing, if a list or grid it is about to write was
+saved by someone else since. reload() then brings those in from the store.
+"""
+import datetime
+import json
+import sqlite3
+import sys
+from array import array
+
+from models import Catalog, PriceList, Cloth, ClothType, SizeGrid, SIZE_TYPECODE, RATE_TYPECODE, attach, iter_tree
+from versions import VersionStore, VERSION_SCHEMA, price_list_of
+
+SCHEMA_VERSION = 4
+BUSY_TIMEOUT = 30   # seconds a save waits for another session's save to finish
+LOAD_CHUNK = 500    # price lists read per query by stream()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_lists (
+    uid TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cloths (
+    uid TEXT PRIMARY KEY,
+    price_list_uid TEXT NOT NULL REFERENCES price_lists(uid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS types (
+    uid TEXT PRIMARY KEY,
+    cloth_uid TEXT NOT NULL REFERENCES cloths(uid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    sizes BLOB NOT NULL,
+    rates BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cloths_by_list ON cloths(price_list_uid, position);
+CREATE INDEX IF NOT EXISTS types_by_cloth ON types(cloth_uid, position);
+"""
+
+# Version 2: shared size grids.
+SCHEMA_GRIDS = """
+CREATE TABLE IF NOT EXISTS size_grids (
+    uid TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    sizes BLOB NOT NULL,
+    labels TEXT NOT NULL
+);
+ALTER TABLE types ADD COLUMN grid_uid TEXT REFERENCES size_grids(uid) ON DELETE SET NULL;
+"""
+
+# Version 4: stamps for detecting conflicting saves.
+SCHEMA_STAMPS = """
+ALTER TABLE price_lists ADD COLUMN stamp INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE size_grids ADD COLUMN stamp INTEGER NOT NULL DEFAULT 0;
+"""
+
+# Grids every store starts with: (name, sizes, labels).
+DEFAULT_GRIDS = (
+    ("Standard 20–44", range(20, 45, 2), ()),
+    ("Kids 20–34", range(20, 35, 2), ()),
+    ("Adult 36–48", range(36, 49, 2), ()),
+    ("S–XXL", range(1, 6), ("S", "M", "L", "XL", "XXL")),
+)
+
+UPSERT_PRICE_LIST = """
+INSERT INTO price_lists (uid, position, code, name, date) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(uid) DO UPDATE SET position = excluded.position, code = excluded.code,
+    name = excluded.name, date = excluded.date
+"""
+UPSERT_CLOTH = """
+INSERT INTO cloths (uid, price_list_uid, position, name) VALUES (?, ?, ?, ?)
+ON CONFLICT(uid) DO UPDATE SET price_list_uid = excluded.price_list_uid,
+    position = excluded.position, name = excluded.name
+"""
+UPSERT_TYPE = """
+INSERT INTO types (uid, cloth_uid, position, name, sizes, rates, grid_uid) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(uid) DO UPDATE SET cloth_uid = excluded.cloth_uid, position = excluded.position,
+    name = excluded.name, sizes = excluded.sizes, rates = excluded.rates, grid_uid = excluded.grid_uid
+"""
+UPSERT_GRID = """
+INSERT INTO size_grids (uid, name, sizes, labels) VALUES (?, ?, ?, ?)
+ON CONFLICT(uid) DO UPDATE SET name = excluded.name, sizes = excluded.sizes, labels = excluded.labels
+"""
+STAMP_SQL = {
+    PriceList: ("SELECT stamp, code || ' ' || name FROM price_lists WHERE uid = ?",
+                "UPDATE price_lists SET stamp = ? WHERE uid = ?"),
+    SizeGrid: ("SELECT stamp, name FROM size_grids WHERE uid = ?",
+               "UPDATE size_grids SET stamp = ? WHERE uid = ?"),
+}
+DELETE_SQL = {
+    PriceList: "DELETE FROM price_lists WHERE uid = ?",
+    Cloth: "DELETE FROM cloths WHERE uid = ?",
+    ClothType: "DELETE FROM types WHERE uid = ?",
+}
+
+
+class SaveConflict(Exception):
+    """Someone else saved some of the lists or grids being saved since they were read."""
+
+    def __init__(self, uids, names):
+        super().__init__("changed by another session since they were loaded: " + ", ".join(names))
+        self.uids = uids        # price list and grid uids, for reload()
+        self.names = names
+
+
+def pack_array(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_array(typecode, blob):
+    values = array(typecode)
+    values.frombytes(blob)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def run_script(cur, script):
+    """Runs the statements of a schema script one by one, inside the caller's transaction.
+
+    Unlike executescript(), this never commits what came before.
+    """
+    for statement in script.split(";"):
+        if statement.strip():
+            cur.execute(statement)
+
+
+class PriceListStore:
+    def __init__(self, path):
+        self.path = path
+        # Autocommit mode: transactions are opened explicitly in save().
+        self.conn = sqlite3.connect(path, isolation_level=None, timeout=BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self._migrate()
+        self.versions = VersionStore(self.conn)
+        self.stamps = {}    # uid -> stamp of each price list and grid as last read or written
+
+    def _migrate(self):
+        if self._schema_version() >= SCHEMA_VERSION:
+            return
+        # Several sessions may open an old store at once: the first to get the
+        # write lock upgrades it, and the others find it upgraded once they get it.
+        cur = self.conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._schema_version()
+            if version < 1:
+                run_script(cur, SCHEMA)
+            if version < 2:
+                run_script(cur, SCHEMA_GRIDS)
+                cur.executemany(UPSERT_GRID, (
+                    (SizeGrid(name).uid, name, pack_array(array(SIZE_TYPECODE, sizes)), json.dumps(labels))
+                    for name, sizes, labels in DEFAULT_GRIDS))
+            if version < 3:
+                run_script(cur, VERSION_SCHEMA)
+            if version < 4:
+                run_script(cur, SCHEMA_STAMPS)
+            if version < SCHEMA_VERSION:
+                cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+
+    def _schema_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def load(self):
+        """Reads the whole store into a new Catalog with no pending changes."""
+        catalog = Catalog()
+        for _ in self.stream(catalog):
+            pass
+        return catalog
+
+    def stream(self, catalog, chunk_lists=LOAD_CHUNK):
+        """Reads the store into an empty catalog, chunk_lists price lists at a time.
+
+        A generator that yields the lists of each chunk once they are in the
+        catalog, so a caller can show the first lists while the rest load.
+        Loaded lists are not changes: the catalog's listeners are not told.
+        All chunks come from one snapshot, read on a connection of its own so
+        the store stays usable in between.
+        """
+        self.stamps.clear()
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        try:
+            conn.execute("BEGIN")
+            for uid, name, sizes, labels, stamp in conn.execute(
+                    "SELECT uid, name, sizes, labels, stamp FROM size_grids ORDER BY rowid"):
+                grid = SizeGrid(name, unpack_array(SIZE_TYPECODE, sizes), json.loads(labels), uid=uid)
+                grid.catalog = catalog
+                catalog.grids[uid] = grid
+                self.stamps[uid] = stamp
+            rows = conn.execute("SELECT uid, code, name, date, stamp FROM price_lists ORDER BY position").fetchall()
+            for start in range(0, len(rows), chunk_lists):
+                price_lists = {}
+                for uid, code, name, date, stamp in rows[start:start + chunk_lists]:
+                    price_lists[uid] = PriceList(name, code, datetime.date.fromisoformat(date), uid=uid)
+                    self.stamps[uid] = stamp
+                marks = ",".join("?" * len(price_lists))
+                cloths = {}
+                for uid, price_list_uid, name in conn.execute(
+                        f"SELECT uid, price_list_uid, name FROM cloths WHERE price_list_uid IN ({marks})"
+                        " ORDER BY price_list_uid, position", list(price_lists)):
+                    cloth = Cloth(name, uid=uid)
+                    cloths[uid] = cloth
+                    price_lists[price_list_uid].add_cloth(cloth)
+                for uid, cloth_uid, name, sizes, rates, grid_uid in conn.execute(
+                        "SELECT t.uid, t.cloth_uid, t.name, t.sizes, t.rates, t.grid_uid FROM types t"
+                        f" JOIN cloths c ON c.uid = t.cloth_uid WHERE c.price_list_uid IN ({marks})"
+                        " ORDER BY t.cloth_uid, t.position", list(price_lists)):
+                    cloths[cloth_uid].add_type(self._make_type(catalog, uid, name, sizes, rates, grid_uid))
+                chunk = list(price_lists.values())
+                catalog.adopt(chunk)
+                yield chunk
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _make_type(self, catalog, uid, name, sizes, rates, grid_uid):
+        grid = catalog.grids.get(grid_uid)
+        sizes = unpack_array(SIZE_TYPECODE, sizes)
+        if grid is not None and grid.sizes == sizes:
+            cloth_type = ClothType(grid, name, uid=uid)
+        else:
+            cloth_type = ClothType(name=name, uid=uid)
+            cloth_type.sizes = sizes
+        cloth_type.rates = unpack_array(RATE_TYPECODE, rates)
+        return cloth_type
+
+    def _read_price_list(self, catalog, uid):
+        """The price list as stored, detached, with its position; None if it was deleted."""
+        row = self.conn.execute("SELECT code, name, date, position, stamp FROM price_lists WHERE uid = ?",
+                                (uid,)).fetchone()
+        if row is None:
+            return None
+        code, name, date, position, stamp = row
+        price_list = PriceList(name, code, datetime.date.fromisoformat(date), uid=uid)
+        for cloth_uid, cloth_name in self.conn.execute(
+                "SELECT uid, name FROM cloths WHERE price_list_uid = ? ORDER BY position", (uid,)).fetchall():
+            cloth = price_list.add_cloth(Cloth(cloth_name, uid=cloth_uid))
+            for row in self.conn.execute(
+                    "SELECT uid, name, sizes, rates, grid_uid FROM types WHERE cloth_uid = ? ORDER BY position",
+                    (cloth_uid,)):
+                cloth.add_type(self._make_type(catalog, *row))
+        return price_list, position, stamp
+
+    def reload(self, catalog, uids):
+        """Replaces these price lists and grids in the catalog with what the store holds now.
+
+        Edits to them since the last save are lost; pending changes to
+        everything else are kept. The replacement goes through the catalog's
+        listeners like any other edit, so the widgets follow and it can be
+        undone.
+        """
+        uids = set(uids)
+        dirty, deleted = set(catalog.dirty), dict(catalog.deleted)
+        replaced = set(uids)
+        stamps = {}
+        self.conn.execute("BEGIN")
+        try:
+            for uid in uids:
+                row = self.conn.execute("SELECT name, sizes, labels, stamp FROM size_grids WHERE uid = ?",
+                                        (uid,)).fetchone()
+                grid = catalog.grids.get(uid)
+                if row is not None and grid is not None:
+                    name, sizes, labels, stamps[uid] = row
+                    grid.update(name, unpack_array(SIZE_TYPECODE, sizes), json.loads(labels))
+            for uid in uids - stamps.keys():
+                old = next((pl for pl in catalog.price_lists if pl.uid == uid), None)
+                stored = self._read_price_list(catalog, uid)
+                if old is not None:
+                    replaced.update(node.uid for node in iter_tree(old))
+                    old.detach()
+                if stored is not None:
+                    price_list, position, stamps[uid] = stored
+                    replaced.update(node.uid for node in iter_tree(price_list))
+                    attach(catalog, price_list, position)
+        finally:
+            self.conn.execute("COMMIT")
+        # Keep the other pending changes, and drop those the swap itself made.
+        catalog.dirty.intersection_update(node for node in dirty if node.uid not in replaced)
+        catalog.deleted.clear()
+        catalog.deleted.update((uid, kind) for uid, kind in deleted.items() if uid not in replaced)
+        for uid in uids:
+            if uid in stamps:
+                self.stamps[uid] = stamps[uid]
+            else:
+                self.stamps.pop(uid, None)
+
+    def _check_stamps(self, cur, touched, overwrite):
+        """New stamps for the touched lists and grids; raises SaveConflict unless overwrite."""
+        new_stamps = {}
+        conflicts = []
+        for uid, (kind, name) in touched.items():
+            row = cur.execute(STAMP_SQL[kind][0], (uid,)).fetchone()
+            stamp = row[0] if row is not None else None
+            if stamp != self.stamps.get(uid) and not (kind is PriceList and name is None and stamp is None):
+                conflicts.append((uid, name or (row[1] if row is not None else uid)))
+            new_stamps[uid] = (stamp or 0) + 1
+        if conflicts and not overwrite:
+            raise SaveConflict([uid for uid, _ in conflicts], [name for _, name in conflicts])
+        return new_stamps
+
+    def save(self, catalog, overwrite=False):
+        """Writes the catalog's pending changes; returns the number of rows written.
+
+        Raises SaveConflict, and writes nothing, if another session saved one
+        of the lists or grids to be written since this store read it, unless
+        overwrite is given.
+        """
+        if not catalog.has_changes():
+            return 0
+        positions = {}
+
+        def position(node):
+            parent = node.parent
+            index = positions.get(id(parent))
+            if index is None:
+                index = positions[id(parent)] = {id(c): i for i, c in enumerate(parent.children)}
+            return index[id(node)]
+
+        touched = {}    # uid -> (PriceList or SizeGrid, name; None for a deleted list)
+        list_rows, cloth_rows, type_rows, grid_rows = [], [], [], []
+        for node in catalog.dirty:
+            if node.root() is not catalog:
+                continue
+            if isinstance(node, ClothType):
+                type_rows.append((node.uid, node.cloth.uid, position(node), node.name,
+                                  pack_array(node.sizes), pack_array(node.rates),
+                                  node.grid.uid if node.grid is not None else None))
+            elif isinstance(node, SizeGrid):
+                grid_rows.append((node.uid, node.name, pack_array(node.sizes), json.dumps(node.labels)))
+                touched[node.uid] = (SizeGrid, node.name)
+                continue
+            elif isinstance(node, Cloth):
+                cloth_rows.append((node.uid, node.price_list.uid, position(node), node.name))
+            else:
+                list_rows.append((node.uid, position(node), node.code, node.name,
+                                  node.date.isoformat()))
+            price_list = price_list_of(node)
+            touched[price_list.uid] = (PriceList, f"{price_list.code} {price_list.name}")
+        deleted = {kind: [] for kind in DELETE_SQL}
+        for uid, kind in catalog.deleted.items():
+            deleted[kind].append((uid,))
+            if kind is PriceList:
+                touched[uid] = (PriceList, None)
+
+        cur = self.conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            new_stamps = self._check_stamps(cur, touched, overwrite)
+            # Children before parents on delete, parents before children on insert.
+            for kind in (ClothType, Cloth, PriceList):
+                if deleted[kind]:
+                    cur.executemany(DELETE_SQL[kind], deleted[kind])
+            if grid_rows:
+                cur.executemany(UPSERT_GRID, grid_rows)
+            if list_rows:
+                cur.executemany(UPSERT_PRICE_LIST, list_rows)
+            if cloth_rows:
+                cur.executemany(UPSERT_CLOTH, cloth_rows)
+            if type_rows:
+                cur.executemany(UPSERT_TYPE, type_rows)
+            for uid, (kind, _) in touched.items():
+                cur.execute(STAMP_SQL[kind][1], (new_stamps[uid], uid))
+            self.versions.record(cur, catalog)
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            self.versions.rollback()
+            raise
+        self.stamps.update(new_stamps)
+        for uid, kind in catalog.deleted.items():
+            if kind is PriceList:
+                self.stamps.pop(uid, None)
+        written = (len(list_rows) + len(cloth_rows) + len(type_rows) + len(grid_rows)
+                   + len(catalog.deleted))
+        catalog.clear_changes()
+        return written
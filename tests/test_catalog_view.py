@@ -0,0 +1,50 @@
+from models import Catalog, PriceList, Cloth, ClothType
+from catalog_view import CatalogTreeModel, RATE_ROW
+
+
+def make_catalog():
+    catalog = Catalog()
+    for i in range(3):
+        price_list = catalog.add_price_list(PriceList(f"List {i}", f"PL{i}"))
+        for c in range(2):
+            cloth = price_list.add_cloth(Cloth(f"Cloth {i}.{c}"))
+            cloth.add_type(ClothType([20, 22], "Regular", [100.0, 110.0]))
+    return catalog
+
+
+def walk(model, parent):
+    for row in range(model.rowCount(parent)):
+        index = model.index(row, 0, parent)
+        yield index
+        yield from walk(model, index)
+
+
+def test_parent_finds_the_row_of_every_node():
+    model = CatalogTreeModel(make_catalog())
+    for index in walk(model, model.index(-1, 0)):
+        parent = model.parent(index)
+        assert model.index(index.row(), 0, parent) == index
+
+
+def test_reload_picks_up_moved_rows():
+    catalog = make_catalog()
+    model = CatalogTreeModel(catalog)
+    second = catalog.price_lists[1]
+    cloth_index = model.index(0, 0, model.index(1, 0))
+    assert model.parent(cloth_index).row() == 1
+
+    catalog.price_lists[0].detach()
+    model.reload()
+    cloth_index = model.index(0, 0, model.index(0, 0))
+    assert model.node(model.parent(cloth_index)) is second
+    assert model.parent(cloth_index).row() == 0
+
+
+def test_set_rate_marks_the_type_edited():
+    catalog = make_catalog()
+    model = CatalogTreeModel(catalog)
+    cloth_type = catalog.price_lists[2].cloths[1].types[0]
+    type_index = model.index(0, 0, model.index(1, 0, model.index(2, 0)))
+    assert model.setData(model.index(RATE_ROW, 2, type_index), "125")
+    assert list(cloth_type.rates) == [100.0, 125.0]
+    assert model.edited == {cloth_type}
@@ -0,0 +1,87 @@
+from models import Catalog, PriceList, Cloth, ClothType
+from importer import CsvImporter
+
+
+def make_catalog():
+    catalog = Catalog()
+    price_list = catalog.add_price_list(PriceList("Shirts", "PL1"))
+    cloth = price_list.add_cloth(Cloth("Cotton"))
+    cloth.add_type(ClothType([20, 22], "Regular", [100.0, 110.0]))
+    return catalog
+
+
+def listen(catalog):
+    changes = []
+    catalog.listeners.append(lambda node, change: changes.append((node, change[0])))
+    return changes
+
+
+ROWS = [
+    ["list", "cloth", "type", "size", "rate"],
+    ["Shirts", "Cotton", "Regular", "22", "115"],
+    ["Shirts", "Cotton", "Regular", "24", "120"],
+    ["Shirts", "Linen", "Regular", "20", "300"],
+    ["Trousers", "Denim", "Slim Fit", "30", "500"],
+    ["Trousers", "Denim", "Slim Fit", "x", "500"],
+    ["Trousers", "Denim", "Slim Fit", "32", "-1"],
+]
+
+
+def test_import_rows():
+    catalog = make_catalog()
+    changes = listen(catalog)
+    result = CsvImporter(catalog).import_rows(ROWS)
+
+    assert result.rows == 4
+    assert result.skipped == 2
+    assert [line_no for line_no, _ in result.errors] == [6, 7]
+    regular = catalog.price_lists[0].cloths[0].types[0]
+    assert list(regular.sizes) == [20, 22, 24]
+    assert list(regular.rates) == [100.0, 115.0, 120.0]
+    assert result.updated == {regular}
+    assert [pl.name for pl in catalog.price_lists] == ["Shirts", "Trousers"]
+    assert [c.name for c in catalog.price_lists[0].cloths] == ["Cotton", "Linen"]
+    # One change for the updated type, one attach per new subtree.
+    assert [kind for _, kind in changes] == ["attach", "attach", "sizes"]
+
+
+def test_staged_import_waits_for_commit():
+    catalog = make_catalog()
+    changes = listen(catalog)
+    importer = CsvImporter(catalog, staged=True)
+    result = importer.import_rows(ROWS)
+
+    assert changes == []
+    assert len(catalog.price_lists) == 1
+    assert list(catalog.price_lists[0].cloths[0].types[0].rates) == [100.0, 110.0]
+
+    importer.commit(result)
+    assert result.rows == 4
+    assert [pl.name for pl in catalog.price_lists] == ["Shirts", "Trousers"]
+    assert list(catalog.price_lists[0].cloths[0].types[0].rates) == [100.0, 115.0, 120.0]
+
+
+def test_staged_import_matches_the_catalog_as_it_was():
+    catalog = make_catalog()
+    importer = CsvImporter(catalog, staged=True)
+    # Added after the importer was made, as the GUI could while the job runs.
+    catalog.add_price_list(PriceList("Trousers", "PL2"))
+    result = importer.import_rows(ROWS)
+    importer.commit(result)
+    assert [pl.name for pl in catalog.price_lists] == ["Shirts", "Trousers", "Trousers"]
+    assert catalog.price_lists[1].cloths == []
+
+
+def test_staged_import_skips_rows_of_deleted_lists():
+    catalog = make_catalog()
+    importer = CsvImporter(catalog, staged=True)
+    result = importer.import_rows(ROWS)
+    shirts = catalog.price_lists[0]
+    shirts.detach()
+    importer.commit(result)
+
+    assert [pl.name for pl in catalog.price_lists] == ["Trousers"]
+    assert result.rows == 1
+    assert result.skipped == 5
+    assert list(shirts.cloths[0].types[0].rates) == [100.0, 110.0]
+    assert shirts.cloths[1:] == []
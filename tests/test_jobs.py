@@ -0,0 +1,45 @@
+import datetime
+
+from models import Catalog, PriceList, Cloth, ClothType, SizeGrid, dump_node
+from jobs import Snapshot
+
+
+def make_catalog():
+    catalog = Catalog()
+    grid = catalog.add_grid(SizeGrid("S–L", range(1, 4), ("S", "M", "L")))
+    price_list = catalog.add_price_list(PriceList("Shirts", "PL1", datetime.date(2024, 5, 1)))
+    cloth = price_list.add_cloth(Cloth("Cotton"))
+    cloth.add_type(ClothType([20, 22], "Regular", [100.0, 110.0]))
+    cloth.add_type(ClothType(grid, "Slim Fit", [200.0, 210.0, 220.0]))
+    catalog.add_price_list(PriceList("Trousers", "PL2"))
+    return catalog
+
+
+def test_snapshot_copies_the_lists():
+    catalog = make_catalog()
+    snapshot = Snapshot(catalog.price_lists)
+    assert len(snapshot) == 2
+    copies = list(snapshot)
+    assert [dump_node(pl) for pl in copies] == [dump_node(pl) for pl in catalog.price_lists]
+    assert all(pl.root() is None for pl in copies)
+    slim = copies[0].cloths[0].types[1]
+    assert slim.grid is not catalog.price_lists[0].cloths[0].types[1].grid
+    assert [slim.size_label(col) for col in range(3)] == ["S", "M", "L"]
+
+
+def test_snapshot_keeps_the_lists_as_they_were():
+    catalog = make_catalog()
+    snapshot = Snapshot(catalog.price_lists)
+    regular = catalog.price_lists[0].cloths[0].types[0]
+    regular.set_rate(0, 105.0)
+    regular.append_size(24, 120.0)
+    catalog.price_lists[0].set_name("Shirts 2025")
+    catalog.price_lists[1].add_cloth(Cloth("Denim"))
+
+    shirts, trousers = snapshot
+    assert shirts.name == "Shirts"
+    assert list(shirts.cloths[0].types[0].sizes) == [20, 22]
+    assert list(shirts.cloths[0].types[0].rates) == [100.0, 110.0]
+    assert trousers.cloths == []
+    # Every item is a fresh copy.
+    assert snapshot[0] is not snapshot[0]
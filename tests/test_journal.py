@@ -0,0 +1,102 @@
+import datetime
+
+from models import Catalog, PriceList, Cloth, ClothType, SizeGrid, dump_node
+from journal import Journal, encode, fold
+
+
+def make_catalog():
+    catalog = Catalog()
+    price_list = catalog.add_price_list(PriceList("Shirts", "PL1", datetime.date(2024, 5, 1), uid="pl"))
+    cloth = price_list.add_cloth(Cloth("Cotton", uid="c"))
+    cloth.add_type(ClothType([20, 22], "Regular", [100.0, 110.0], uid="t"))
+    catalog.clear_changes()
+    return catalog
+
+
+def record_changes(catalog):
+    records = []
+    catalog.listeners.append(lambda node, change: records.append(encode(node, change)))
+    return records
+
+
+def test_encode_keeps_new_values():
+    catalog = make_catalog()
+    records = record_changes(catalog)
+    cloth_type = catalog.price_lists[0].cloths[0].types[0]
+    cloth_type.set_rate(1, 115.0)
+    cloth_type.set_name("Slim")
+    cloth_type.append_size(24, 120.0)
+    catalog.price_lists[0].set_date(datetime.date(2024, 6, 1))
+    cloth_type.detach()
+    assert records == [
+        ["r", "t", 1, 115.0],
+        ["n", "t", "Slim"],
+        ["z", "t", [20, 22, 24], [100.0, 115.0, 120.0], None],
+        ["d", "pl", "2024-06-01"],
+        ["x", "t"],
+    ]
+
+
+def test_fold_keeps_the_last_record_of_each_value():
+    records = [
+        ["r", "t", 0, 1.0],
+        ["r", "t", 1, 2.0],
+        ["n", "t", "A"],
+        ["r", "t", 0, 3.0],
+        ["n", "t", "B"],
+    ]
+    assert fold(records) == [["r", "t", 1, 2.0], ["r", "t", 0, 3.0], ["n", "t", "B"]]
+
+
+def test_fold_drops_what_a_size_row_or_detach_replaces():
+    added = ["a", "c", 1, {"kind": "type", "uid": "u", "name": "New", "sizes": [20], "rates": [5.0]}]
+    records = [
+        ["r", "t", 0, 1.0],
+        ["n", "t", "A"],
+        ["z", "t", [20], [2.0], None],
+        added,
+        ["r", "u", 0, 6.0],
+        ["x", "u"],
+    ]
+    assert fold(records) == [["n", "t", "A"], ["z", "t", [20], [2.0], None], ["x", "u"]]
+
+
+def test_replay_gives_the_latest_state(tmp_path):
+    path = str(tmp_path / "edits.journal")
+    catalog = make_catalog()
+    journal = Journal(path, commit_interval=0)
+    journal.attach(catalog)
+    grid = catalog.add_grid(SizeGrid("S–M", [1, 2], ["S", "M"], uid="g"))
+    price_list = catalog.price_lists[0]
+    price_list.set_code("PL9")
+    price_list.cloths[0].add_type(ClothType(grid, "Kids", [50.0, 60.0], uid="k"))
+    price_list.cloths[0].types[0].set_rates([101.0, 111.0])
+    journal.flush()
+    journal.close()
+
+    replayed = make_catalog()
+    journal = Journal(path)
+    assert journal.replay(replayed) == 4
+    journal.close()
+    assert dump_node(replayed.price_lists[0]) == dump_node(price_list)
+    assert replayed.price_lists[0].cloths[0].types[1].grid is replayed.grids["g"]
+
+
+def test_compaction_folds_the_sealed_segment(tmp_path):
+    path = str(tmp_path / "edits.journal")
+    catalog = make_catalog()
+    journal = Journal(path, commit_interval=0, compact_after=10)
+    journal.attach(catalog)
+    cloth_type = catalog.price_lists[0].cloths[0].types[0]
+    for i in range(25):
+        cloth_type.set_rate(0, float(i))
+        journal.flush()
+    journal.close()
+
+    replayed = make_catalog()
+    journal = Journal(path)
+    assert journal.replay(replayed) < 25
+    journal.reset()
+    assert not journal.has_records()
+    journal.close()
+    assert list(replayed.price_lists[0].cloths[0].types[0].rates) == [24.0, 110.0]
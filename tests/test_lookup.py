@@ -0,0 +1,59 @@
+import datetime
+
+import pytest
+
+from models import PriceList, Cloth, ClothType
+from storage import PriceListStore
+from lookup import RateLookup, query_of
+
+
+def make_store(path):
+    store = PriceListStore(path)
+    catalog = store.load()
+    price_list = catalog.add_price_list(PriceList("Uniforms", "U1", datetime.date(2026, 1, 1)))
+    cloth = price_list.add_cloth(Cloth("Cotton Shirt"))
+    cloth.add_type(ClothType([20, 22], "Half Sleeve", [250.0, 260.0]))
+    cloth.add_type(ClothType(catalog.find_grid("S–XXL"), "Polo", [300.0, 310.0, 320.0, 330.0, 340.0]))
+    store.save(catalog)
+    return store, catalog
+
+
+def test_query_of():
+    item = {"code": "U1", "cloth": "Cotton Shirt", "type": "Polo", "size": "M"}
+    assert query_of(item) == ("U1", "Cotton Shirt", "Polo", "M")
+    assert query_of(dict(item, size=32)) == ("U1", "Cotton Shirt", "Polo", 32)
+
+
+@pytest.mark.parametrize("item", [
+    {"code": "U1", "cloth": "Cotton Shirt", "type": "Polo", "size": True},
+    {"code": "U1", "cloth": "Cotton Shirt", "type": "Polo", "size": 32.5},
+    {"code": "U1", "cloth": "Cotton Shirt", "type": ["Polo"], "size": 32},
+    {"code": 1, "cloth": "Cotton Shirt", "type": "Polo", "size": 32},
+])
+def test_query_of_rejects_bad_values(item):
+    with pytest.raises(ValueError):
+        query_of(item)
+
+
+def test_query_of_needs_every_field():
+    with pytest.raises(KeyError):
+        query_of({"code": "U1", "cloth": "Cotton Shirt", "size": 32})
+
+
+def test_rates(tmp_path):
+    path = str(tmp_path / "price_lists.db")
+    store, catalog = make_store(path)
+    lookup = RateLookup(path)
+    assert lookup.rate("U1", "Cotton Shirt", "Half Sleeve", 22) == 260.0
+    assert lookup.rate("U1", "Cotton Shirt", "Half Sleeve", " 22") == 260.0
+    assert lookup.rate("U1", "Cotton Shirt", "Polo", "XL") == 330.0
+    assert lookup.rates([("U1", "Cotton Shirt", "Polo", "S"), ("U2", "Cotton Shirt", "Polo", "S"),
+                         ("U1", "Linen", "Polo", "S"), ("U1", "Cotton Shirt", "Polo", 24)]) \
+        == [300.0, None, None, None]
+
+    # A save by another connection is seen on the next lookup.
+    catalog.price_lists[0].cloths[0].types[0].set_rate(1, 265.0)
+    store.save(catalog)
+    assert lookup.rate("U1", "Cotton Shirt", "Half Sleeve", 22) == 265.0
+    lookup.close()
+    store.close()
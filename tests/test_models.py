@@ -0,0 +1,94 @@
+import datetime
+
+import pytest
+
+from models import (Catalog, PriceList, Cloth, ClothType, SizeGrid, apply_grid, dump_node, load_node,
+                    parse_grid, parse_rate, parse_size, types_in)
+
+
+@pytest.mark.parametrize("text, size", [("32", 32), (" 20 ", 20), ("0", 0), ("65535", 65535),
+                                        ("65536", None), ("-2", None), ("3.5", None), ("M", None), ("", None)])
+def test_parse_size(text, size):
+    assert parse_size(text) == size
+
+
+@pytest.mark.parametrize("text, rate", [("250", 250.0), (" 12.5 ", 12.5), ("-1", -1.0), ("nan", None),
+                                        ("inf", None), ("abc", None), ("", None), (None, None)])
+def test_parse_rate(text, rate):
+    assert parse_rate(text) == rate
+
+
+def make_catalog():
+    catalog = Catalog()
+    price_list = catalog.add_price_list(PriceList("Shirts", "PL1", datetime.date(2024, 5, 1)))
+    cloth = price_list.add_cloth(Cloth("Cotton"))
+    cloth.add_type(ClothType([20, 22], "Regular", [100.0, 110.0]))
+    cloth.add_type(ClothType([20], "Slim", [150.0]))
+    return catalog
+
+
+def test_sizes_and_rates_are_arrays():
+    cloth_type = ClothType([20, 22], "Regular")
+    assert cloth_type.sizes.typecode == "H"
+    assert cloth_type.rates.tolist() == [0.0, 0.0]
+    with pytest.raises(ValueError):
+        ClothType([20, 22], "Regular", [1.0])
+
+
+def test_dump_and_load_round_trip():
+    price_list = make_catalog().price_lists[0]
+    copy = load_node(dump_node(price_list))
+    assert copy is not price_list and copy.root() is None
+    assert dump_node(copy) == dump_node(price_list)
+
+
+def test_changes_are_tracked():
+    catalog = make_catalog()
+    changes = []
+    catalog.listeners.append(lambda node, change: changes.append(change[0]))
+    catalog.clear_changes()
+    cloth = catalog.price_lists[0].cloths[0]
+    cloth.types[0].set_rate(0, 105.0)
+    assert catalog.dirty == {cloth.types[0]}
+    slim = cloth.types[1]
+    slim.detach()
+    assert catalog.deleted == {slim.uid: ClothType}
+    assert changes == ["rate", "detach"]
+    assert types_in(catalog) == [cloth.types[0]]
+
+
+@pytest.mark.parametrize("text, sizes, labels", [
+    ("20-26", [20, 22, 24, 26], ()),
+    ("20-30/5", [20, 25, 30], ()),
+    ("20, 22, 28", [20, 22, 28], ()),
+    ("S, M, L", [1, 2, 3], ("S", "M", "L")),
+    (" S,, XL ", [1, 2], ("S", "XL")),
+])
+def test_parse_grid(text, sizes, labels):
+    assert parse_grid(text) == (sizes, labels)
+
+
+@pytest.mark.parametrize("text", ["", " , ", "30-20", "20-30/0", "20-X"])
+def test_parse_grid_rejects(text):
+    with pytest.raises(ValueError):
+        parse_grid(text)
+
+
+def test_types_share_their_grid():
+    catalog = make_catalog()
+    grid = catalog.add_grid(SizeGrid("S–L", [1, 2, 3], ["S", "M", "L"]))
+    regular, slim = types_in(catalog)
+    assert apply_grid(grid, [regular, slim]) == 2
+    assert regular.sizes is grid.sizes and slim.sizes is grid.sizes
+    assert regular.rates.tolist() == [0.0, 0.0, 0.0]
+    assert [regular.size_label(col) for col in range(3)] == ["S", "M", "L"]
+    assert apply_grid(grid, [regular]) == 0
+
+    grid.set_sizes([1, 2, 3, 4], ["S", "M", "L", "XL"])
+    assert slim.sizes is grid.sizes and slim.size_label(3) == "XL"
+
+    # Changing one size takes the type off the grid.
+    slim.set_size(0, 30)
+    assert slim.grid is None and slim.sizes.tolist() == [30, 2, 3, 4]
+    assert grid.sizes.tolist() == [1, 2, 3, 4]
+    assert list(grid.types) == [regular]
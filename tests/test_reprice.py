@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from models import Catalog, PriceList, Cloth, ClothType
+from reprice import RepricePlan, round_rates
+
+
+@pytest.mark.parametrize("rounding, rates, expected", [
+    ("1", [12.5, 250.5, 251.5, 12.4, 12.6], [13, 251, 252, 12, 13]),
+    ("5", [12.5, 7.5, 12.4, 17.5], [15, 10, 10, 20]),
+    ("10", [7.5, 15, 25, 24.9], [10, 20, 30, 20]),
+    ("end9", [241, 249, 250], [249, 249, 259]),
+    ("end99", [12.3, 12.99, 13], [12.99, 12.99, 13.99]),
+    ("none", [12.345], [12.345]),
+])
+def test_round_rates(rounding, rates, expected):
+    assert round_rates(np.array(rates), rounding).tolist() == pytest.approx(expected)
+
+
+def make_catalog():
+    catalog = Catalog()
+    price_list = catalog.add_price_list(PriceList("Shirts", "PL1"))
+    cloth = price_list.add_cloth(Cloth("Cotton"))
+    cloth.add_type(ClothType([20, 22, 24], "Regular", [100.0, 110.0, 120.0]))
+    cloth.add_type(ClothType([20, 22], "Slim Fit", [200.0, 200.0]))
+    return catalog, cloth
+
+
+def test_plan_previews_without_writing():
+    catalog, cloth = make_catalog()
+    plan = RepricePlan(catalog, percent=5, rounding="1")
+    assert len(plan) == 5
+    assert list(cloth.types[0].rates) == [100.0, 110.0, 120.0]
+    assert [row[2:] for row in plan.rows(2)] == [(20, 100.0, 105.0), (22, 110.0, 116.0)]
+
+
+def test_plan_applies_only_inside_the_size_range():
+    catalog, cloth = make_catalog()
+    plan = RepricePlan(catalog, step=10, min_size=22, max_size=22)
+    assert plan.apply() == 2
+    assert list(cloth.types[0].rates) == [100.0, 120.0, 120.0]
+    assert list(cloth.types[1].rates) == [200.0, 210.0]
+
+
+def test_plan_skips_a_type_edited_since_the_preview():
+    catalog, cloth = make_catalog()
+    plan = RepricePlan(catalog, step=1)
+    cloth.types[1].append_size(26, 300.0)
+    plan.apply()
+    assert list(cloth.types[0].rates) == [101.0, 111.0, 121.0]
+    assert list(cloth.types[1].rates) == [200.0, 200.0, 300.0]
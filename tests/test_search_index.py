@@ -0,0 +1,57 @@
+import operator
+
+from models import Catalog, PriceList, Cloth, ClothType
+from search_index import CatalogContentIndex, PriceListSearchIndex, parse_query
+
+
+def make_catalog():
+    catalog = Catalog()
+    price_list = catalog.add_price_list(PriceList("Shirts", "PL1"))
+    cotton = price_list.add_cloth(Cloth("Cotton Shirt"))
+    cotton.add_type(ClothType([20, 22], "Half Sleeve", [250.0, 260.0]))
+    cotton.add_type(ClothType([20, 22], "Full Sleeve", [300.0, 450.0]))
+    linen = price_list.add_cloth(Cloth("Linen Kurta"))
+    linen.add_type(ClothType([36, 38], "Regular", [500.0, 520.0]))
+    return catalog
+
+
+def names(nodes):
+    return sorted(node.name for node in nodes)
+
+
+def test_words_match_by_prefix():
+    index = CatalogContentIndex(make_catalog())
+    assert names(index.search("sle")) == ["Full Sleeve", "Half Sleeve"]
+    assert names(index.search("cot")) == ["Cotton Shirt"]
+    assert names(index.search("cotton full")) == ["Full Sleeve"]
+    assert index.search("shirts") == []
+    assert index.search("zzz") == []
+
+
+def test_size_and_rate_filters():
+    index = CatalogContentIndex(make_catalog())
+    assert names(index.search("size:22 rate>400")) == ["Full Sleeve"]
+    assert names(index.search("rate<=250")) == ["Half Sleeve"]
+    assert names(index.search("cotton sleeve size:20 rate<300")) == ["Half Sleeve"]
+
+
+def test_index_follows_renames_and_new_nodes():
+    catalog = make_catalog()
+    index = CatalogContentIndex(catalog)
+    assert names(index.search("lin")) == ["Linen Kurta"]
+    catalog.price_lists[0].cloths[1].set_name("Silk Kurta")
+    catalog.price_lists[0].cloths[0].add_type(ClothType([24], "Linen Lined", [280.0]))
+    assert names(index.search("lin")) == ["Linen Lined"]
+    assert names(index.search("si")) == ["Silk Kurta"]
+
+
+def test_parse_query():
+    assert parse_query("Cotton size : 36 rate>400") == ({"cotton"}, 36, [(operator.gt, 400.0)])
+
+
+def test_price_list_search():
+    index = PriceListSearchIndex(["PL001", "PL002", "AB003"], ["Cotton Shirts", "Linen", "Cotton Trousers"])
+    assert list(index.search("pl", "")) == [0, 1]
+    assert list(index.search("", "cotton")) == [0, 2]
+    assert list(index.search("pl", "cotton")) == [0]
+    assert list(index.search("", "")) == [0, 1, 2]
@@ -0,0 +1,156 @@
+import datetime
+import multiprocessing
+import sqlite3
+
+import pytest
+
+import storage
+from models import PriceList, Cloth, ClothType
+from storage import (PriceListStore, SaveConflict, SCHEMA_VERSION, DEFAULT_GRIDS, SCHEMA, SCHEMA_GRIDS,
+                     run_script)
+from versions import VERSION_SCHEMA
+
+SESSIONS = 6
+
+
+def schema_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def count(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def open_store(path, barrier, results):
+    barrier.wait()
+    try:
+        PriceListStore(path).close()
+    except Exception as e:
+        results.put(repr(e))
+    else:
+        results.put(None)
+
+
+def test_new_store_is_migrated(tmp_path):
+    path = str(tmp_path / "price_lists.db")
+    PriceListStore(path).close()
+    assert schema_version(path) == SCHEMA_VERSION
+    assert count(path, "size_grids") == len(DEFAULT_GRIDS)
+
+
+OLD_SCHEMAS = {1: [SCHEMA], 2: [SCHEMA, SCHEMA_GRIDS], 3: [SCHEMA, SCHEMA_GRIDS, VERSION_SCHEMA]}
+
+
+@pytest.mark.parametrize("old_version", sorted(OLD_SCHEMAS))
+def test_upgrades_an_older_store(tmp_path, old_version):
+    path = str(tmp_path / "price_lists.db")
+    conn = sqlite3.connect(path, isolation_level=None)
+    for script in OLD_SCHEMAS[old_version]:
+        run_script(conn.cursor(), script)
+    conn.execute("INSERT INTO price_lists (uid, position, code, name, date) VALUES ('a', 0, 'C1', 'Old', '2025-01-01')")
+    conn.execute(f"PRAGMA user_version = {old_version}")
+    conn.close()
+
+    store = PriceListStore(path)
+    catalog = store.load()
+    assert schema_version(path) == SCHEMA_VERSION
+    assert [pl.name for pl in catalog.price_lists] == ["Old"]
+    # The default grids are seeded by the upgrade to version 2 only.
+    assert len(catalog.grids) == (len(DEFAULT_GRIDS) if old_version < 2 else 0)
+    catalog.price_lists[0].set_name("Renamed")
+    assert store.save(catalog) == 1
+    store.close()
+
+
+def test_failed_migration_leaves_the_store_as_it_was(tmp_path, monkeypatch):
+    path = str(tmp_path / "price_lists.db")
+    monkeypatch.setattr(storage, "SCHEMA_STAMPS", "ALTER TABLE no_such_table ADD COLUMN x INTEGER;")
+    with pytest.raises(sqlite3.OperationalError):
+        PriceListStore(path)
+    assert schema_version(path) == 0
+    monkeypatch.undo()
+    PriceListStore(path).close()
+    assert schema_version(path) == SCHEMA_VERSION
+    assert count(path, "size_grids") == len(DEFAULT_GRIDS)
+
+
+def test_sessions_opening_a_new_store_at_once(tmp_path):
+    path = str(tmp_path / "price_lists.db")
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(SESSIONS)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=open_store, args=(path, barrier, results)) for _ in range(SESSIONS)]
+    for process in processes:
+        process.start()
+    errors = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+    assert errors == [None] * SESSIONS
+    assert schema_version(path) == SCHEMA_VERSION
+    assert count(path, "size_grids") == len(DEFAULT_GRIDS)
+
+
+def make_list(catalog, name="Uniforms", code="U1"):
+    price_list = catalog.add_price_list(PriceList(name, code, datetime.date(2026, 1, 1)))
+    cloth = price_list.add_cloth(Cloth("Cotton Shirt"))
+    cloth.add_type(ClothType([20, 22, 24], "Half Sleeve", [250.0, 260.0, 270.0]))
+    return price_list
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "price_lists.db")
+    store = PriceListStore(path)
+    catalog = store.load()
+    make_list(catalog)
+    store.save(catalog)
+    assert not catalog.has_changes()
+    store.close()
+
+    store = PriceListStore(path)
+    loaded = store.load()
+    store.close()
+    cloth_type = loaded.price_lists[0].cloths[0].types[0]
+    assert cloth_type.name == "Half Sleeve"
+    assert cloth_type.sizes.tolist() == [20, 22, 24]
+    assert cloth_type.rates.tolist() == [250.0, 260.0, 270.0]
+
+
+def test_save_writes_only_what_changed(tmp_path):
+    store = PriceListStore(str(tmp_path / "price_lists.db"))
+    catalog = store.load()
+    price_list = make_list(catalog)
+    make_list(catalog, "Other", "O1")
+    store.save(catalog)
+    price_list.cloths[0].types[0].set_rate(1, 300.0)
+    assert store.save(catalog) == 1
+    store.close()
+
+
+def test_conflicting_saves(tmp_path):
+    path = str(tmp_path / "price_lists.db")
+    first = PriceListStore(path)
+    catalog = first.load()
+    make_list(catalog)
+    first.save(catalog)
+
+    second = PriceListStore(path)
+    theirs = second.load()
+    theirs.price_lists[0].set_name("Theirs")
+    second.save(theirs)
+
+    catalog.price_lists[0].set_name("Ours")
+    with pytest.raises(SaveConflict) as raised:
+        first.save(catalog)
+    assert list(raised.value.uids) == [catalog.price_lists[0].uid]
+    first.save(catalog, overwrite=True)
+    assert second.load().price_lists[0].name == "Ours"
+    first.close()
+    second.close()
@@ -0,0 +1,101 @@
+from models import Catalog, PriceList, Cloth, ClothType, SizeGrid, apply_grid, dump_node
+from undo import UndoStack, ENTRY_COST
+
+
+def make_catalog():
+    catalog = Catalog()
+    price_list = catalog.add_price_list(PriceList("Shirts", "PL1"))
+    cloth = price_list.add_cloth(Cloth("Cotton"))
+    cloth.add_type(ClothType([20, 22], "Regular", [100.0, 110.0]))
+    return catalog
+
+
+def test_edits_to_one_value_merge():
+    catalog = make_catalog()
+    undo_stack = UndoStack(catalog)
+    price_list = catalog.price_lists[0]
+    for name in ("S", "Sh", "Shi"):
+        price_list.set_name(name)
+    price_list.set_code("PL2")
+    assert len(undo_stack.undo_entries) == 2
+
+    undo_stack.undo()
+    undo_stack.undo()
+    assert (price_list.name, price_list.code) == ("Shirts", "PL1")
+    undo_stack.redo()
+    assert price_list.name == "Shi"
+
+
+def test_no_merge_after_a_pause_or_break():
+    catalog = make_catalog()
+    cloth_type = catalog.price_lists[0].cloths[0].types[0]
+    undo_stack = UndoStack(catalog, merge_seconds=0)
+    cloth_type.set_rate(0, 101.0)
+    cloth_type.set_rate(0, 102.0)
+    assert len(undo_stack.undo_entries) == 2
+
+    undo_stack = UndoStack(make_catalog())
+    cloth_type = undo_stack.catalog.price_lists[0].cloths[0].types[0]
+    cloth_type.set_rate(0, 101.0)
+    undo_stack.break_merge()
+    cloth_type.set_rate(0, 102.0)
+    assert len(undo_stack.undo_entries) == 2
+
+
+def test_group_is_one_entry():
+    catalog = make_catalog()
+    before = dump_node(catalog.price_lists[0])
+    undo_stack = UndoStack(catalog)
+    cloth = catalog.price_lists[0].cloths[0]
+    with undo_stack.group():
+        cloth.set_name("Linen")
+        cloth.add_type(ClothType([30], "Long", [300.0]))
+        cloth.types[0].append_size(24, 120.0)
+        cloth.types[0].set_rates([1.0, 2.0, 3.0])
+    assert len(undo_stack.undo_entries) == 1
+    undo_stack.undo()
+    assert dump_node(catalog.price_lists[0]) == before
+
+
+def test_grid_changes_undo():
+    catalog = make_catalog()
+    grid = catalog.add_grid(SizeGrid("Kids", [20, 22]))
+    cloth_type = catalog.price_lists[0].cloths[0].types[0]
+    undo_stack = UndoStack(catalog)
+    with undo_stack.group():
+        apply_grid(grid, [cloth_type])
+    with undo_stack.group():
+        grid.set_sizes([20, 22, 24])
+    assert list(cloth_type.sizes) == [20, 22, 24]
+    assert list(cloth_type.rates) == [100.0, 110.0, 0.0]
+    undo_stack.undo()
+    assert list(grid.sizes) == [20, 22]
+    assert cloth_type.sizes is grid.sizes
+    assert list(cloth_type.rates) == [100.0, 110.0]
+    undo_stack.undo()
+    assert cloth_type.grid is None
+    assert list(cloth_type.sizes) == [20, 22]
+
+
+def test_history_is_capped():
+    catalog = make_catalog()
+    cloth_type = catalog.price_lists[0].cloths[0].types[0]
+    undo_stack = UndoStack(catalog, max_bytes=10 * ENTRY_COST)
+    for i in range(30):
+        cloth_type.set_rate(i % 2, float(i))
+        undo_stack.break_merge()
+    assert len(undo_stack.undo_entries) == 10
+    while undo_stack.undo() is not None:
+        pass
+    assert list(cloth_type.rates) == [18.0, 19.0]
+
+
+def test_a_new_edit_clears_redo():
+    catalog = make_catalog()
+    price_list = catalog.price_lists[0]
+    undo_stack = UndoStack(catalog)
+    price_list.set_name("A")
+    undo_stack.undo()
+    assert undo_stack.can_redo()
+    price_list.set_code("PL2")
+    assert not undo_stack.can_redo()
@@ -0,0 +1,80 @@
+import datetime
+
+from models import PriceList, Cloth, ClothType, dump_node
+from storage import PriceListStore
+
+JAN = datetime.date(2026, 1, 1)
+MAR = datetime.date(2026, 3, 1)
+
+
+def count_nodes(store):
+    return store.conn.execute("SELECT COUNT(*) FROM version_nodes").fetchone()[0]
+
+
+def make_store(tmp_path):
+    store = PriceListStore(str(tmp_path / "price_lists.db"))
+    catalog = store.load()
+    price_list = catalog.add_price_list(PriceList("Uniforms", "U1", JAN))
+    for name in ("Cotton Shirt", "Linen Shirt", "Denim"):
+        cloth = price_list.add_cloth(Cloth(name))
+        cloth.add_type(ClothType([20, 22, 24], "Half Sleeve", [250.0, 260.0, 270.0]))
+        cloth.add_type(ClothType(catalog.find_grid("S–XXL"), "Polo", [300.0, 310.0, 320.0, 330.0, 340.0]))
+    store.save(catalog)
+    return store, catalog
+
+
+def test_versions_by_date(tmp_path):
+    store, catalog = make_store(tmp_path)
+    price_list = catalog.price_lists[0]
+    price_list.set_date(MAR)
+    price_list.cloths[0].types[0].set_rate(1, 280.0)
+    store.save(catalog)
+    versions = store.versions
+
+    assert versions.as_of("U1", JAN - datetime.timedelta(days=1)) is None
+    assert versions.as_of("U1", JAN).effective == JAN
+    assert versions.as_of("U1", MAR + datetime.timedelta(days=10)).effective == MAR
+    assert versions.as_of("U9", MAR) is None
+    assert [v.effective for v in versions.history(price_list.uid)] == [JAN, MAR]
+
+    assert versions.rate("U1", "Cotton Shirt", "Half Sleeve", 22, JAN) == 260.0
+    assert versions.rate("U1", "Cotton Shirt", "Half Sleeve", 22, MAR) == 280.0
+    assert versions.rate("U1", "Denim", "Polo", "M", MAR) == 310.0
+    assert versions.rate("U1", "Denim", "Polo", 26, MAR) is None
+    assert versions.rate("U1", "Silk", "Polo", "M", MAR) is None
+    store.close()
+
+
+def test_unchanged_parts_are_shared(tmp_path):
+    store, catalog = make_store(tmp_path)
+    before = count_nodes(store)
+    catalog.price_lists[0].cloths[2].types[0].set_rate(0, 255.0)
+    store.save(catalog)
+    # A new type, its cloth and the list; the other cloths and types are shared.
+    assert count_nodes(store) == before + 3
+    catalog.price_lists[0].set_name("School Uniforms")
+    store.save(catalog)
+    assert count_nodes(store) == before + 4
+    store.close()
+
+
+def test_load_gives_the_list_back(tmp_path):
+    store, catalog = make_store(tmp_path)
+    price_list = catalog.price_lists[0]
+    version = store.versions.as_of("U1", JAN)
+    price_list.cloths[0].types[1].set_rate(0, 999.0)
+    store.save(catalog)
+
+    loaded = store.versions.load(version, catalog.grids)
+    assert loaded.root() is None
+    polo = loaded.cloths[0].types[1]
+    assert polo.rates.tolist() == [300.0, 310.0, 320.0, 330.0, 340.0]
+    assert polo.grid is catalog.find_grid("S–XXL")
+    assert [polo.size_label(col) for col in range(5)] == ["S", "M", "L", "XL", "XXL"]
+
+    # Without the catalog's grids the labels come back on a copy of the grid.
+    polo = store.versions.load(version).cloths[0].types[1]
+    assert polo.grid is not None and polo.grid.labels == ("S", "M", "L", "XL", "XXL")
+    data = dump_node(store.versions.load(store.versions.as_of("U1", JAN + datetime.timedelta(days=1))))
+    assert data["cloths"][0]["types"][1]["rates"][0] == 999.0
+    store.close()
@@ -0,0 +1,229 @@
+"""Undo/redo history for catalog edits.
+
+UndoStack listens to the catalog and records each change as a small diff:
+the node, what changed, and the value before and after. Consecutive changes
+to the same value (keystrokes in one field, retyping one cell) merge into a
+single entry. Undo and redo go back through the model's own methods, so the
+dirty set, journal and indexes follow along, and the widgets are updated in
+place by whoever listens for the change.
+
+The history is capped by an estimate of the memory it holds; the oldest
+entries are dropped first.
+"""
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+from models import attach, iter_tree
+
+MAX_HISTORY_BYTES = 4 * 1024 * 1024
+MERGE_SECONDS = 2.0     # a pause longer than this starts a new entry
+ENTRY_COST = 96         # rough bytes held by one recorded change
+
+
+class Change:
+    __slots__ = ("node", "kind", "key", "before", "after", "parent", "cost")
+
+    def __init__(self, node, kind, key, before, after, parent=None, cost=ENTRY_COST):
+        self.node = node
+        self.kind = kind
+        self.key = key
+        self.before = before
+        self.after = after
+        self.parent = parent
+        self.cost = cost
+
+
+def record_change(node, change):
+    """Builds a Change from a catalog notification (called after the edit)."""
+    kind = change[0]
+    if kind in ("name", "code", "date"):
+        return Change(node, kind, (node, kind), change[1], getattr(node, kind))
+    if kind == "size":
+        col = change[1]
+        return Change(node, kind, (node, kind, col), change[2], node.sizes[col])
+    if kind == "rate":
+        col = change[1]
+        return Change(node, kind, (node, kind, col), change[2], node.rates[col])
+    if kind == "rates":
+        cost = ENTRY_COST + 16 * len(node.rates)
+        return Change(node, kind, None, change[1], array(node.rates.typecode, node.rates), cost=cost)
+    if kind == "sizes":
+        # A type on a grid keeps sharing the grid's array; its own are copied.
+        sizes = node.sizes if node.grid is not None else array(node.sizes.typecode, node.sizes)
+        cost = ENTRY_COST + 20 * (len(change[1]) + len(sizes))
+        return Change(node, kind, None, change[1:], (sizes, array(node.rates.typecode, node.rates), node.grid),
+                      cost=cost)
+    if kind == "grid":
+        if change[1] is None:
+            return None     # a new grid; there is nothing to put back
+        cost = ENTRY_COST + 2 * (len(change[2]) + len(node.sizes))
+        return Change(node, kind, None, change[1:], (node.name, node.sizes, node.labels), cost=cost)
+    if kind == "append_size":
+        return Change(node, kind, None, None, (node.sizes[-1], node.rates[-1]))
+    if kind == "pop_size":
+        return Change(node, kind, None, (change[1], change[2]), None)
+    if kind == "attach":
+        return Change(node, kind, None, None, change[1], parent=node.parent)
+    if kind == "detach":
+        _, parent, index = change
+        cost = sum(ENTRY_COST + 16 * len(getattr(n, "sizes", ())) for n in iter_tree(node))
+        return Change(node, kind, None, index, None, parent=parent, cost=cost)
+    return None
+
+
+def apply_change(change, undo):
+    node, kind = change.node, change.kind
+    value = change.before if undo else change.after
+    if kind == "name":
+        node.set_name(value)
+    elif kind == "code":
+        node.set_code(value)
+    elif kind == "date":
+        node.set_date(value)
+    elif kind == "size":
+        node.set_size(change.key[2], value)
+    elif kind == "rate":
+        node.set_rate(change.key[2], value)
+    elif kind == "rates":
+        node.set_rates(value)
+    elif kind == "sizes":
+        node.set_sizes(*value)
+    elif kind == "grid":
+        node.update(*value)
+    elif kind == "append_size":
+        if undo:
+            node.pop_size()
+        else:
+            node.append_size(*change.after)
+    elif kind == "pop_size":
+        if undo:
+            node.append_size(*change.before)
+        else:
+            node.pop_size()
+    elif kind == "attach":
+        if undo:
+            node.detach()
+        else:
+            attach(change.parent, node, change.after)
+    elif kind == "detach":
+        if undo:
+            attach(change.parent, node, change.before)
+        else:
+            node.detach()
+
+
+class Entry:
+    __slots__ = ("changes", "cost", "time")
+
+    def __init__(self):
+        self.changes = []
+        self.cost = 0
+        self.time = time.monotonic()
+
+
+class UndoStack:
+    def __init__(self, catalog, max_bytes=MAX_HISTORY_BYTES, merge_seconds=MERGE_SECONDS):
+        self.catalog = catalog
+        self.max_bytes = max_bytes
+        self.merge_seconds = merge_seconds
+        self.undo_entries = deque()
+        self.redo_entries = []
+        self.applying = False
+        self._bytes = 0
+        self._group = None
+        self._mergeable = False
+        catalog.listeners.append(self.on_change)
+
+    def close(self):
+        self.catalog.listeners.remove(self.on_change)
+
+    def can_undo(self):
+        return bool(self.undo_entries)
+
+    def can_redo(self):
+        return bool(self.redo_entries)
+
+    def clear(self):
+        self.undo_entries.clear()
+        self.redo_entries.clear()
+        self._bytes = 0
+        self._mergeable = False
+
+    def break_merge(self):
+        """The next change starts a new entry even if it touches the same value."""
+        self._mergeable = False
+
+    @contextmanager
+    def group(self):
+        """Records every change made inside the block as one entry."""
+        if self._group is not None:
+            yield
+            return
+        self._group = Entry()
+        try:
+            yield
+        finally:
+            entry, self._group = self._group, None
+            if entry.changes:
+                self._push(entry)
+                self._mergeable = False
+
+    def on_change(self, node, change):
+        if self.applying:
+            return
+        recorded = record_change(node, change)
+        if recorded is None:
+            return
+        if self._group is not None:
+            self._group.changes.append(recorded)
+            self._group.cost += recorded.cost
+            return
+        last = self.undo_entries[-1] if self.undo_entries else None
+        if (self._mergeable and last is not None and recorded.key is not None
+                and len(last.changes) == 1 and last.changes[0].key == recorded.key
+                and time.monotonic() - last.time < self.merge_seconds):
+            last.changes[0].after = recorded.after
+            last.time = time.monotonic()
+            self.redo_entries.clear()
+            return
+        entry = Entry()
+        entry.changes.append(recorded)
+        entry.cost = recorded.cost
+        self._push(entry)
+        self._mergeable = recorded.key is not None
+
+    def _push(self, entry):
+        self.undo_entries.append(entry)
+        self._bytes += entry.cost
+        for dropped in self.redo_entries:
+            self._bytes -= dropped.cost
+        self.redo_entries.clear()
+        while self._bytes > self.max_bytes and len(self.undo_entries) > 1:
+            self._bytes -= self.undo_entries.popleft().cost
+
+    def undo(self):
+        if not self.undo_entries:
+            return None
+        entry = self.undo_entries.pop()
+        self._apply(entry, undo=True)
+        self.redo_entries.append(entry)
+        return entry
+
+    def redo(self):
+        if not self.redo_entries:
+            return None
+        entry = self.redo_entries.pop()
+        self._apply(entry, undo=False)
+        self.undo_entries.append(entry)
+        return entry
+
+    def _apply(self, entry, undo):
+        self.applying = True
+        try:
+            for change in (reversed(entry.changes) if undo else entry.changes):
+                apply_change(change, undo)
+        finally:
+            self.applying = False
+            self._mergeable = False
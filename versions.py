@@ -0,0 +1,255 @@
+"""Dated versions of the price lists, kept by every save.
+
+A version is a snapshot of one price list as it was saved, effective from
+the list's date. Snapshots are content addressed: each type, cloth and list
+is stored once under the hash of its contents, and a cloth or list refers
+to its children by hash. A save only adds rows for what changed since the
+last version; unchanged cloths and types are shared with earlier versions,
+so the history grows with the edits rather than with the catalog.
+
+as_of() finds the version in effect on a day with one lookup in the
+(code, effective) index, and rate() then walks down to one cell:
+
+    python versions.py CODE 2026-03-01 ["Cotton Shirt" "Half Sleeve" 32] [--db price_lists.db]
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import sys
+import weakref
+
+from models import PriceList, Cloth, ClothType, SizeGrid
+
+VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS version_nodes (
+    hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    price_list_uid TEXT NOT NULL,
+    code TEXT NOT NULL,
+    effective TEXT NOT NULL,
+    saved_at TEXT NOT NULL,
+    root TEXT NOT NULL REFERENCES version_nodes(hash)
+);
+CREATE INDEX IF NOT EXISTS versions_by_code ON versions(code, effective, id);
+CREATE INDEX IF NOT EXISTS versions_by_list ON versions(price_list_uid, effective, id);
+"""
+
+INSERT_NODE = "INSERT OR IGNORE INTO version_nodes (hash, data) VALUES (?, ?)"
+INSERT_VERSION = """
+INSERT INTO versions (price_list_uid, code, effective, saved_at, root) VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _encode(data):
+    text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest(), text
+
+
+def price_list_of(node):
+    while node is not None and not isinstance(node, PriceList):
+        node = node.parent
+    return node
+
+
+class Version:
+    __slots__ = ("price_list_uid", "code", "effective", "saved_at", "root")
+
+    def __init__(self, price_list_uid, code, effective, saved_at, root):
+        self.price_list_uid = price_list_uid
+        self.code = code
+        self.effective = datetime.date.fromisoformat(effective)
+        self.saved_at = saved_at
+        self.root = root
+
+
+class VersionStore:
+    def __init__(self, conn):
+        self.conn = conn
+        self._type_hashes = weakref.WeakKeyDictionary()   # ClothType -> hash of its last snapshot
+        self._backfilled = False    # lists saved before versions were kept have one now
+
+    def record(self, cur, catalog, saved_at=None):
+        """Adds a version of every price list changed since the last save; returns how many.
+
+        Runs inside the save's transaction, before the catalog's changes are
+        cleared. Only the dirty nodes are looked at, except on the first save:
+        that one also versions the lists the store held before it kept versions.
+        """
+        changed = set()
+        if not self._backfilled:
+            versioned = {uid for (uid,) in cur.execute("SELECT DISTINCT price_list_uid FROM versions")}
+            changed.update(pl for pl in catalog.price_lists if pl.uid not in versioned)
+        for node in catalog.dirty:
+            if node.root() is not catalog:
+                continue
+            if isinstance(node, SizeGrid):
+                # New labels change the snapshot of every type on the grid.
+                for cloth_type in node.types:
+                    self._type_hashes.pop(cloth_type, None)
+                    if cloth_type.root() is catalog:
+                        changed.add(price_list_of(cloth_type))
+                continue
+            changed.add(price_list_of(node))
+            if isinstance(node, ClothType):
+                self._type_hashes.pop(node, None)
+        self._backfilled = True
+        if not changed:
+            return 0
+
+        saved_at = saved_at or datetime.datetime.now().isoformat(timespec="seconds")
+        nodes = {}
+        versions = []
+        for price_list in changed:
+            root = self._snapshot_list(price_list, nodes)
+            versions.append((price_list.uid, price_list.code, price_list.date.isoformat(), saved_at, root))
+        cur.executemany(INSERT_NODE, nodes.items())
+        cur.executemany(INSERT_VERSION, versions)
+        return len(versions)
+
+    def rollback(self):
+        """Forgets what record() assumed was written, after the save failed."""
+        self._type_hashes.clear()
+        self._backfilled = False
+
+    def _snapshot_list(self, price_list, nodes):
+        cloths = []
+        for cloth in price_list.cloths:
+            types = [[t.name, self._snapshot_type(t, nodes)] for t in cloth.types]
+            key, text = _encode({"name": cloth.name, "types": types})
+            nodes[key] = text
+            cloths.append([cloth.name, key])
+        key, text = _encode({"name": price_list.name, "code": price_list.code,
+                             "date": price_list.date.isoformat(), "cloths": cloths})
+        nodes[key] = text
+        return key
+
+    def _snapshot_type(self, cloth_type, nodes):
+        key = self._type_hashes.get(cloth_type)
+        if key is None:
+            data = {"name": cloth_type.name, "sizes": cloth_type.sizes.tolist(),
+                    "rates": cloth_type.rates.tolist()}
+            grid = cloth_type.grid
+            if grid is not None:
+                data["grid"] = [grid.uid, grid.name]
+                if grid.labels:
+                    data["labels"] = list(grid.labels)
+            key, text = _encode(data)
+            nodes[key] = text
+            self._type_hashes[cloth_type] = key
+        return key
+
+    def node(self, key):
+        row = self.conn.execute("SELECT data FROM version_nodes WHERE hash = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def as_of(self, code, day):
+        """The version of the list with this code in effect on day, or None."""
+        row = self.conn.execute(
+            "SELECT price_list_uid, code, effective, saved_at, root FROM versions"
+            " WHERE code = ? AND effective <= ? ORDER BY effective DESC, id DESC LIMIT 1",
+            (code, day.isoformat())).fetchone()
+        return Version(*row) if row else None
+
+    def history(self, price_list_uid):
+        """Every version of one price list, oldest first."""
+        return [Version(*row) for row in self.conn.execute(
+            "SELECT price_list_uid, code, effective, saved_at, root FROM versions"
+            " WHERE price_list_uid = ? ORDER BY effective, id", (price_list_uid,))]
+
+    def rate(self, code, cloth_name, type_name, size, day):
+        """Rate of one size of one type on day, or None if there was none."""
+        version = self.as_of(code, day)
+        if version is None:
+            return None
+        price_list = self.node(version.root)
+        cloth_key = next((key for name, key in price_list["cloths"] if name == cloth_name), None)
+        if cloth_key is None:
+            return None
+        type_key = next((key for name, key in self.node(cloth_key)["types"] if name == type_name), None)
+        if type_key is None:
+            return None
+        data = self.node(type_key)
+        sizes = data.get("labels") or data["sizes"]
+        if size not in sizes:
+            return None
+        return data["rates"][sizes.index(size)]
+
+    def load(self, version, grids=None):
+        """Builds a detached PriceList from a version, e.g. to print or compare it.
+
+        Types that were on a grid go back on it when grids (uid -> SizeGrid)
+        has it with the same sizes and labels, and on a detached copy of the
+        grid as it was otherwise, so their labels come back either way.
+        """
+        data = self.node(version.root)
+        price_list = PriceList(data["name"], data["code"], datetime.date.fromisoformat(data["date"]),
+                               uid=version.price_list_uid)
+        made = {}   # grids rebuilt from the snapshots, shared by their types
+        for cloth_name, cloth_key in data["cloths"]:
+            cloth = price_list.add_cloth(Cloth(cloth_name))
+            for type_name, type_key in self.node(cloth_key)["types"]:
+                type_data = self.node(type_key)
+                grid = self._grid_of(type_data, grids, made)
+                cloth.add_type(ClothType(type_data["sizes"] if grid is None else grid,
+                                         type_name, type_data["rates"]))
+        return price_list
+
+    @staticmethod
+    def _grid_of(type_data, grids, made):
+        # Snapshots made before grid uids were kept have only the labels.
+        labels = type_data.get("labels", [])
+        grid_uid, grid_name = type_data.get("grid") or (None, "")
+        if grid_uid is None and not labels:
+            return None
+        grid = grids.get(grid_uid) if grids and grid_uid else None
+        if grid is not None and grid.sizes.tolist() == type_data["sizes"] and list(grid.labels) == labels:
+            return grid
+        key = (grid_uid, tuple(type_data["sizes"]), tuple(labels))
+        if key not in made:
+            # The grid has changed since: a copy as it was, under a new uid if the uid is taken.
+            made[key] = SizeGrid(grid_name, type_data["sizes"], labels, uid=grid_uid if grid is None else None)
+        return made[key]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Look up a price list, or one rate, as of a date.")
+    parser.add_argument("code")
+    parser.add_argument("date", type=datetime.date.fromisoformat)
+    parser.add_argument("cell", nargs="*", metavar="CLOTH TYPE SIZE")
+    parser.add_argument("--db", default="price_lists.db")
+    args = parser.parse_args(argv[1:])
+    if args.cell and len(args.cell) != 3:
+        parser.error("give cloth, type and size together")
+
+    from storage import PriceListStore
+    store = PriceListStore(args.db)
+    try:
+        versions = store.versions
+        version = versions.as_of(args.code, args.date)
+        if version is None:
+            print(f"No version of {args.code} in effect on {args.date}")
+            return 1
+        if args.cell:
+            cloth_name, type_name, size = args.cell
+            rate = versions.rate(args.code, cloth_name, type_name,
+                                 int(size) if size.isdigit() else size, args.date)
+            print("no such rate" if rate is None else rate)
+            return 0 if rate is not None else 1
+        price_list = versions.load(version)
+        print(f"{price_list.code} {price_list.name}: effective {version.effective}, saved {version.saved_at}")
+        for cloth in price_list.cloths:
+            for cloth_type in cloth.types:
+                cells = ", ".join(f"{cloth_type.size_label(col)}: {rate}"
+                                  for col, rate in enumerate(cloth_type.rates))
+                print(f"  {cloth.name} / {cloth_type.name}: {cells}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))